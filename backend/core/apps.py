@@ -7,3 +7,5 @@ class CoreConfig(AppConfig):
     def ready(self):
         # Import signals when Django starts
         from . import signals
+        # connects the SQL recorder before the first database connection opens
+        from . import metrics
@@ -0,0 +1,175 @@
+# core/async_views.py
+"""
+Native async versions of the two hottest endpoints, for ASGI deployments
+(socialnet/asgi.py under uvicorn / daphne / hypercorn):
+
+    GET  /api/async/posts/             -> same response as GET /api/posts/
+    POST /api/async/posts/<pk>/react/  -> same response as POST /api/posts/<pk>/react/
+    GET  /api/stream/                  -> live counters / new posts (SSE, core/realtime.py)
+
+DRF views are sync only, so these are plain Django async views. The JWT is
+checked with ClaimsJWTAuthentication.aauthenticate, the feed cache and all reads
+go through Django's async cache / ORM APIs, and the reaction toggle (which needs
+a transaction) is a single sync_to_async hop. While a request waits on the cache
+or the database the event loop serves other requests instead of parking a
+worker thread on it.
+"""
+import json
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.db import IntegrityError
+from django.core.handlers.asgi import ASGIRequest
+from django.http import HttpResponse, JsonResponse, StreamingHttpResponse
+from django.views import View
+from django.views.decorators.csrf import csrf_exempt
+from rest_framework.exceptions import APIException, NotAuthenticated
+from rest_framework.request import Request
+
+from . import conditional, feed_cache, reactions, realtime, renderers
+from .authentication import ClaimsJWTAuthentication, QueryTokenJWTAuthentication
+from .models import Post
+from .pagination import feed_ranking
+from .routing import PRIMARY
+from .serializers import PostSerializer
+from .serializers_fast import POST_FIELDS, sparse_fields
+
+
+def error_response(detail, status):
+    return JsonResponse({"detail": detail}, status=status)
+
+
+class AsyncAPIView(View):
+    """
+    Base for the async views: authenticates the bearer token before dispatching
+    and turns DRF exceptions into the same JSON errors the sync views return.
+    """
+    authenticator = ClaimsJWTAuthentication()
+
+    @classmethod
+    def as_view(cls, **initkwargs):
+        # token auth only, like DRF's APIView
+        return csrf_exempt(super().as_view(**initkwargs))
+
+    async def dispatch(self, request, *args, **kwargs):
+        try:
+            auth = await self.authenticator.aauthenticate(request)
+            if auth is None:
+                raise NotAuthenticated()
+            request.user, request.auth = auth
+            return await super().dispatch(request, *args, **kwargs)
+        except APIException as exc:
+            detail = exc.detail if isinstance(exc.detail, dict) else {"detail": exc.detail}
+            response = JsonResponse(detail, status=exc.status_code)
+            if exc.status_code == 401:
+                response["WWW-Authenticate"] = self.authenticator.authenticate_header(request)
+            return response
+
+
+class AsyncPostListView(AsyncAPIView):
+    """
+    GET /api/async/posts/  -> global feed, as GET /api/posts/ (?cursor=&page_size=&ranking=&fields=)
+    """
+
+    async def get(self, request):
+        ranking, paginator = feed_ranking(request.GET)
+        fields = sparse_fields(request.GET, POST_FIELDS)
+        paginator.prepare(Request(request))
+        cursor_token = request.GET.get(paginator.cursor_query_param)
+
+        key, listing = await feed_cache.aget_page(cursor_token, paginator.cursor, paginator.page_size, ranking)
+        if listing is None:
+            posts = await paginator.aget_page(
+                Post.objects.using(PRIMARY).select_related("author"), paginator.cursor, paginator.page_size
+            )
+            listing = await feed_cache.astore_page(
+                key, posts, paginator.next_cursor, paginator.previous_cursor, ranking
+            )
+
+        paginator.next_cursor = listing["next"]
+        paginator.previous_cursor = listing["previous"]
+        loaded = await feed_cache.aload(listing["ids"], getattr(request.user, "profile", None))
+        etag = feed_cache.page_etag(listing, loaded, "application/json")  # always JSON here
+        response = conditional.not_modified(request, etag)
+        if response is None:
+            response = HttpResponse(renderers.dumps({
+                "next": paginator.get_next_link(),
+                "previous": paginator.get_previous_link(),
+                "results": feed_cache.assemble(request, *loaded, fields=fields),
+            }), content_type="application/json")
+        return conditional.add_validators(response, etag)
+
+
+class AsyncPostReactView(AsyncAPIView):
+    """
+    POST /api/async/posts/<pk>/react/
+    body: { "reaction": "like" } or { "reaction": "dislike" }, as POST /api/posts/<pk>/react/
+    """
+
+    async def post(self, request, pk):
+        if request.content_type == "application/json":
+            try:
+                data = json.loads(request.body or b"{}")
+            except ValueError:
+                return error_response("JSON parse error.", 400)
+        else:
+            data = request.POST
+        reaction_str = data.get("reaction") if hasattr(data, "get") else None
+        if reaction_str not in ("like", "dislike"):
+            return error_response("reaction must be 'like' or 'dislike'", 400)
+        new_value = 1 if reaction_str == "like" else -1
+        profile = request.user.profile
+
+        if settings.REACTION_COUNTER_MODE == "deltas":
+            try:
+                outcome = await sync_to_async(reactions.toggle_reaction)(profile.pk, pk, new_value)
+            except IntegrityError:
+                return error_response("Post not found.", 404)
+            post = await reactions.with_pending_counts(
+                Post.objects.select_related("author")
+            ).filter(pk=pk).afirst()
+            if post is None:
+                return error_response("Post not found.", 404)
+            post.likes_count = post.current_likes
+            post.dislikes_count = post.current_dislikes
+            current = None if outcome == reactions.REMOVED else new_value
+        else:
+            try:
+                post, current = await sync_to_async(reactions.toggle_reaction_locked)(profile.pk, pk, new_value)
+            except Post.DoesNotExist:
+                return error_response("Post not found.", 404)
+            await feed_cache.apost_changed(post.pk)
+
+        await feed_cache.areaction_changed(profile.pk, post.pk, current)
+        realtime.counts_changed(post)
+        serializer = PostSerializer(post, context={"request": request, "user_reactions": {post.pk: current}})
+        return JsonResponse(serializer.data)
+
+
+class PostStreamView(AsyncAPIView):
+    """
+    GET /api/stream/?posts=<id>,<id>,...&access_token=<jwt>  -> text/event-stream
+
+    Every REALTIME_WINDOW seconds at most: `event: counts` with
+    {"<post id>": {"likes_count": n, "dislikes_count": n}} for the listed posts
+    that changed, and `event: posts` with [{"id": n, "author": "..."}] for posts
+    created meanwhile. Reconnect with a new ?posts= when the visible posts change.
+    Served under WSGI, streams last REALTIME_WSGI_STREAM_SECONDS (core/realtime.py).
+    """
+    authenticator = QueryTokenJWTAuthentication()
+
+    async def get(self, request):
+        try:
+            post_ids = {int(pk) for pk in request.GET.get("posts", "").split(",") if pk}
+        except ValueError:
+            return error_response("posts must be a comma separated list of ids.", 400)
+        if len(post_ids) > settings.REALTIME_MAX_POSTS:
+            return error_response(f"At most {settings.REALTIME_MAX_POSTS} posts per stream.", 400)
+
+        # an ASGI server streams an async body; a WSGI one would buffer it whole,
+        # and gets short streams that do not pin its worker threads
+        body = realtime.astream(post_ids) if isinstance(request, ASGIRequest) else realtime.stream(post_ids)
+        response = StreamingHttpResponse(body, content_type="text/event-stream")
+        response["Cache-Control"] = "no-cache"
+        response["X-Accel-Buffering"] = "no"  # nginx: pass events through as they come
+        return response
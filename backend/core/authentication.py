@@ -0,0 +1,177 @@
+# core/authentication.py
+"""
+JWT authentication without the per-request User + Profile lookup.
+
+Tokens minted by `tokens_for_user` carry `profile_id` and `username` claims.
+ClaimsJWTAuthentication resolves the user through a small in-process TTL cache
+of User objects with their Profile attached, so a warm worker authenticates
+with zero queries (and a cold one with a single joined query instead of two).
+
+Deactivation and revocation still apply: `is_active` and the revocation
+fingerprint (SIMPLE_JWT["CHECK_REVOKE_TOKEN"]) are checked against the cached user, the
+entry is dropped as soon as the User or Profile is saved or deleted in this
+process, and other processes pick the change up within AUTH_USER_CACHE_TTL.
+"""
+import copy
+import threading
+import time
+from collections import OrderedDict
+
+from django.conf import settings
+from django.utils.crypto import salted_hmac
+from django.utils.translation import gettext_lazy as _
+from rest_framework import HTTP_HEADER_ENCODING
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.exceptions import AuthenticationFailed, InvalidToken
+from rest_framework_simplejwt.settings import api_settings
+from rest_framework_simplejwt.tokens import RefreshToken
+
+
+def revocation_fingerprint(user):
+    """
+    Stands in for simplejwt's hash of the password hash in the revoke claim.
+    It follows Profile.password_version, so a password change revokes the
+    user's tokens while a hash upgrade at login (core/passwords.py) does not.
+    """
+    profile = getattr(user, "profile", None)
+    version = profile.password_version if profile is not None else 0
+    return salted_hmac("core.authentication.revoke", f"{user.pk}:{version}").hexdigest()
+
+
+def tokens_for_user(user):
+    """Refresh token (its access token inherits the claims) for `user`."""
+    refresh = RefreshToken.for_user(user)
+    if api_settings.CHECK_REVOKE_TOKEN:
+        refresh[api_settings.REVOKE_TOKEN_CLAIM] = revocation_fingerprint(user)
+    refresh["profile_id"] = user.profile.pk
+    refresh["username"] = user.profile.username
+    return refresh
+
+
+class UserStateCache:
+    """
+    Thread-safe LRU of {user_id: (expires_at, user)} with a TTL. Keys are
+    strings: that is how the user id travels in the token claim.
+    """
+
+    def __init__(self, max_entries=10000):
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()
+
+    def get(self, user_id):
+        user_id = str(user_id)
+        with self._lock:
+            entry = self._entries.get(user_id)
+            if entry is None:
+                return None
+            if entry[0] < time.monotonic():
+                del self._entries[user_id]
+                return None
+            self._entries.move_to_end(user_id)
+            return entry[1]
+
+    def put(self, user_id, user):
+        user_id = str(user_id)
+        with self._lock:
+            self._entries[user_id] = (time.monotonic() + settings.AUTH_USER_CACHE_TTL, user)
+            self._entries.move_to_end(user_id)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def evict(self, user_id):
+        with self._lock:
+            self._entries.pop(str(user_id), None)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+user_cache = UserStateCache()
+
+
+def _profile_id(user):
+    profile = user._state.fields_cache.get("profile")
+    return profile.pk if profile is not None else None
+
+
+class ClaimsJWTAuthentication(JWTAuthentication):
+    def get_user(self, validated_token):
+        user_id, user = self._cached_user(validated_token)
+        if user is None:
+            user = self._user_query(user_id).first()
+            self._remember(user_id, user)
+        return self._checked_copy(user, validated_token)
+
+    # --- async views (core/async_views.py) ---
+    async def aauthenticate(self, request):
+        """`authenticate` for plain Django async views; only a cache miss touches the database."""
+        header = self.get_header(request)
+        if header is None:
+            return None
+        raw_token = self.get_raw_token(header)
+        if raw_token is None:
+            return None
+        validated_token = self.get_validated_token(raw_token)
+        return await self.aget_user(validated_token), validated_token
+
+    async def aget_user(self, validated_token):
+        user_id, user = self._cached_user(validated_token)
+        if user is None:
+            user = await self._user_query(user_id).afirst()
+            self._remember(user_id, user)
+        return self._checked_copy(user, validated_token)
+
+    # --- helpers ---
+    def _cached_user(self, validated_token):
+        try:
+            user_id = validated_token[api_settings.USER_ID_CLAIM]
+        except KeyError:
+            raise InvalidToken(_("Token contained no recognizable user identification"))
+
+        user = user_cache.get(user_id)
+        profile_id = validated_token.get("profile_id")
+        if user is not None and profile_id is not None and _profile_id(user) != profile_id:
+            user = None
+        return user_id, user
+
+    def _user_query(self, user_id):
+        return self.user_model.objects.select_related("profile").filter(**{api_settings.USER_ID_FIELD: user_id})
+
+    def _remember(self, user_id, user):
+        if user is None:
+            raise AuthenticationFailed(_("User not found"), code="user_not_found")
+        user_cache.put(user_id, user)
+
+    def _checked_copy(self, user, validated_token):
+        if api_settings.CHECK_USER_IS_ACTIVE and not user.is_active:
+            raise AuthenticationFailed(_("User is inactive"), code="user_inactive")
+
+        if api_settings.CHECK_REVOKE_TOKEN:
+            if validated_token.get(api_settings.REVOKE_TOKEN_CLAIM) != revocation_fingerprint(user):
+                raise AuthenticationFailed(
+                    _("The user's password has been changed."), code="password_changed"
+                )
+
+        # each request gets its own copies; the cached instances are shared between threads
+        request_user = copy.copy(user)
+        if _profile_id(user) is not None:
+            request_user.profile = copy.copy(user.profile)
+        return request_user
+
+
+class QueryTokenJWTAuthentication(ClaimsJWTAuthentication):
+    """
+    Also accepts the access token as ?access_token=, for EventSource streams
+    (browsers cannot set headers on them). Only used by the SSE endpoint;
+    access tokens are short-lived, but keep that query string out of access logs.
+    """
+    query_param = "access_token"
+
+    def get_header(self, request):
+        header = super().get_header(request)
+        token = request.GET.get(self.query_param)
+        if header is None and token:
+            return f"{api_settings.AUTH_HEADER_TYPES[0]} {token}".encode(HTTP_HEADER_ENCODING)
+        return header
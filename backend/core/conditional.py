@@ -0,0 +1,47 @@
+# core/conditional.py
+"""
+Conditional GET for the feed and profile endpoints: clients that re-poll send
+back the ETag (If-None-Match) or Last-Modified (If-Modified-Since) they got and
+receive 304 Not Modified while nothing changed.
+
+Validators are computed from data the view loads anyway, before any
+serialization: the feed cache entries of the page and the viewer's overlay
+(core/feed_cache.py), the profile row. A 304 therefore costs neither the
+assembly of the body nor its transfer.
+
+One URL has a body per negotiated renderer (JSON, MessagePack, indented JSON;
+core/renderers.py), so the accepted media type is part of every ETag and
+responses vary on Accept.
+"""
+import hashlib
+import json
+
+from django.utils.cache import get_conditional_response, patch_cache_control, patch_vary_headers
+from django.utils.http import http_date
+
+
+def media_type(request):
+    """The negotiated media type of a DRF request (its params included); plain JSON otherwise."""
+    return getattr(request, "accepted_media_type", None) or "application/json"
+
+
+def etag(*parts):
+    """Weak ETag over JSON-serializable `parts` (datetimes allowed)."""
+    payload = json.dumps(parts, sort_keys=True, default=str, separators=(",", ":")).encode()
+    return f'W/"{hashlib.sha1(payload, usedforsecurity=False).hexdigest()}"'
+
+
+def not_modified(request, etag, last_modified=None):
+    """The 304 (or 412) response when the request's preconditions say so, else None."""
+    timestamp = int(last_modified.timestamp()) if last_modified is not None else None
+    return get_conditional_response(request, etag=etag, last_modified=timestamp)
+
+
+def add_validators(response, etag, last_modified=None):
+    response["ETag"] = etag
+    if last_modified is not None:
+        response["Last-Modified"] = http_date(last_modified.timestamp())
+    # per-viewer data: the browser keeps it but revalidates, shared caches don't store it
+    patch_cache_control(response, private=True, no_cache=True)
+    patch_vary_headers(response, ("Authorization", "Accept"))
+    return response
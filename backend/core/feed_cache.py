@@ -0,0 +1,327 @@
+# core/feed_cache.py
+"""
+Cache for the global feed served by PostListCreateView.
+
+Entries live in the `FEED_CACHE_ALIAS` cache (locmem locally, Redis or any other
+Django cache backend in production) and come in three kinds:
+
+- page listings   feed:page:...           -> {"ids": [...], "next": ..., "previous": ...}
+- post data       feed:post:<id>          -> PostSerializer's output (serializers_fast.post_data), viewer independent
+- viewer overlay  feed:reaction:<pr>:<id> -> 1 / -1 / 0 (the viewer's user_reaction)
+
+Page listings carry two generation numbers in their key. Creating a post only
+bumps the "head" generation (the newest page and backward pages are the only
+ones it can appear in; keyset pages further down are unaffected), deleting a
+post bumps the "all" generation. Reactions drop the single post entry and patch
+the reacting viewer's overlay, leaving every listing alone.
+
+Hot-ranked listings (?ranking=hot) change with every reaction, so instead they
+expire after HOT_FEED_CACHE_TTL seconds and only follow the "all" generation.
+
+Every entry is filled from the primary database (routing.PRIMARY), also inside
+views that otherwise read from a replica: an entry built from a lagging replica
+would outlive the lag and be served to everyone, the writer included.
+"""
+import threading
+
+from django.conf import settings
+from django.core.cache import caches
+from django.core.cache.backends.base import DEFAULT_TIMEOUT
+from django.core.cache.backends.locmem import LocMemCache
+
+from . import conditional, metrics
+from .models import Post, PostReaction
+from .routing import PRIMARY
+from .serializers import get_viewer_profile
+from .serializers_fast import posts_data
+
+GEN_ALL_KEY = "feed:gen:all"
+GEN_HEAD_KEY = "feed:gen:head"
+
+_REACTION_NAMES = {1: "like", -1: "dislike"}
+
+_stats_lock = threading.Lock()
+_stats = {"page_hits": 0, "page_misses": 0, "post_hits": 0, "post_misses": 0,
+          "reaction_hits": 0, "reaction_misses": 0}
+
+
+def get_cache():
+    return caches[settings.FEED_CACHE_ALIAS]
+
+
+def _count(hits_key, hits, misses_key, misses):
+    with _stats_lock:
+        _stats[hits_key] += hits
+        _stats[misses_key] += misses
+
+
+def stats():
+    """Hit/miss counters for this process."""
+    with _stats_lock:
+        return dict(_stats)
+
+
+def _bump(key):
+    cache = get_cache()
+    try:
+        cache.incr(key)
+    except ValueError:
+        cache.set(key, 1, timeout=None)
+
+
+def _post_key(post_id):
+    return f"feed:post:{post_id}"
+
+
+def _reaction_key(profile_id, post_id):
+    return f"feed:reaction:{profile_id}:{post_id}"
+
+
+def _page_key_for(gens, cursor_token, cursor, page_size, ranking):
+    if ranking == "hot":
+        return f"feed:hot:{gens.get(GEN_ALL_KEY, 0)}:{cursor_token or '-'}:{page_size}"
+    # only the head page and backward pages can gain a newly created post
+    head = gens.get(GEN_HEAD_KEY, 0) if cursor is None or cursor[0] else 0
+    return f"feed:page:{gens.get(GEN_ALL_KEY, 0)}:{head}:{cursor_token or '-'}:{page_size}"
+
+
+def _page_key(cursor_token, cursor, page_size, ranking):
+    gens = get_cache().get_many([GEN_ALL_KEY, GEN_HEAD_KEY])
+    return _page_key_for(gens, cursor_token, cursor, page_size, ranking)
+
+
+def _page_timeout(ranking):
+    return settings.HOT_FEED_CACHE_TTL if ranking == "hot" else DEFAULT_TIMEOUT
+
+
+def _listing(posts, next_cursor, previous_cursor):
+    return {
+        "ids": [post.pk for post in posts],
+        "next": next_cursor,
+        "previous": previous_cursor,
+    }
+
+
+# --- page listings ---
+def get_page(cursor_token, cursor, page_size, ranking="new"):
+    """Return `(key, listing)`; listing is None on a miss."""
+    key = _page_key(cursor_token, cursor, page_size, ranking)
+    listing = get_cache().get(key)
+    _count("page_hits", listing is not None, "page_misses", listing is None)
+    return key, listing
+
+
+def store_page(key, posts, next_cursor, previous_cursor, ranking="new"):
+    listing = _listing(posts, next_cursor, previous_cursor)
+    get_cache().set(key, listing, _page_timeout(ranking))
+    store_posts(posts)
+    return listing
+
+
+# --- post data ---
+def _serialize(posts):
+    # no request: relative image URLs and no viewer-specific fields
+    return {item["id"]: item for item in posts_data(posts)}
+
+
+def store_posts(posts):
+    if posts:
+        get_cache().set_many({_post_key(pk): item for pk, item in _serialize(posts).items()})
+
+
+def get_posts(post_ids):
+    """Viewer-independent post data for `post_ids`, loading misses in one query."""
+    cache = get_cache()
+    cached = cache.get_many([_post_key(pk) for pk in post_ids])
+    found = {pk: cached[_post_key(pk)] for pk in post_ids if _post_key(pk) in cached}
+    missing = [pk for pk in post_ids if pk not in found]
+    _count("post_hits", len(found), "post_misses", len(missing))
+
+    if missing:
+        loaded = _serialize(Post.objects.using(PRIMARY).select_related("author").filter(pk__in=missing))
+        if loaded:
+            cache.set_many({_post_key(pk): item for pk, item in loaded.items()})
+        found.update(loaded)
+    return found
+
+
+# --- viewer overlay ---
+def get_reactions(profile, post_ids):
+    """{post_id: 1 / -1 / 0} for `profile`, loading misses in one query."""
+    cache = get_cache()
+    cached = cache.get_many([_reaction_key(profile.pk, pk) for pk in post_ids])
+    found = {pk: cached[_reaction_key(profile.pk, pk)] for pk in post_ids if _reaction_key(profile.pk, pk) in cached}
+    missing = [pk for pk in post_ids if pk not in found]
+    _count("reaction_hits", len(found), "reaction_misses", len(missing))
+
+    if missing:
+        loaded = dict.fromkeys(missing, 0)
+        loaded.update(
+            PostReaction.objects.using(PRIMARY).filter(user=profile, post__in=missing)
+            .values_list("post_id", "reaction")
+        )
+        cache.set_many({_reaction_key(profile.pk, pk): value for pk, value in loaded.items()})
+        found.update(loaded)
+    return found
+
+
+def load(request, post_ids):
+    """What the items for `post_ids` are made of: (ids still present, post data, viewer overlay)."""
+    posts = get_posts(post_ids)
+    post_ids = [pk for pk in post_ids if pk in posts]  # drop posts deleted meanwhile
+    profile = get_viewer_profile(request)
+    reactions = get_reactions(profile, post_ids) if profile is not None and post_ids else {}
+    return post_ids, posts, reactions
+
+
+def render(request, post_ids, fields=None):
+    """Assemble the feed items for `post_ids`: cached post data + the viewer's overlay."""
+    return assemble(request, *load(request, post_ids), fields=fields)
+
+
+def page_etag(listing, loaded, media_type):
+    """
+    Validator of a page: changes with its listing, any of its post entries, the
+    viewer's overlay or the media type it is rendered as.
+    """
+    post_ids, posts, reactions = loaded
+    return conditional.etag(
+        media_type, listing["next"], listing["previous"], [(posts[pk], reactions.get(pk)) for pk in post_ids]
+    )
+
+
+def assemble(request, post_ids, posts, reactions, fields=None):
+    """The items, limited to `fields` (a sparse fieldset, None = all of them)."""
+    with metrics.timed("serializer"):
+        return _assemble_items(request, post_ids, posts, reactions, fields)
+
+
+def _absolute_url(request):
+    # storage URLs are already URI-encoded: prefix the site-relative ones directly
+    # instead of running each through request.build_absolute_uri
+    prefix = request.build_absolute_uri("/")[:-1]
+
+    def absolute(url):
+        return prefix + url if url.startswith("/") and not url.startswith("//") else request.build_absolute_uri(url)
+    return absolute
+
+
+def _assemble_items(request, post_ids, posts, reactions, fields=None):
+    absolute = _absolute_url(request)
+    with_reaction = fields is None or "user_reaction" in fields
+    items = []
+    for pk in post_ids:
+        post = posts[pk]
+        item = dict(post) if fields is None else {name: post[name] for name in fields}
+        if item.get("image"):
+            item["image"] = absolute(item["image"])
+        if item.get("image_srcset"):
+            item["image_srcset"] = {width: absolute(url) for width, url in item["image_srcset"].items()}
+        if with_reaction:
+            item["user_reaction"] = _REACTION_NAMES.get(reactions.get(pk))
+        items.append(item)
+    return items
+
+
+# --- async variants for core/async_views.py (cache I/O and misses on the async API) ---
+async def _acache(method, *args):
+    cache = get_cache()
+    if isinstance(cache, LocMemCache):
+        # an in-process dict: calling it from the event loop beats the thread hop
+        # that Django's default async cache methods take
+        return getattr(cache, method)(*args)
+    return await getattr(cache, "a" + method)(*args)
+
+
+async def _apage_key(cursor_token, cursor, page_size, ranking):
+    gens = await _acache("get_many", [GEN_ALL_KEY, GEN_HEAD_KEY])
+    return _page_key_for(gens, cursor_token, cursor, page_size, ranking)
+
+
+async def aget_page(cursor_token, cursor, page_size, ranking="new"):
+    key = await _apage_key(cursor_token, cursor, page_size, ranking)
+    listing = await _acache("get", key)
+    _count("page_hits", listing is not None, "page_misses", listing is None)
+    return key, listing
+
+
+async def astore_page(key, posts, next_cursor, previous_cursor, ranking="new"):
+    listing = _listing(posts, next_cursor, previous_cursor)
+    await _acache("set", key, listing, _page_timeout(ranking))
+    if posts:
+        await _acache("set_many", {_post_key(pk): item for pk, item in _serialize(posts).items()})
+    return listing
+
+
+async def aget_posts(post_ids):
+    cached = await _acache("get_many", [_post_key(pk) for pk in post_ids])
+    found = {pk: cached[_post_key(pk)] for pk in post_ids if _post_key(pk) in cached}
+    missing = [pk for pk in post_ids if pk not in found]
+    _count("post_hits", len(found), "post_misses", len(missing))
+
+    if missing:
+        rows = [post async for post in Post.objects.using(PRIMARY).select_related("author").filter(pk__in=missing)]
+        loaded = _serialize(rows)
+        if loaded:
+            await _acache("set_many", {_post_key(pk): item for pk, item in loaded.items()})
+        found.update(loaded)
+    return found
+
+
+async def aget_reactions(profile, post_ids):
+    cached = await _acache("get_many", [_reaction_key(profile.pk, pk) for pk in post_ids])
+    found = {pk: cached[_reaction_key(profile.pk, pk)] for pk in post_ids if _reaction_key(profile.pk, pk) in cached}
+    missing = [pk for pk in post_ids if pk not in found]
+    _count("reaction_hits", len(found), "reaction_misses", len(missing))
+
+    if missing:
+        loaded = dict.fromkeys(missing, 0)
+        async for post_id, value in PostReaction.objects.using(PRIMARY).filter(
+            user=profile, post__in=missing
+        ).values_list("post_id", "reaction"):
+            loaded[post_id] = value
+        await _acache("set_many", {_reaction_key(profile.pk, pk): value for pk, value in loaded.items()})
+        found.update(loaded)
+    return found
+
+
+async def aload(post_ids, profile):
+    """`load` for an explicit viewer `profile` (async views have no lazy request.user)."""
+    posts = await aget_posts(post_ids)
+    post_ids = [pk for pk in post_ids if pk in posts]
+    reactions = await aget_reactions(profile, post_ids) if profile is not None and post_ids else {}
+    return post_ids, posts, reactions
+
+
+async def apost_changed(post_id):
+    await _acache("delete", _post_key(post_id))
+
+
+async def areaction_changed(profile_id, post_id, value):
+    await _acache("set", _reaction_key(profile_id, post_id), value or 0)
+
+
+# --- write-through hooks ---
+def post_created(post):
+    store_posts([post])
+    _bump(GEN_HEAD_KEY)
+
+
+def post_deleted(post_id):
+    get_cache().delete(_post_key(post_id))
+    _bump(GEN_ALL_KEY)
+
+
+def post_changed(post_id):
+    get_cache().delete(_post_key(post_id))
+
+
+def reaction_changed(profile_id, post_id, value):
+    """Patch the viewer's overlay; `value` is 1, -1 or None when the reaction was removed."""
+    get_cache().set(_reaction_key(profile_id, post_id), value or 0)
+
+
+def author_changed(profile):
+    """Author name is part of every post entry; drop that author's entries."""
+    post_ids = Post.objects.filter(author=profile).values_list("pk", flat=True)
+    get_cache().delete_many([_post_key(pk) for pk in post_ids])
@@ -0,0 +1,95 @@
+# core/images.py
+"""
+Resized, metadata-free variants of uploaded images.
+
+Originals can be up to MAX_IMAGE_SIZE; clients get a srcset of
+IMAGE_VARIANT_WIDTHS re-encoded as IMAGE_VARIANT_FORMAT instead. Variants are
+built on the background pool after the upload commits and recorded on the row
+as {"source": <original name>, "widths": {"320": <name>, ...}}.
+"""
+import io
+import os
+
+from PIL import Image, ImageOps
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.utils import timezone
+
+from .models import MediaBlob, Post, Profile
+
+_EXTENSIONS = {"WEBP": ".webp", "JPEG": ".jpg", "PNG": ".png", "AVIF": ".avif"}
+
+
+def build_variants(field_file):
+    """Encode one variant per configured width (never upscaled); returns the variants dict."""
+    image_format = settings.IMAGE_VARIANT_FORMAT.upper()
+    top_level = field_file.name.split("/", 1)[0]  # "posts" / "profiles"
+    stem = os.path.splitext(os.path.basename(field_file.name))[0]
+
+    with field_file.open("rb"), Image.open(field_file) as original:
+        # bake EXIF orientation into the pixels, then drop all metadata by re-encoding
+        image = ImageOps.exif_transpose(original)
+        image = image.convert("RGBA" if image.mode in ("RGBA", "LA", "P") and image_format != "JPEG" else "RGB")
+
+        widths = {}
+        for width in sorted(settings.IMAGE_VARIANT_WIDTHS):
+            target = min(width, image.width)
+            if str(target) in widths:
+                continue
+            variant = image.copy()
+            variant.thumbnail((target, image.height), Image.Resampling.LANCZOS)
+            buffer = io.BytesIO()
+            variant.save(buffer, image_format, quality=settings.IMAGE_VARIANT_QUALITY, optimize=True)
+            name = f"{top_level}/variants/{stem}_w{target}{_EXTENSIONS.get(image_format, '')}"
+            widths[str(target)] = default_storage.save(name, ContentFile(buffer.getvalue()))
+
+    return {"source": field_file.name, "widths": widths}
+
+
+def _process(model, pk, image_field, variants_field):
+    obj = model.objects.filter(pk=pk).first()
+    if obj is None:
+        return False
+    field_file = getattr(obj, image_field)
+    if not needs_variants(field_file, getattr(obj, variants_field)):
+        return False
+
+    # identical content is stored once (core/storage.py); so are its variants
+    blob = MediaBlob.objects.filter(name=field_file.name).first()
+    if blob is not None and blob.variants:
+        variants = {"source": field_file.name, "widths": blob.variants}
+    else:
+        variants = build_variants(field_file)
+        MediaBlob.objects.filter(name=field_file.name).update(variants=variants["widths"])
+
+    # only store them if the image was not replaced while we were working
+    return bool(
+        model.objects.filter(pk=pk, **{image_field: field_file.name})
+        .update(**{variants_field: variants, "updated_at": timezone.now()})
+    )
+
+
+def process_post_image(post_id):
+    if _process(Post, post_id, "image", "image_variants"):
+        from . import feed_cache
+        feed_cache.post_changed(post_id)
+
+
+def process_profile_image(profile_id):
+    _process(Profile, profile_id, "profile_image", "profile_image_variants")
+
+
+def needs_variants(field_file, variants):
+    return bool(field_file) and variants.get("source") != field_file.name
+
+
+def srcset(field_file, variants, request=None):
+    """{width: url} for the variants of `field_file`; empty until they are built."""
+    if not field_file or variants.get("source") != field_file.name:
+        return {}
+    urls = {}
+    for width, name in variants.get("widths", {}).items():
+        url = default_storage.url(name)
+        urls[width] = request.build_absolute_uri(url) if request is not None else url
+    return urls
@@ -0,0 +1,163 @@
+import asyncio
+import random
+import statistics
+import threading
+import time
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from django.db import close_old_connections
+from django.test import AsyncClient, Client, override_settings
+
+from core import feed_cache
+from core.authentication import tokens_for_user
+from core.models import Post
+from core.usernames import bulk_create_users
+
+PREFIX = "bench_async_"
+
+
+class Command(BaseCommand):
+    help = (
+        "Load benchmark of the sync (WSGI, one thread per in-flight request) and "
+        "async (ASGI, one event loop) feed and reaction endpoints, driven in-process "
+        "through Django's test clients. Each path gets the same mix of feed reads "
+        "and reactions at the same concurrency. Run it against PostgreSQL."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--concurrency", type=int, default=32, help="In-flight requests.")
+        parser.add_argument("--requests", type=int, default=4000, help="Requests per path.")
+        parser.add_argument("--users", type=int, default=200)
+        parser.add_argument("--posts", type=int, default=500)
+        parser.add_argument("--react-ratio", type=float, default=0.2, help="Share of requests that react.")
+        parser.add_argument("--paths", default="sync,async")
+        parser.add_argument("--keep", action="store_true", help="Keep the benchmark users and posts.")
+
+    def handle(self, *args, **options):
+        auth_headers, post_ids = self.setup_fixture(options["users"], options["posts"])
+        try:
+            for path in options["paths"].split(","):
+                path = path.strip()
+                if path not in ("sync", "async"):
+                    raise CommandError(f"Unknown path {path!r}; use sync and/or async.")
+                plan = self.make_plan(options["requests"], options["react_ratio"], auth_headers, post_ids)
+                feed_cache.get_cache().clear()
+                run = self.run_sync if path == "sync" else self.run_async
+                # the test clients always send Host: testserver
+                with override_settings(ALLOWED_HOSTS=["testserver"]):
+                    latencies, elapsed = run(plan, options["concurrency"])
+                self.report(path, latencies, elapsed)
+        finally:
+            if not options["keep"]:
+                User.objects.filter(username__startswith=PREFIX).delete()
+
+    def setup_fixture(self, user_count, post_count):
+        User.objects.filter(username__startswith=PREFIX).delete()
+        users = bulk_create_users(User(username=f"{PREFIX}{i}", password="!") for i in range(user_count))
+        rng = random.Random(0)
+        Post.objects.bulk_create(
+            Post(author=rng.choice(users).profile, image="posts/bench.jpg", description=f"bench post {i}")
+            for i in range(post_count)
+        )
+        post_ids = list(Post.objects.filter(author__username__startswith=PREFIX).values_list("pk", flat=True))
+        auth_headers = [{"authorization": f"Bearer {tokens_for_user(user).access_token}"} for user in users]
+        return auth_headers, post_ids
+
+    def make_plan(self, total, react_ratio, auth_headers, post_ids):
+        """The same seeded request mix for both paths: (kind, headers, post_id, reaction)."""
+        rng = random.Random(42)
+        return [
+            (
+                "react" if rng.random() < react_ratio else "feed",
+                rng.choice(auth_headers),
+                rng.choice(post_ids),
+                rng.choice(("like", "dislike")),
+            )
+            for _ in range(total)
+        ]
+
+    # --- sync path: WSGI handler, one thread per in-flight request ---
+    def run_sync(self, plan, concurrency):
+        latencies = []
+        errors = []
+        lock = threading.Lock()
+        position = iter(plan)
+
+        def worker():
+            client = Client()
+            local = []
+            try:
+                while True:
+                    with lock:
+                        item = next(position, None)
+                    if item is None:
+                        break
+                    kind, headers, post_id, reaction = item
+                    started = time.perf_counter()
+                    if kind == "feed":
+                        response = client.get("/api/posts/", headers=headers)
+                    else:
+                        response = client.post(
+                            f"/api/posts/{post_id}/react/", {"reaction": reaction},
+                            content_type="application/json", headers=headers,
+                        )
+                    local.append(time.perf_counter() - started)
+                    if response.status_code != 200:
+                        raise CommandError(f"sync {kind}: HTTP {response.status_code}")
+            except Exception as exc:
+                with lock:
+                    errors.append(exc)
+            finally:
+                close_old_connections()
+                with lock:
+                    latencies.extend(local)
+
+        threads = [threading.Thread(target=worker) for _ in range(concurrency)]
+        started = time.perf_counter()
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        elapsed = time.perf_counter() - started
+        if errors:
+            raise CommandError(f"sync: {len(errors)} worker(s) failed, first error: {errors[0]!r}")
+        return latencies, elapsed
+
+    # --- async path: ASGI handler, one event loop ---
+    def run_async(self, plan, concurrency):
+        return asyncio.run(self._run_async(plan, concurrency))
+
+    async def _run_async(self, plan, concurrency):
+        client = AsyncClient()
+        latencies = []
+        queue = asyncio.Queue()
+        for item in plan:
+            queue.put_nowait(item)
+
+        async def worker():
+            while not queue.empty():
+                kind, headers, post_id, reaction = queue.get_nowait()
+                started = time.perf_counter()
+                if kind == "feed":
+                    response = await client.get("/api/async/posts/", headers=headers)
+                else:
+                    response = await client.post(
+                        f"/api/async/posts/{post_id}/react/", {"reaction": reaction},
+                        content_type="application/json", headers=headers,
+                    )
+                latencies.append(time.perf_counter() - started)
+                if response.status_code != 200:
+                    raise CommandError(f"async {kind}: HTTP {response.status_code}")
+
+        started = time.perf_counter()
+        await asyncio.gather(*(worker() for _ in range(concurrency)))
+        return latencies, time.perf_counter() - started
+
+    def report(self, path, latencies, elapsed):
+        latencies.sort()
+        p99 = latencies[max(int(len(latencies) * 0.99) - 1, 0)]
+        self.stdout.write(
+            f"{path:>5}: {len(latencies) / elapsed:8.1f} req/s  "
+            f"p50 {statistics.median(latencies) * 1000:6.1f} ms  p99 {p99 * 1000:6.1f} ms"
+        )
@@ -0,0 +1,156 @@
+import os
+import random
+import statistics
+import threading
+import time
+
+from django.contrib.auth.hashers import make_password
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test import override_settings
+from rest_framework.test import APIRequestFactory, force_authenticate
+
+from core import feed_cache, passwords
+from core.models import Post
+from core.usernames import bulk_create_users
+from core.views import LoginView, PostListCreateView
+
+PREFIX = "bench_login_"
+PASSWORD = "bench-login-password"
+
+
+class Command(BaseCommand):
+    help = (
+        "Login storm benchmark: login threads hammer LoginView (a share of them "
+        "with wrong passwords) while reader threads fetch the feed, first with "
+        "password hashing on the request threads, then in the process pool. "
+        "Reports logins/s and the feed latency under the storm, next to the "
+        "feed latency without it."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--login-threads", type=int, default=32)
+        parser.add_argument("--feed-threads", type=int, default=8)
+        parser.add_argument("--seconds", type=float, default=10.0, help="Duration of each run.")
+        parser.add_argument("--users", type=int, default=200)
+        parser.add_argument("--bad-ratio", type=float, default=0.2, help="Share of logins with a wrong password.")
+        parser.add_argument("--workers", type=int, default=os.cpu_count() or 1, help="Hashing processes in pool mode.")
+        parser.add_argument("--modes", default="inline,pool")
+        parser.add_argument("--keep", action="store_true", help="Keep the benchmark users and posts.")
+
+    def handle(self, *args, **options):
+        users = self.setup_fixture(options["users"])
+        try:
+            feed = self.run(users, 0, options["feed_threads"], options["seconds"], 0.0)[1]
+            self.report("no logins", None, feed, options["seconds"])
+            for mode in options["modes"].split(","):
+                mode = mode.strip()
+                if mode not in ("inline", "pool"):
+                    raise CommandError(f"Unknown mode {mode!r}; use inline and/or pool.")
+                workers = 0 if mode == "inline" else options["workers"]
+                cache.clear()
+                with override_settings(PASSWORD_HASH_WORKERS=workers):
+                    try:
+                        logins, feed = self.run(
+                            users, options["login_threads"], options["feed_threads"],
+                            options["seconds"], options["bad_ratio"],
+                        )
+                    finally:
+                        passwords.shutdown()
+                self.report(mode, logins, feed, options["seconds"])
+        finally:
+            if not options["keep"]:
+                User.objects.filter(username__startswith=PREFIX).delete()
+
+    def setup_fixture(self, count):
+        User.objects.filter(username__startswith=PREFIX).delete()
+        encoded = make_password(PASSWORD)
+        users = bulk_create_users(User(username=f"{PREFIX}{i}", password=encoded) for i in range(count))
+        Post.objects.bulk_create(
+            Post(author=users[i % count].profile, image="posts/bench.jpg", description=f"bench post {i}")
+            for i in range(100)
+        )
+        return users
+
+    def run(self, users, login_threads, feed_threads, seconds, bad_ratio):
+        """Returns ({status: [latency, ...]} for logins, [latency, ...] for feed reads)."""
+        factory = APIRequestFactory()
+        login_view = LoginView.as_view()
+        feed_view = PostListCreateView.as_view()
+        logins, feed = {}, []
+        errors = []
+        lock = threading.Lock()
+        deadline = time.perf_counter() + seconds
+        feed_cache.get_cache().clear()
+
+        def login_worker(seed):
+            rng = random.Random(seed)
+            local = {}
+            try:
+                while time.perf_counter() < deadline:
+                    # wrong passwords repeat per user, like a client retrying a typo
+                    user = rng.choice(users)
+                    password = PASSWORD if rng.random() >= bad_ratio else f"typo-{user.pk}"
+                    request = factory.post(
+                        "/api/login/", {"username": user.username, "password": password},
+                        format="json", HTTP_HOST="localhost",
+                    )
+                    started = time.perf_counter()
+                    response = login_view(request)
+                    local.setdefault(response.status_code, []).append(time.perf_counter() - started)
+            except Exception as exc:
+                with lock:
+                    errors.append(exc)
+            finally:
+                connection.close()
+                with lock:
+                    for code, latencies in local.items():
+                        logins.setdefault(code, []).extend(latencies)
+
+        def feed_worker(seed):
+            rng = random.Random(seed)
+            local = []
+            try:
+                while time.perf_counter() < deadline:
+                    request = factory.get("/api/posts/", HTTP_HOST="localhost")
+                    force_authenticate(request, user=rng.choice(users))
+                    started = time.perf_counter()
+                    response = feed_view(request)
+                    local.append(time.perf_counter() - started)
+                    if response.status_code != 200:
+                        raise CommandError(f"feed: HTTP {response.status_code}")
+            except Exception as exc:
+                with lock:
+                    errors.append(exc)
+            finally:
+                connection.close()
+                with lock:
+                    feed.extend(local)
+
+        workers = [threading.Thread(target=login_worker, args=(i,)) for i in range(login_threads)]
+        workers += [threading.Thread(target=feed_worker, args=(1000 + i,)) for i in range(feed_threads)]
+        for thread in workers:
+            thread.start()
+        for thread in workers:
+            thread.join()
+        if errors:
+            raise CommandError(f"{len(errors)} worker(s) failed, first error: {errors[0]!r}")
+        return logins, feed
+
+    def report(self, label, logins, feed, seconds):
+        line = f"{label:>9}: "
+        if logins is not None:
+            done = len(logins.get(200, [])) + len(logins.get(400, []))
+            line += (
+                f"{done / seconds:7.1f} logins/s  ({len(logins.get(200, []))} ok, "
+                f"{len(logins.get(400, []))} refused, {len(logins.get(503, []))} shed)  "
+            )
+        feed.sort()
+        p99 = feed[max(int(len(feed) * 0.99) - 1, 0)] if feed else 0.0
+        line += (
+            f"feed {len(feed) / seconds:7.1f} req/s  p50 {statistics.median(feed or [0]) * 1000:6.1f} ms  "
+            f"p99 {p99 * 1000:6.1f} ms"
+        )
+        self.stdout.write(line)
@@ -0,0 +1,111 @@
+import random
+import statistics
+import threading
+import time
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test import override_settings
+from rest_framework.test import APIRequestFactory, force_authenticate
+
+from core.models import Post, PostReaction
+from core.reactions import fold_counter_deltas
+from core.usernames import bulk_create_users
+from core.views import PostReactView
+
+PREFIX = "bench_react_"
+
+
+class Command(BaseCommand):
+    help = (
+        "Concurrent benchmark of PostReactView on one hot post, comparing the "
+        "row-locked counter path with the lock-free delta path. Run it against "
+        "PostgreSQL: SQLite serialises all writers and measures nothing useful."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--threads", type=int, default=16)
+        parser.add_argument("--reactions", type=int, default=5000, help="Reactions per mode.")
+        parser.add_argument("--users", type=int, default=500, help="Distinct reacting users.")
+        parser.add_argument("--modes", default="locked,deltas")
+        parser.add_argument("--keep", action="store_true", help="Keep the benchmark users and post.")
+
+    def handle(self, *args, **options):
+        profiles, post = self.setup_fixture(options["users"])
+        try:
+            for mode in options["modes"].split(","):
+                self.run_mode(mode.strip(), profiles, post, options["threads"], options["reactions"])
+        finally:
+            if not options["keep"]:
+                User.objects.filter(username__startswith=PREFIX).delete()
+
+    def setup_fixture(self, count):
+        User.objects.filter(username__startswith=PREFIX).delete()
+        users = bulk_create_users(User(username=f"{PREFIX}{i}", password="!") for i in range(count))
+        post = Post.objects.create(author=users[0].profile, image="posts/bench.jpg", description="hot post")
+        return users, post
+
+    def run_mode(self, mode, users, post, threads, total):
+        PostReaction.objects.filter(post=post).delete()
+        Post.objects.filter(pk=post.pk).update(likes_count=0, dislikes_count=0)
+
+        factory = APIRequestFactory()
+        view = PostReactView.as_view()
+        latencies = []
+        errors = []
+        lock = threading.Lock()
+
+        def worker(seed, count):
+            rng = random.Random(seed)
+            local = []
+            try:
+                for _ in range(count):
+                    request = factory.post(
+                        f"/api/posts/{post.pk}/react/",
+                        {"reaction": rng.choice(("like", "dislike"))},
+                        format="json",
+                        HTTP_HOST="localhost",
+                    )
+                    force_authenticate(request, user=rng.choice(users))
+                    started = time.perf_counter()
+                    response = view(request, pk=post.pk)
+                    local.append(time.perf_counter() - started)
+                    if response.status_code != 200:
+                        raise CommandError(f"{mode}: HTTP {response.status_code} {response.data}")
+            except Exception as exc:
+                with lock:
+                    errors.append(exc)
+            finally:
+                connection.close()
+                with lock:
+                    latencies.extend(local)
+
+        with override_settings(REACTION_COUNTER_MODE=mode):
+            workers = [
+                threading.Thread(target=worker, args=(i, total // threads + (i < total % threads)))
+                for i in range(threads)
+            ]
+            started = time.perf_counter()
+            for thread in workers:
+                thread.start()
+            for thread in workers:
+                thread.join()
+            elapsed = time.perf_counter() - started
+        if errors:
+            raise CommandError(f"{mode}: {len(errors)} worker(s) failed, first error: {errors[0]!r}")
+
+        while fold_counter_deltas():
+            pass
+        post.refresh_from_db()
+        likes = PostReaction.objects.filter(post=post, reaction=1).count()
+        dislikes = PostReaction.objects.filter(post=post, reaction=-1).count()
+        consistent = (post.likes_count, post.dislikes_count) == (likes, dislikes)
+
+        latencies.sort()
+        p99 = latencies[max(int(len(latencies) * 0.99) - 1, 0)]
+        self.stdout.write(
+            f"{mode:>7}: {len(latencies) / elapsed:8.1f} reactions/s  "
+            f"p50 {statistics.median(latencies) * 1000:6.1f} ms  p99 {p99 * 1000:6.1f} ms  "
+            f"counters {'consistent' if consistent else 'DRIFTED'}"
+        )
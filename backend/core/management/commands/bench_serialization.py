@@ -0,0 +1,95 @@
+import time
+
+from django.contrib.auth.models import AnonymousUser
+from django.core.management.base import BaseCommand
+from django.test import RequestFactory, override_settings
+from django.utils import timezone
+from rest_framework.renderers import JSONRenderer
+
+from core import feed_cache, renderers
+from core.models import Post, Profile
+from core.serializers import PostSerializer
+from core.serializers_fast import POST_FIELDS, posts_data
+
+
+class Command(BaseCommand):
+    help = (
+        "Microbenchmark of feed serialization over in-memory posts (no database): "
+        "DRF PostSerializer + stdlib JSON against the precompiled path, sparse "
+        "fieldsets and the orjson / MessagePack renderers. Reports CPU time per "
+        "page and payload size."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--posts", type=int, default=1000)
+        parser.add_argument("--rounds", type=int, default=20)
+        parser.add_argument(
+            "--fields", default="id,author,image,description,likes_count,dislikes_count,user_reaction",
+            help="Sparse fieldset to measure.",
+        )
+
+    def handle(self, *args, **options):
+        posts = self.make_posts(options["posts"])
+        fields = tuple(name for name in POST_FIELDS if name in options["fields"].split(","))
+        request = RequestFactory().get("/api/posts/")
+        request.user = AnonymousUser()
+        reactions = {post.pk: (1, -1, 0)[post.pk % 3] for post in posts}
+        post_ids = [post.pk for post in posts]
+
+        with override_settings(ALLOWED_HOSTS=["testserver"]):
+            cached = {item["id"]: item for item in posts_data(posts)}
+
+            def drf():
+                data = PostSerializer(
+                    posts, many=True, context={"request": request, "user_reactions": reactions}
+                ).data
+                return JSONRenderer().render(data)
+
+            def fast(fields=None, render=renderers.dumps):
+                def run():
+                    return render(feed_cache.assemble(request, post_ids, cached, reactions, fields))
+                return run
+
+            cases = [
+                ("cache fill: DRF PostSerializer", lambda: PostSerializer(posts, many=True).data, False),
+                ("cache fill: serializers_fast", lambda: posts_data(posts), False),
+                ("page: DRF + stdlib JSON", drf, True),
+                ("page: assemble + stdlib JSON", fast(render=JSONRenderer().render), True),
+                ("page: assemble + orjson" if renderers.orjson else "page: assemble (no orjson)", fast(), True),
+                (f"page: ?fields ({len(fields)}) + orjson", fast(fields), True),
+            ]
+            if renderers.msgpack is not None:
+                packer = renderers.MessagePackRenderer().render
+                cases.append(("page: assemble + msgpack", fast(render=packer), True))
+                cases.append((f"page: ?fields ({len(fields)}) + msgpack", fast(fields, packer), True))
+
+            self.stdout.write(f"{len(posts)} posts, best of {options['rounds']} rounds")
+            for label, func, rendered in cases:
+                best, output = self.measure(func, options["rounds"])
+                size = f"{len(output) / 1024:9.1f} KiB" if rendered else ""
+                self.stdout.write(f"{label:<36} {best * 1000:8.2f} ms {size}")
+
+    def make_posts(self, count):
+        now = timezone.now()
+        authors = [Profile(pk=i, username=f"author_{i}") for i in range(1, 51)]
+        posts = []
+        for i in range(1, count + 1):
+            variants = {
+                "source": f"posts/{i}.jpg",
+                "widths": {str(width): f"posts/variants/{i}_{width}.webp" for width in (320, 640, 1080)},
+            }
+            post = Post(
+                pk=i, author=authors[i % len(authors)], image=f"posts/{i}.jpg", image_variants=variants,
+                description=f"post number {i} " * 4, likes_count=i * 7 % 500, dislikes_count=i % 40,
+                created_at=now, updated_at=now,
+            )
+            posts.append(post)
+        return posts
+
+    def measure(self, func, rounds):
+        best, output = float("inf"), None
+        for _ in range(rounds):
+            started = time.process_time()
+            output = func()
+            best = min(best, time.process_time() - started)
+        return best, output
@@ -0,0 +1,331 @@
+import http.client
+import io
+import json
+import math
+import random
+import statistics
+import threading
+import time
+import uuid
+from datetime import datetime, timezone
+from urllib.parse import urlsplit
+
+from PIL import Image
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+
+from core.authentication import tokens_for_user
+from core.models import Post
+
+SCENARIOS = ("login", "feed_first", "feed_deep", "react_hot", "react_cold", "upload")
+
+
+class HttpClient:
+    """One keep-alive connection to the server under test (one per benchmark thread)."""
+
+    def __init__(self, base_url, timeout):
+        parts = urlsplit(base_url)
+        self.connection_class = http.client.HTTPSConnection if parts.scheme == "https" else http.client.HTTPConnection
+        self.netloc = parts.netloc
+        self.prefix = parts.path.rstrip("/")
+        self.timeout = timeout
+        self.connection = None
+
+    def request(self, method, path, body=None, headers=None):
+        for attempt in (0, 1):
+            if self.connection is None:
+                self.connection = self.connection_class(self.netloc, timeout=self.timeout)
+            try:
+                self.connection.request(method, self.prefix + path, body=body, headers=headers or {})
+                response = self.connection.getresponse()
+                return response.status, response.headers, response.read()
+            except (http.client.HTTPException, OSError):
+                self.connection.close()
+                self.connection = None
+                if attempt:
+                    raise
+
+    def close(self):
+        if self.connection is not None:
+            self.connection.close()
+
+
+def path_of(url):
+    parts = urlsplit(url)
+    return parts.path + (f"?{parts.query}" if parts.query else "")
+
+
+def percentile(ordered, pct):
+    """Nearest-rank percentile of an ascending list."""
+    if not ordered:
+        return 0.0
+    return ordered[max(math.ceil(pct / 100 * len(ordered)) - 1, 0)]
+
+
+def multipart(fields, files):
+    boundary = uuid.uuid4().hex
+    body = io.BytesIO()
+    for name, value in fields.items():
+        body.write(f'--{boundary}\r\nContent-Disposition: form-data; name="{name}"\r\n\r\n{value}\r\n'.encode())
+    for name, (filename, content_type, data) in files.items():
+        body.write(
+            f'--{boundary}\r\nContent-Disposition: form-data; name="{name}"; filename="{filename}"\r\n'
+            f"Content-Type: {content_type}\r\n\r\n".encode()
+        )
+        body.write(data)
+        body.write(b"\r\n")
+    body.write(f"--{boundary}--\r\n".encode())
+    return body.getvalue(), f"multipart/form-data; boundary={boundary}"
+
+
+class Command(BaseCommand):
+    help = (
+        "HTTP benchmark of the core API against a running server and the dataset "
+        "from manage.py generate_data (same database and SECRET_KEY as the server). "
+        "Reports p50/p95/p99 latency, throughput and SQL queries per request "
+        "(start the server with QUERY_COUNT_HEADER=True), writes the results as "
+        "JSON and fails when they regress against a stored baseline."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--base-url", default="http://127.0.0.1:8000")
+        parser.add_argument("--scenarios", default=",".join(SCENARIOS))
+        parser.add_argument("--requests", type=int, default=500, help="Measured requests per scenario.")
+        parser.add_argument("--warmup", type=int, default=20, help="Unmeasured requests per scenario.")
+        parser.add_argument("--concurrency", type=int, default=8)
+        parser.add_argument("--timeout", type=float, default=30.0)
+        parser.add_argument("--prefix", default="gen_", help="Login name prefix of the generated users.")
+        parser.add_argument("--password", default="password123", help="Password of the generated users.")
+        parser.add_argument("--users", type=int, default=100, help="Generated users to act as.")
+        parser.add_argument("--deep-pages", type=int, default=50, help="Feed depth of the feed_deep scenario.")
+        parser.add_argument("--seed", type=int, default=0)
+        parser.add_argument("--output", default="benchmark-results.json")
+        parser.add_argument("--baseline", help="Compare against this results file; fail on regressions.")
+        parser.add_argument("--save-baseline", help="Also write the results to this baseline file.")
+        parser.add_argument("--latency-tolerance", type=float, default=0.20, help="Allowed p95 increase (ratio).")
+        parser.add_argument("--throughput-tolerance", type=float, default=0.20, help="Allowed throughput drop (ratio).")
+
+    def handle(self, *args, **options):
+        scenarios = [name.strip() for name in options["scenarios"].split(",") if name.strip()]
+        unknown = set(scenarios) - set(SCENARIOS)
+        if unknown:
+            raise CommandError(f"Unknown scenarios: {', '.join(sorted(unknown))}")
+
+        self.options = options
+        self.rng = random.Random(options["seed"])
+        self.setup_fixture()
+
+        results = {}
+        for name in scenarios:
+            results[name] = self.run_scenario(name)
+            self.print_row(name, results[name])
+        self.cleanup()
+
+        report = {
+            "meta": {
+                "base_url": options["base_url"],
+                "concurrency": options["concurrency"],
+                "requests": options["requests"],
+                "seed": options["seed"],
+                "finished_at": datetime.now(timezone.utc).isoformat(),
+            },
+            "scenarios": results,
+        }
+        for path in filter(None, (options["output"], options["save_baseline"])):
+            with open(path, "w") as handle:
+                json.dump(report, handle, indent=2)
+        self.stdout.write(f"Results written to {options['output']}")
+
+        if options["baseline"]:
+            self.compare(results, options["baseline"])
+
+    # --- fixture ---
+    def setup_fixture(self):
+        options = self.options
+        users = list(
+            get_user_model().objects.filter(username__startswith=options["prefix"], is_active=True)
+            .select_related("profile").order_by("pk")[:options["users"]]
+        )
+        if not users:
+            raise CommandError(f"No users with prefix {options['prefix']!r}; run manage.py generate_data first.")
+        self.usernames = [user.username for user in users]
+        self.auth_headers = [{"Authorization": f"Bearer {tokens_for_user(user).access_token}"} for user in users]
+
+        hot = Post.objects.order_by("-likes_count", "-pk").values_list("pk", flat=True).first()
+        if hot is None:
+            raise CommandError("No posts; run manage.py generate_data first.")
+        self.hot_post = hot
+        self.cold_posts = list(
+            Post.objects.filter(likes_count=0, dislikes_count=0).order_by("created_at").values_list("pk", flat=True)[:500]
+        ) or list(Post.objects.order_by("created_at").values_list("pk", flat=True)[:500])
+
+        self.deep_path = self.find_deep_page(options["deep_pages"])
+
+        self.images = []
+        for _ in range(50):
+            buffer = io.BytesIO()
+            color = tuple(self.rng.randrange(256) for _ in range(3))
+            Image.new("RGB", (800, 600), color).save(buffer, "JPEG", quality=85)
+            self.images.append(buffer.getvalue())
+        self.uploaded = []
+        self.uploaded_lock = threading.Lock()
+
+    def find_deep_page(self, depth):
+        client = HttpClient(self.options["base_url"], self.options["timeout"])
+        path = "/api/posts/"
+        try:
+            for _ in range(depth):
+                status, _, body = client.request("GET", path, headers=self.auth_headers[0])
+                if status != 200:
+                    raise CommandError(f"GET {path}: HTTP {status}")
+                next_url = json.loads(body)["next"]
+                if not next_url:
+                    break
+                path = path_of(next_url)
+        finally:
+            client.close()
+        return path
+
+    # --- scenarios: each returns (method, path, body, headers, expected status) ---
+    def build_request(self, name, rng):
+        headers = dict(rng.choice(self.auth_headers))
+        if name == "login":
+            body = json.dumps({"username": rng.choice(self.usernames), "password": self.options["password"]})
+            return "POST", "/api/login/", body, {"Content-Type": "application/json"}, 200
+        if name == "feed_first":
+            return "GET", "/api/posts/", None, headers, 200
+        if name == "feed_deep":
+            return "GET", self.deep_path, None, headers, 200
+        if name in ("react_hot", "react_cold"):
+            post_id = self.hot_post if name == "react_hot" else rng.choice(self.cold_posts)
+            headers["Content-Type"] = "application/json"
+            body = json.dumps({"reaction": rng.choice(("like", "dislike"))})
+            return "POST", f"/api/posts/{post_id}/react/", body, headers, 200
+        # upload
+        body, content_type = multipart(
+            {"description": "benchmark upload"},
+            {"image": ("bench.jpg", "image/jpeg", rng.choice(self.images))},
+        )
+        headers["Content-Type"] = content_type
+        return "POST", "/api/posts/", body, headers, 201
+
+    def run_scenario(self, name):
+        options = self.options
+        plan_rng = random.Random(f"{options['seed']}:{name}")
+        plan = [self.build_request(name, plan_rng) for _ in range(options["warmup"] + options["requests"])]
+
+        warmup_client = HttpClient(options["base_url"], options["timeout"])
+        for request in plan[:options["warmup"]]:
+            self.send(warmup_client, name, request)
+        warmup_client.close()
+
+        samples = []
+        errors = []
+        lock = threading.Lock()
+        position = iter(plan[options["warmup"]:])
+
+        def worker():
+            client = HttpClient(options["base_url"], options["timeout"])
+            local = []
+            try:
+                while True:
+                    with lock:
+                        request = next(position, None)
+                    if request is None:
+                        break
+                    try:
+                        local.append(self.send(client, name, request))
+                    except Exception as exc:
+                        with lock:
+                            errors.append(repr(exc))
+            finally:
+                client.close()
+                with lock:
+                    samples.extend(local)
+
+        threads = [threading.Thread(target=worker) for _ in range(options["concurrency"])]
+        started = time.perf_counter()
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        elapsed = time.perf_counter() - started
+
+        latencies = sorted(latency for latency, _, _ in samples)
+        queries = [count for _, count, _ in samples if count is not None]
+        query_ms = [ms for _, _, ms in samples if ms is not None]
+        result = {
+            "requests": len(samples),
+            "errors": len(errors),
+            "throughput": len(samples) / elapsed if elapsed else 0.0,
+            "mean_ms": statistics.fmean(latencies) * 1000 if latencies else 0.0,
+            "p50_ms": percentile(latencies, 50) * 1000,
+            "p95_ms": percentile(latencies, 95) * 1000,
+            "p99_ms": percentile(latencies, 99) * 1000,
+            "queries_per_request": statistics.fmean(queries) if queries else None,
+            "query_ms_per_request": statistics.fmean(query_ms) if query_ms else None,
+        }
+        if errors:
+            result["first_error"] = errors[0]
+        return result
+
+    def send(self, client, name, request):
+        method, path, body, headers, expected = request
+        started = time.perf_counter()
+        status, response_headers, response_body = client.request(method, path, body, headers)
+        latency = time.perf_counter() - started
+        if status != expected:
+            raise CommandError(f"{name}: {method} {path} -> HTTP {status}: {response_body[:200]!r}")
+        if name == "upload":
+            with self.uploaded_lock:
+                self.uploaded.append((json.loads(response_body)["id"], headers["Authorization"]))
+        count = response_headers.get("X-Query-Count")
+        query_ms = response_headers.get("X-Query-Time")
+        return latency, int(count) if count else None, float(query_ms) if query_ms else None
+
+    def cleanup(self):
+        """Delete the uploaded posts through the API, so the server's caches stay right."""
+        if not self.uploaded:
+            return
+        client = HttpClient(self.options["base_url"], self.options["timeout"])
+        try:
+            for post_id, authorization in self.uploaded:
+                client.request("DELETE", f"/api/posts/{post_id}/", headers={"Authorization": authorization})
+        finally:
+            client.close()
+
+    # --- reporting ---
+    def print_row(self, name, result):
+        queries = result["queries_per_request"]
+        self.stdout.write(
+            f"{name:>11}: {result['throughput']:8.1f} req/s  p50 {result['p50_ms']:7.1f} ms  "
+            f"p95 {result['p95_ms']:7.1f} ms  p99 {result['p99_ms']:7.1f} ms  "
+            f"queries {'-' if queries is None else f'{queries:5.1f}'}  errors {result['errors']}"
+        )
+
+    def compare(self, results, baseline_path):
+        with open(baseline_path) as handle:
+            baseline = json.load(handle)["scenarios"]
+
+        regressions = []
+        for name, result in results.items():
+            before = baseline.get(name)
+            if before is None:
+                continue
+            if result["errors"]:
+                regressions.append(f"{name}: {result['errors']} errors")
+            if before["p95_ms"] and result["p95_ms"] > before["p95_ms"] * (1 + self.options["latency_tolerance"]):
+                regressions.append(f"{name}: p95 {before['p95_ms']:.1f} -> {result['p95_ms']:.1f} ms")
+            if result["throughput"] < before["throughput"] * (1 - self.options["throughput_tolerance"]):
+                regressions.append(f"{name}: throughput {before['throughput']:.1f} -> {result['throughput']:.1f} req/s")
+            if (
+                before.get("queries_per_request") is not None and result["queries_per_request"] is not None
+                and result["queries_per_request"] > before["queries_per_request"] + 0.5
+            ):
+                regressions.append(
+                    f"{name}: queries/request {before['queries_per_request']:.1f} -> {result['queries_per_request']:.1f}"
+                )
+
+        if regressions:
+            raise CommandError("Regressions against the baseline:\n  " + "\n  ".join(regressions))
+        self.stdout.write(self.style.SUCCESS(f"No regressions against {baseline_path}."))
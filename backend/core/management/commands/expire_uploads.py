@@ -0,0 +1,24 @@
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from core.uploads import expire_uploads
+
+
+class Command(BaseCommand):
+    help = (
+        "Delete resumable uploads that were never completed and have not received "
+        "a chunk for --hours (UPLOAD_EXPIRY_HOURS by default), with their partial "
+        "files, and partial files no upload refers to. Run it periodically (cron)."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--hours", type=float, default=None)
+
+    def handle(self, *args, **options):
+        hours = options["hours"] if options["hours"] is not None else settings.UPLOAD_EXPIRY_HOURS
+        expired, orphans = expire_uploads(timedelta(hours=hours))
+        self.stdout.write(self.style.SUCCESS(
+            f"Expired {expired} upload(s) idle for {hours:g}h and {orphans} orphaned partial file(s)."
+        ))
@@ -0,0 +1,30 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from core.reactions import fold_counter_deltas
+
+
+class Command(BaseCommand):
+    help = "Fold pending PostCounterDelta rows into Post.likes_count / Post.dislikes_count."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, default=10000)
+        parser.add_argument(
+            "--interval", type=float, default=0,
+            help="Keep running, folding every N seconds (default: fold once and exit).",
+        )
+
+    def handle(self, *args, **options):
+        while True:
+            updated = 0
+            while True:
+                changed = fold_counter_deltas(options["batch_size"])
+                if not changed:
+                    break
+                updated += len(changed)
+            if options["verbosity"] > 1 or not options["interval"]:
+                self.stdout.write(f"Folded counter deltas ({updated} post update(s)).")
+            if not options["interval"]:
+                return
+            time.sleep(options["interval"])
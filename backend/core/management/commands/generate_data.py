@@ -0,0 +1,257 @@
+import io
+import math
+import random
+import time
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import contextmanager
+from datetime import timedelta
+
+import django
+from PIL import Image
+from django.contrib.auth import get_user_model
+from django.contrib.auth.hashers import make_password
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, connections, transaction
+from django.db.models import F
+from django.utils import timezone
+
+from core.ranking import hot_score
+
+# Models are imported inside the functions: spawned worker processes import
+# this module before django.setup() has run.
+
+WORDS = (
+    "sunset beach mountain city coffee street night river forest garden friends "
+    "travel food music art dog cat winter summer morning rain snow bridge market "
+    "festival train road lake sky cloud flower book museum concert park ocean"
+).split()
+
+# per-process state for the post workers, filled by _init_worker
+_worker = {}
+
+
+@contextmanager
+def explicit_timestamps(*models):
+    """Let bulk_create keep the created_at / updated_at we set instead of stamping now()."""
+    fields = [
+        field for model in models for field in model._meta.concrete_fields
+        if getattr(field, "auto_now", False) or getattr(field, "auto_now_add", False)
+    ]
+    saved = [(field, field.auto_now, field.auto_now_add) for field in fields]
+    for field in fields:
+        field.auto_now = field.auto_now_add = False
+    try:
+        yield
+    finally:
+        for field, auto_now, auto_now_add in saved:
+            field.auto_now, field.auto_now_add = auto_now, auto_now_add
+
+
+def _init_worker(profile_ids, images, options):
+    if not django.apps.apps.ready:  # spawned process
+        django.setup()
+    _worker.update(profile_ids=profile_ids, images=images, options=options)
+
+
+def _generate_posts(chunk):
+    """
+    Insert one chunk of posts with their reactions; the counters are computed
+    from the generated reactions, so they are consistent by construction.
+    Returns (posts, reactions, {image name: posts using it}).
+    """
+    from core.models import Post, PostReaction
+
+    index, first, count = chunk
+    options = _worker["options"]
+    profile_ids = _worker["profile_ids"]
+    images = _worker["images"]
+    rng = random.Random(f"{options['seed']}:{index}")  # same data whatever --workers is
+
+    start = options["start"]
+    step = options["span"] / max(options["posts"], 1)
+    mean = options["reactions"] / max(options["posts"], 1)
+
+    posts, post_reactions, image_counts = [], [], {}
+    for position in range(first, first + count):
+        created = start + timedelta(seconds=position * step + rng.random() * step)
+        reactors = rng.sample(profile_ids, min(int(rng.expovariate(1 / mean)) if mean else 0, len(profile_ids)))
+        values = [1 if rng.random() < options["like_ratio"] else -1 for _ in reactors]
+        image = rng.choice(images)
+        image_counts[image["name"]] = image_counts.get(image["name"], 0) + 1
+        likes, dislikes = values.count(1), values.count(-1)
+        posts.append(Post(
+            author_id=rng.choice(profile_ids),
+            image=image["name"],
+            image_variants=image["variants"],
+            description=" ".join(rng.choices(WORDS, k=rng.randint(3, 12))),
+            likes_count=likes,
+            dislikes_count=dislikes,
+            hot_score=hot_score(likes, dislikes, created),
+            created_at=created,
+            updated_at=created,
+        ))
+        post_reactions.append(list(zip(reactors, values)))
+
+    with explicit_timestamps(Post, PostReaction), transaction.atomic():
+        Post.objects.bulk_create(posts, batch_size=options["batch_size"])
+        rows = []
+        for post, reactions in zip(posts, post_reactions):
+            for profile_id, value in reactions:
+                reacted = min(post.created_at + timedelta(seconds=rng.random() * 86400), options["now"])
+                rows.append((profile_id, post.pk, value, reacted, reacted))
+        _insert_reactions(rows, options["batch_size"])
+
+    connection.close()
+    return len(posts), len(rows), image_counts
+
+
+def _insert_reactions(rows, batch_size):
+    from core.models import PostReaction
+
+    if connection.vendor == "postgresql":
+        with connection.cursor() as cursor:
+            raw = cursor.cursor
+            if hasattr(raw, "copy"):  # psycopg 3
+                table = PostReaction._meta.db_table
+                with raw.copy(f"COPY {table} (user_id, post_id, reaction, created_at, updated_at) FROM STDIN") as copy:
+                    for row in rows:
+                        copy.write_row(row)
+                return
+    PostReaction.objects.bulk_create(
+        (PostReaction(user_id=u, post_id=p, reaction=r, created_at=c, updated_at=m) for u, p, r, c, m in rows),
+        batch_size=batch_size,
+    )
+
+
+class Command(BaseCommand):
+    help = (
+        "Generate a reproducible synthetic dataset: users with profiles, posts "
+        "and reactions, inserted in batches (bulk_create, COPY for reactions on "
+        "PostgreSQL with psycopg 3) with likes_count / dislikes_count matching "
+        "the reactions. All generated users share one password (--password)."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--users", type=int, default=10000)
+        parser.add_argument("--posts", type=int, default=100000)
+        parser.add_argument("--reactions", type=int, default=1000000, help="Approximate total reactions.")
+        parser.add_argument("--like-ratio", type=float, default=0.8)
+        parser.add_argument("--days", type=int, default=90, help="Spread post creation over this many days.")
+        parser.add_argument("--images", type=int, default=8, help="Distinct placeholder images.")
+        parser.add_argument("--batch-size", type=int, default=2000)
+        parser.add_argument("--workers", type=int, default=1, help="Processes inserting posts and reactions.")
+        parser.add_argument("--seed", type=int, default=0)
+        parser.add_argument("--prefix", default="gen_", help="Login name prefix of generated users.")
+        parser.add_argument("--password", default="password123")
+        parser.add_argument("--flush", action="store_true", help="Delete earlier data with the same prefix first.")
+
+    def handle(self, *args, **options):
+        from core import feed_cache
+
+        User = get_user_model()
+        if options["users"] <= 0:
+            raise CommandError("--users must be positive.")
+        prefix = options["prefix"]
+        if options["flush"]:
+            self.stdout.write("Deleting earlier generated data...")
+            User.objects.filter(username__startswith=prefix).delete()
+        elif User.objects.filter(username__startswith=prefix).exists():
+            raise CommandError(f"Users with prefix {prefix!r} exist; pass --flush or another --prefix.")
+
+        started = time.perf_counter()
+        profile_ids = self.create_users(options)
+        self.stdout.write(f"{len(profile_ids)} users in {time.perf_counter() - started:.1f}s")
+
+        images = self.seed_images(options["images"], options["seed"])
+        now = timezone.now()
+        worker_options = {
+            "seed": options["seed"], "posts": options["posts"], "reactions": options["reactions"],
+            "like_ratio": options["like_ratio"], "batch_size": options["batch_size"],
+            "start": now - timedelta(days=options["days"]), "span": options["days"] * 86400, "now": now,
+        }
+        size = options["batch_size"]
+        chunks = [
+            (index, index * size, min(size, options["posts"] - index * size))
+            for index in range(math.ceil(options["posts"] / size))
+        ]
+
+        started = time.perf_counter()
+        totals = [0, 0]
+        image_counts = {}
+        for posts, reactions, counts in self.run_chunks(chunks, profile_ids, images, worker_options, options["workers"]):
+            totals[0] += posts
+            totals[1] += reactions
+            for name, count in counts.items():
+                image_counts[name] = image_counts.get(name, 0) + count
+            self.stdout.write(f"  {totals[0]} posts, {totals[1]} reactions", ending="\r")
+        elapsed = time.perf_counter() - started
+
+        self.add_media_refs(image_counts)
+        self.count_author_stats(profile_ids, options["batch_size"])
+        feed_cache.get_cache().clear()
+        self.stdout.write(self.style.SUCCESS(
+            f"{totals[0]} posts and {totals[1]} reactions in {elapsed:.1f}s "
+            f"({(totals[0] + totals[1]) / max(elapsed, 1e-9):.0f} rows/s)"
+        ))
+
+    def create_users(self, options):
+        from core.usernames import bulk_create_users
+
+        User = get_user_model()
+        password = make_password(options["password"])  # hashed once, shared
+        profile_ids = []
+        for first in range(0, options["users"], options["batch_size"]):
+            last = min(first + options["batch_size"], options["users"])
+            users = bulk_create_users(
+                (User(username=f"{options['prefix']}{i}", email=f"{options['prefix']}{i}@example.com", password=password)
+                 for i in range(first, last)),
+                batch_size=options["batch_size"],
+            )
+            profile_ids.extend(user.profile.pk for user in users)
+        return profile_ids
+
+    def seed_images(self, count, seed):
+        """Placeholder images shared by all posts, with their variants built once."""
+        from core.images import build_variants
+        from core.models import MediaBlob, Post
+
+        rng = random.Random(seed)
+        images = []
+        for i in range(count):
+            buffer = io.BytesIO()
+            color = tuple(rng.randrange(256) for _ in range(3))
+            Image.new("RGB", (1200, 900), color).save(buffer, "JPEG", quality=85)
+            name = default_storage.save(f"posts/generated_{i}.jpg", ContentFile(buffer.getvalue()))
+            variants = build_variants(Post(image=name).image)
+            MediaBlob.objects.get_or_create(name=name)
+            MediaBlob.objects.filter(name=name).update(variants=variants["widths"])
+            images.append({"name": name, "variants": variants})
+        return images
+
+    def run_chunks(self, chunks, profile_ids, images, worker_options, workers):
+        if workers <= 1:
+            _init_worker(profile_ids, images, worker_options)
+            for chunk in chunks:
+                yield _generate_posts(chunk)
+            return
+        connections.close_all()  # never share a connection with the child processes
+        with ProcessPoolExecutor(
+            max_workers=workers, initializer=_init_worker, initargs=(profile_ids, images, worker_options)
+        ) as pool:
+            yield from pool.map(_generate_posts, chunks)
+
+    def count_author_stats(self, profile_ids, batch_size):
+        # bulk_create also skips Post.save, which keeps the authors' totals (core/profile_stats.py)
+        from core.profile_stats import reconcile_profiles
+
+        for first in range(0, len(profile_ids), batch_size):
+            reconcile_profiles(profile_ids[first:first + batch_size])
+
+    def add_media_refs(self, image_counts):
+        # bulk_create skips the signals that keep MediaBlob.refcount (core/signals.py)
+        from core.models import MediaBlob
+
+        for name, count in image_counts.items():
+            MediaBlob.objects.filter(name=name).update(refcount=F("refcount") + count)
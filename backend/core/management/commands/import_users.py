@@ -0,0 +1,59 @@
+import csv
+
+from django.contrib.auth import get_user_model
+from django.contrib.auth.hashers import make_password
+from django.core.management.base import BaseCommand, CommandError
+
+from core.usernames import bulk_create_users
+
+User = get_user_model()
+
+
+class Command(BaseCommand):
+    help = (
+        "Bulk signup: create users and their profiles from a CSV file with "
+        "username,email,password columns (password may be empty for an "
+        "unusable one). Rows whose login name already exists are skipped."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("csv_file")
+        parser.add_argument("--batch-size", type=int, default=1000)
+
+    def handle(self, *args, **options):
+        created = skipped = 0
+        with open(options["csv_file"], newline="", encoding="utf-8") as handle:
+            reader = csv.DictReader(handle)
+            if not reader.fieldnames or "username" not in reader.fieldnames:
+                raise CommandError("The CSV file needs a header row with at least a username column.")
+
+            batch = []
+            for row in reader:
+                batch.append(row)
+                if len(batch) >= options["batch_size"]:
+                    done, ignored = self.import_batch(batch, options["batch_size"])
+                    created, skipped = created + done, skipped + ignored
+                    batch = []
+            if batch:
+                done, ignored = self.import_batch(batch, options["batch_size"])
+                created, skipped = created + done, skipped + ignored
+
+        self.stdout.write(self.style.SUCCESS(f"Created {created} users, skipped {skipped}."))
+
+    def import_batch(self, rows, batch_size):
+        names = {row["username"].strip() for row in rows}
+        existing = set(User.objects.filter(username__in=names).values_list("username", flat=True))
+
+        users = []
+        for row in rows:
+            username = row["username"].strip()
+            if not username or username in existing:
+                continue
+            existing.add(username)
+            users.append(User(
+                username=username,
+                email=(row.get("email") or "").strip(),
+                password=make_password(row.get("password") or None),
+            ))
+        bulk_create_users(users, batch_size=batch_size)
+        return len(users), len(rows) - len(users)
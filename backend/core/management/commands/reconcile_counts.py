@@ -0,0 +1,97 @@
+import time
+from pathlib import Path
+
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+from core import profile_stats
+from core.reactions import reconcile_counts
+
+
+class Command(BaseCommand):
+    help = (
+        "Recompute Post.likes_count / dislikes_count from the reactions, in "
+        "batches of one grouped query each, and fix (or with --dry-run only "
+        "report) the posts that drifted. With --since or --watermark-file only "
+        "posts whose counters changed since then are checked. --profiles then "
+        "also audits the authors' posts_count / likes_received / dislikes_received."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--since", help="ISO 8601 timestamp; check posts changed at or after it.")
+        parser.add_argument(
+            "--watermark-file",
+            help="Read --since from this file and store the start time of a successful run in it.",
+        )
+        parser.add_argument("--batch-size", type=int, default=1000)
+        parser.add_argument("--dry-run", action="store_true", help="Report drift without fixing it.")
+        parser.add_argument(
+            "--rescore", action="store_true",
+            help="Also recompute Post.hot_score (needed after changing core/ranking.py).",
+        )
+        parser.add_argument(
+            "--profiles", action="store_true",
+            help="Afterwards reconcile every profile's post and reaction totals against its posts.",
+        )
+
+    def handle(self, *args, **options):
+        since = self.parse_since(options)
+        started_at = timezone.now()
+        started = time.perf_counter()
+
+        checked = drifted = 0
+        for count, drifts in reconcile_counts(
+            since, options["batch_size"], options["dry_run"], options["rescore"],
+        ):
+            checked += count
+            drifted += len(drifts)
+            for drift in drifts:
+                self.stdout.write(
+                    f"  post {drift.post_id}: likes {drift.likes_count} -> {drift.likes}, "
+                    f"dislikes {drift.dislikes_count} -> {drift.dislikes}"
+                )
+
+        verb = "would fix" if options["dry_run"] else "fixed"
+        style = self.style.WARNING if drifted else self.style.SUCCESS
+        self.stdout.write(style(
+            f"Checked {checked} posts in {time.perf_counter() - started:.1f}s, {verb} {drifted} drifted."
+        ))
+        if options["profiles"]:
+            self.reconcile_profiles(options)
+        if options["watermark_file"] and not options["dry_run"]:
+            Path(options["watermark_file"]).write_text(started_at.isoformat())
+
+    def reconcile_profiles(self, options):
+        started = time.perf_counter()
+        checked = drifted = 0
+        for count, drifts in profile_stats.reconcile(options["batch_size"], options["dry_run"]):
+            checked += count
+            drifted += len(drifts)
+            for drift in drifts:
+                changes = ", ".join(
+                    f"{field} {stored} -> {expected}"
+                    for field, stored, expected in zip(profile_stats.STAT_FIELDS, drift.stored, drift.expected)
+                    if stored != expected
+                )
+                self.stdout.write(f"  profile {drift.profile_id}: {changes}")
+
+        verb = "would fix" if options["dry_run"] else "fixed"
+        style = self.style.WARNING if drifted else self.style.SUCCESS
+        self.stdout.write(style(
+            f"Checked {checked} profiles in {time.perf_counter() - started:.1f}s, {verb} {drifted} drifted."
+        ))
+
+    def parse_since(self, options):
+        value = options["since"]
+        if value is None and options["watermark_file"]:
+            path = Path(options["watermark_file"])
+            value = path.read_text().strip() if path.exists() else None
+        if value is None:
+            return None
+        since = parse_datetime(value)
+        if since is None:
+            raise CommandError(f"Not an ISO 8601 timestamp: {value!r}")
+        if timezone.is_naive(since):
+            since = timezone.make_aware(since)
+        return since
@@ -0,0 +1,142 @@
+# core/media.py
+"""
+Media serving for /media/ that is fit for production.
+
+- content-addressed names (core/storage.py, `<dir>/ab/<sha256>.<ext>`) get
+  the content hash as a strong ETag and far-future immutable caching
+- older uploads keep their uuid names under posts/ and profiles/ (migration
+  0006); they are still served, with a size + mtime ETag and revalidated on
+  every use. Anything else under MEDIA_ROOT (uploads in progress, stray files)
+  is a 404
+- ETags and Last-Modified are answered with 304 before any file is opened
+- single byte ranges (206 / 416), honouring If-Range
+- the body is handed to the web server when configured (X-Accel-Redirect for
+  nginx, X-Sendfile for Apache/lighttpd); otherwise FileResponse lets the WSGI
+  server use its file wrapper (sendfile where available)
+"""
+import mimetypes
+import os
+import re
+
+from django.conf import settings
+from django.core.exceptions import SuspiciousFileOperation
+from django.http import FileResponse, Http404, HttpResponse, StreamingHttpResponse
+from django.utils._os import safe_join
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date
+from django.views.decorators.http import require_safe
+
+# <directories>/<first two hex digits>/<sha256>[.<extension>]
+_CONTENT_NAME_RE = re.compile(r"^(?:[\w-]+/)+(?P<shard>[0-9a-f]{2})/(?P<digest>(?P=shard)[0-9a-f]{62})(?:\.[a-z0-9]+)?$")
+# names given before content addressing: posts/<uuid hex>.jpg, posts/variants/<uuid hex>_w320.webp, ...
+_LEGACY_NAME_RE = re.compile(r"^(?:posts|profiles)/(?:[\w-]+/)*[\w-]+(?:\.[A-Za-z0-9]+)?$")
+_RANGE_RE = re.compile(r"^bytes=(\d*)-(\d*)$")
+_BLOCK_SIZE = 64 * 1024
+
+
+def _parse_range(header, size):
+    """(start, end) inclusive for a single satisfiable range, None to serve it all, False if unsatisfiable."""
+    match = _RANGE_RE.match(header.replace(" ", ""))
+    if match is None:
+        return None  # malformed or multi-range: ignore it and send the full body
+    first, last = match.groups()
+    if not first and not last:
+        return None
+    if not first:  # suffix range: the last N bytes
+        length = int(last)
+        if length == 0:
+            return False
+        return max(size - length, 0), size - 1
+    start = int(first)
+    end = min(int(last), size - 1) if last else size - 1
+    if start >= size or start > end:
+        return False
+    return start, end
+
+
+def _read_range(path, start, length):
+    with open(path, "rb") as handle:
+        handle.seek(start)
+        while length > 0:
+            block = handle.read(min(_BLOCK_SIZE, length))
+            if not block:
+                break
+            length -= len(block)
+            yield block
+
+
+@require_safe
+def serve_media(request, path):
+    match = _CONTENT_NAME_RE.match(path)
+    if match is None and not _LEGACY_NAME_RE.match(path):
+        raise Http404("Not found.")
+    try:
+        fullpath = safe_join(settings.MEDIA_ROOT, path)
+    except SuspiciousFileOperation:
+        raise Http404("Not found.")
+    try:
+        stat = os.stat(fullpath)
+    except (FileNotFoundError, NotADirectoryError):
+        raise Http404("Not found.")
+    if not os.path.isfile(fullpath):
+        raise Http404("Not found.")
+
+    if match is not None:
+        etag = f'"{match["digest"]}"'
+        cache_control = f"public, max-age={settings.MEDIA_CACHE_MAX_AGE}, immutable"
+    else:
+        etag = f'"{stat.st_size:x}-{stat.st_mtime_ns:x}"'
+        cache_control = "public, no-cache"
+    headers = {
+        "ETag": etag,
+        "Last-Modified": http_date(stat.st_mtime),
+        "Cache-Control": cache_control,
+        "Accept-Ranges": "bytes",
+    }
+
+    response = get_conditional_response(request, etag=etag, last_modified=int(stat.st_mtime))
+    if response is not None:  # 304 / 412
+        for header, value in headers.items():
+            response[header] = value
+        return response
+
+    content_type = mimetypes.guess_type(fullpath)[0] or "application/octet-stream"
+
+    # let the web server send the bytes (it handles Range itself)
+    if settings.MEDIA_ACCEL_REDIRECT_PREFIX:
+        response = HttpResponse(content_type=content_type, headers=headers)
+        response["X-Accel-Redirect"] = settings.MEDIA_ACCEL_REDIRECT_PREFIX.rstrip("/") + "/" + path
+        return response
+    if settings.MEDIA_SENDFILE_HEADER:
+        response = HttpResponse(content_type=content_type, headers=headers)
+        response[settings.MEDIA_SENDFILE_HEADER] = fullpath
+        return response
+
+    byte_range = None
+    range_header = request.headers.get("Range")
+    if range_header and request.headers.get("If-Range", etag) == etag:
+        byte_range = _parse_range(range_header, stat.st_size)
+
+    if byte_range is False:
+        headers["Content-Range"] = f"bytes */{stat.st_size}"
+        return HttpResponse(status=416, headers=headers)
+
+    if request.method == "HEAD":
+        headers["Content-Length"] = str(stat.st_size)
+        return HttpResponse(content_type=content_type, headers=headers)
+
+    if byte_range is not None:
+        start, end = byte_range
+        headers["Content-Range"] = f"bytes {start}-{end}/{stat.st_size}"
+        headers["Content-Length"] = str(end - start + 1)
+        return StreamingHttpResponse(
+            _read_range(fullpath, start, end - start + 1),
+            status=206,
+            content_type=content_type,
+            headers=headers,
+        )
+
+    response = FileResponse(open(fullpath, "rb"), content_type=content_type)
+    for header, value in headers.items():
+        response[header] = value
+    return response
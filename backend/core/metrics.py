@@ -0,0 +1,250 @@
+# core/metrics.py
+"""
+In-process request metrics, exposed in the Prometheus text format at /metrics.
+
+MetricsMiddleware records per view: latency, SQL query count and time,
+serializer time and response size, each into a fixed-bucket histogram (one
+bisect and a lock per observation). SQL is counted by an execute wrapper that
+every new database connection gets; it reports to the request in a context
+variable, so queries the async views run through sync_to_async are counted too.
+Requests above METRICS_QUERY_THRESHOLD queries are logged and counted, which
+makes N+1 regressions visible in production.
+
+Numbers are per process: with several workers, scrape each one (or put them
+behind a multiprocess-aware exporter).
+"""
+import contextvars
+import logging
+import threading
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+
+from django.conf import settings
+from django.db.backends.signals import connection_created
+from django.http import HttpResponse, HttpResponseForbidden
+from django.utils.crypto import constant_time_compare
+
+logger = logging.getLogger(__name__)
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+QUERY_BUCKETS = (0, 1, 2, 3, 5, 8, 13, 21, 34, 55, 89)
+BYTES_BUCKETS = (256, 1024, 4096, 16384, 65536, 262144, 1048576, 4194304)
+
+_current = contextvars.ContextVar("request_metrics", default=None)
+
+
+class Counter:
+    type = "counter"
+
+    def __init__(self, name, documentation, labelnames):
+        self.name, self.documentation, self.labelnames = name, documentation, labelnames
+        self._lock = threading.Lock()
+        self._values = {}
+
+    def inc(self, labels, amount=1):
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0) + amount
+
+    def samples(self):
+        with self._lock:
+            values = dict(self._values)
+        for labels, value in sorted(values.items()):
+            yield self.name, labels, (), value
+
+
+class Histogram:
+    type = "histogram"
+
+    def __init__(self, name, documentation, labelnames, buckets):
+        self.name, self.documentation, self.labelnames = name, documentation, labelnames
+        self.buckets = tuple(buckets)
+        self._lock = threading.Lock()
+        self._series = {}  # labels -> [bucket counts..., +Inf count, sum]
+
+    def observe(self, labels, value):
+        index = bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(labels)
+            if series is None:
+                series = self._series[labels] = [0] * (len(self.buckets) + 2)
+            series[index] += 1
+            series[-1] += value
+
+    def samples(self):
+        with self._lock:
+            snapshot = {labels: list(series) for labels, series in self._series.items()}
+        for labels, series in sorted(snapshot.items()):
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float("inf"),), series):
+                cumulative += count
+                yield self.name + "_bucket", labels, (("le", _format_bound(bound)),), cumulative
+            yield self.name + "_sum", labels, (), series[-1]
+            yield self.name + "_count", labels, (), cumulative
+
+
+def _format_bound(bound):
+    return "+Inf" if bound == float("inf") else repr(float(bound))
+
+
+VIEW = ("view", "method")
+requests_total = Counter("socialnet_requests_total", "Requests by view, method and status.", ("view", "method", "status"))
+request_seconds = Histogram("socialnet_request_duration_seconds", "Request latency.", VIEW, LATENCY_BUCKETS)
+sql_queries = Histogram("socialnet_sql_queries", "SQL queries per request.", VIEW, QUERY_BUCKETS)
+sql_seconds = Histogram("socialnet_sql_duration_seconds", "Time spent in SQL per request.", VIEW, LATENCY_BUCKETS)
+serializer_seconds = Histogram(
+    "socialnet_serializer_duration_seconds", "Time spent in serializers per request.", VIEW, LATENCY_BUCKETS
+)
+response_bytes = Histogram("socialnet_response_bytes", "Response body size.", VIEW, BYTES_BUCKETS)
+query_threshold_exceeded = Counter(
+    "socialnet_query_threshold_exceeded_total", "Requests above METRICS_QUERY_THRESHOLD queries.", VIEW
+)
+REGISTRY = (
+    requests_total, request_seconds, sql_queries, sql_seconds,
+    serializer_seconds, response_bytes, query_threshold_exceeded,
+)
+
+
+class RequestMetrics:
+    __slots__ = ("queries", "sql_seconds", "sections", "_open")
+
+    def __init__(self):
+        self.queries = 0
+        self.sql_seconds = 0.0
+        self.sections = {}
+        self._open = set()
+
+
+@contextmanager
+def collect():
+    """Collect SQL and section timings for one request (also across sync_to_async hops)."""
+    request_metrics = RequestMetrics()
+    token = _current.set(request_metrics)
+    try:
+        yield request_metrics
+    finally:
+        _current.reset(token)
+
+
+# --- SQL ---
+def _record_query(execute, sql, params, many, context):
+    metrics = _current.get()
+    if metrics is None:
+        return execute(sql, params, many, context)
+    started = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        metrics.sql_seconds += time.perf_counter() - started
+        metrics.queries += 1
+
+
+def install_query_recorder(sender, connection, **kwargs):
+    # at the front: `with connection.execute_wrapper(...)` blocks pop the last entry
+    # on exit, and this can run inside one of them (connections open lazily)
+    if _record_query not in connection.execute_wrappers:
+        connection.execute_wrappers.insert(0, _record_query)
+
+
+connection_created.connect(install_query_recorder, dispatch_uid="core.metrics.install_query_recorder")
+
+
+# --- sections (serializer time) ---
+@contextmanager
+def timed(section):
+    """Add the time spent in the block to `section` of the current request; nested blocks count once."""
+    metrics = _current.get()
+    if metrics is None or section in metrics._open:
+        yield
+        return
+    metrics._open.add(section)
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        metrics._open.discard(section)
+        metrics.sections[section] = metrics.sections.get(section, 0.0) + time.perf_counter() - started
+
+
+class TimedSerializerMixin:
+    """Put before the DRF base class; `.data` time is reported as serializer time."""
+
+    @property
+    def data(self):
+        with timed("serializer"):
+            return super().data
+
+
+# --- recording ---
+def view_name(request):
+    match = getattr(request, "resolver_match", None)
+    if match is None:
+        return "unmatched"
+    func = match.func
+    return getattr(getattr(func, "view_class", None), "__name__", None) or getattr(func, "__name__", "unknown")
+
+
+def record(request, response, metrics, elapsed):
+    labels = (view_name(request), request.method)
+    requests_total.inc(labels + (str(response.status_code),))
+    request_seconds.observe(labels, elapsed)
+    sql_queries.observe(labels, metrics.queries)
+    sql_seconds.observe(labels, metrics.sql_seconds)
+    serializer_seconds.observe(labels, metrics.sections.get("serializer", 0.0))
+    if not response.streaming:
+        response_bytes.observe(labels, len(response.content))
+    elif response.has_header("Content-Length"):
+        response_bytes.observe(labels, int(response["Content-Length"]))
+
+    if metrics.queries > settings.METRICS_QUERY_THRESHOLD:
+        query_threshold_exceeded.inc(labels)
+        logger.warning(
+            "%s %s (%s) ran %d SQL queries (threshold %d)",
+            request.method, request.path, labels[0], metrics.queries, settings.METRICS_QUERY_THRESHOLD,
+        )
+
+
+# --- exposition ---
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_value(value):
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+def render_metrics():
+    lines = []
+    for metric in REGISTRY + (_feed_cache_metric(),):
+        lines.append(f"# HELP {metric.name} {metric.documentation}")
+        lines.append(f"# TYPE {metric.name} {metric.type}")
+        for name, labels, extra, value in metric.samples():
+            pairs = list(zip(metric.labelnames, labels)) + list(extra)
+            label_text = ",".join(f'{key}="{_escape(val)}"' for key, val in pairs)
+            lines.append(f"{name}{{{label_text}}} {_format_value(value)}" if label_text else f"{name} {_format_value(value)}")
+    return "\n".join(lines) + "\n"
+
+
+def _feed_cache_metric():
+    from . import feed_cache
+
+    metric = Counter("socialnet_feed_cache_lookups_total", "Feed cache lookups by entry kind and result.", ("kind", "result"))
+    for key, value in feed_cache.stats().items():
+        kind, result = key.split("_")  # "page_hits", "post_misses", ...
+        metric.inc((kind, {"hits": "hit", "misses": "miss"}[result]), value)
+    return metric
+
+
+def metrics_allowed(request):
+    """The METRICS_TOKEN bearer token; without one configured, DEBUG or METRICS_ALLOWED_IPS."""
+    token = settings.METRICS_TOKEN
+    if token:
+        return constant_time_compare(request.headers.get("Authorization", ""), f"Bearer {token}")
+    return settings.DEBUG or request.META.get("REMOTE_ADDR") in settings.METRICS_ALLOWED_IPS
+
+
+def metrics_view(request):
+    """GET /metrics -> Prometheus text format, for the clients `metrics_allowed` lets in."""
+    if not metrics_allowed(request):
+        return HttpResponseForbidden()
+    return HttpResponse(render_metrics(), content_type="text/plain; version=0.0.4; charset=utf-8")
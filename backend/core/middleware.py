@@ -0,0 +1,87 @@
+# core/middleware.py
+import time
+from contextlib import ExitStack
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connections
+
+from . import metrics
+
+
+class QueryCounter:
+    """Database execute wrapper that counts and times the queries it sees."""
+
+    def __init__(self):
+        self.count = 0
+        self.duration = 0.0
+
+    def __call__(self, execute, sql, params, many, context):
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.duration += time.perf_counter() - started
+            self.count += 1
+
+    def track(self):
+        """Context manager installing the wrapper on every database alias of this thread."""
+        stack = ExitStack()
+        for alias in connections:
+            stack.enter_context(connections[alias].execute_wrapper(self))
+        return stack
+
+
+class QueryCountHeaderMiddleware:
+    """
+    Adds X-Query-Count / X-Query-Time (ms) to every response, so a benchmark
+    client (manage.py benchmark_api) sees the SQL cost of each request without
+    DEBUG. Removed from the stack at startup unless QUERY_COUNT_HEADER is on.
+    """
+
+    def __init__(self, get_response):
+        if not settings.QUERY_COUNT_HEADER:
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+
+    def __call__(self, request):
+        counter = QueryCounter()
+        with counter.track():
+            response = self.get_response(request)
+        response["X-Query-Count"] = str(counter.count)
+        response["X-Query-Time"] = f"{counter.duration * 1000:.2f}"
+        return response
+
+
+class MetricsMiddleware:
+    """
+    Per-view latency, SQL, serializer time and response size histograms
+    (see core/metrics.py). Runs natively on both the sync and the async views;
+    removed from the stack at startup when METRICS_ENABLED is off.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        if not settings.METRICS_ENABLED:
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        started = time.perf_counter()
+        with metrics.collect() as request_metrics:
+            response = self.get_response(request)
+        metrics.record(request, response, request_metrics, time.perf_counter() - started)
+        return response
+
+    async def __acall__(self, request):
+        started = time.perf_counter()
+        with metrics.collect() as request_metrics:
+            response = await self.get_response(request)
+        metrics.record(request, response, request_metrics, time.perf_counter() - started)
+        return response
@@ -0,0 +1,24 @@
+# Generated by Django 5.2.18 on 2026-10-18 02:37
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0002_profile_date_of_birth'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PostCounterDelta',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('likes_delta', models.SmallIntegerField(default=0)),
+                ('dislikes_delta', models.SmallIntegerField(default=0)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('post', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='counter_deltas', to='core.post')),
+            ],
+        ),
+    ]
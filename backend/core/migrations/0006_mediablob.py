@@ -0,0 +1,51 @@
+# Generated by Django 5.2.18 on 2026-10-18 02:42
+
+from collections import Counter
+
+from django.db import migrations, models
+
+
+def count_existing_media(apps, schema_editor):
+    """Existing uploads keep their uuid names; they just start being reference counted."""
+    Post = apps.get_model('core', 'Post')
+    Profile = apps.get_model('core', 'Profile')
+    MediaBlob = apps.get_model('core', 'MediaBlob')
+
+    counts = Counter(Post.objects.exclude(image='').values_list('image', flat=True).iterator())
+    counts.update(
+        Profile.objects.exclude(profile_image__isnull=True).exclude(profile_image='')
+        .values_list('profile_image', flat=True).iterator()
+    )
+    variants = {}
+    for source_variants in Post.objects.values_list('image_variants', flat=True).iterator():
+        if source_variants.get('source'):
+            variants[source_variants['source']] = source_variants.get('widths', {})
+    for source_variants in Profile.objects.values_list('profile_image_variants', flat=True).iterator():
+        if source_variants.get('source'):
+            variants[source_variants['source']] = source_variants.get('widths', {})
+
+    MediaBlob.objects.bulk_create(
+        [MediaBlob(name=name, refcount=refs, variants=variants.get(name, {})) for name, refs in counts.items()],
+        batch_size=1000,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0005_chunkedupload'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='MediaBlob',
+            fields=[
+                ('name', models.CharField(max_length=255, primary_key=True, serialize=False)),
+                ('refcount', models.PositiveIntegerField(default=0)),
+                ('variants', models.JSONField(blank=True, default=dict)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+        ),
+        migrations.RunPython(count_existing_media, migrations.RunPython.noop),
+    ]
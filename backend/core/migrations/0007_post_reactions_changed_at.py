@@ -0,0 +1,18 @@
+# Generated by Django 5.2.18 on 2026-10-18 03:01
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0006_mediablob'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='post',
+            name='reactions_changed_at',
+            field=models.DateTimeField(blank=True, db_index=True, null=True),
+        ),
+    ]
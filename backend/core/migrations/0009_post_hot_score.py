@@ -0,0 +1,53 @@
+# Generated by Django 5.2.18 on 2026-10-18 03:05
+
+import math
+from datetime import datetime, timezone
+
+from django.db import migrations, models
+
+# core.ranking.hot_score as it was when this migration was written, frozen here so
+# a later change to the formula cannot change what this migration computes
+# (a new formula rescores with `manage.py reconcile_counts --rescore`)
+EPOCH = datetime(2024, 1, 1, tzinfo=timezone.utc)
+DECAY_SECONDS = 45000
+
+
+def hot_score(likes, dislikes, created_at):
+    net = likes - dislikes
+    order = math.log10(max(abs(net), 1))
+    sign = (net > 0) - (net < 0)
+    return round(sign * order + (created_at - EPOCH).total_seconds() / DECAY_SECONDS, 7)
+
+
+def score_existing_posts(apps, schema_editor):
+    Post = apps.get_model('core', 'Post')
+    batch = []
+    for post in Post.objects.only('likes_count', 'dislikes_count', 'created_at').iterator(chunk_size=2000):
+        post.hot_score = hot_score(post.likes_count, post.dislikes_count, post.created_at)
+        batch.append(post)
+        if len(batch) >= 2000:
+            Post.objects.bulk_update(batch, ['hot_score'])
+            batch = []
+    if batch:
+        Post.objects.bulk_update(batch, ['hot_score'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0008_follow_timelineentry'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='post',
+            name='hot_score',
+            field=models.FloatField(default=0),
+        ),
+        # scores first, so the index is built once
+        migrations.RunPython(score_existing_posts, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name='post',
+            index=models.Index(fields=['-hot_score', '-id'], name='core_post_hot_sco_454d2e_idx'),
+        ),
+    ]
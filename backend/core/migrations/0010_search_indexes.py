@@ -0,0 +1,100 @@
+from django.db import DatabaseError, migrations
+
+# The statements are spelled out here rather than imported from core.search, so
+# this migration keeps doing what it did whatever that module becomes.
+
+POSTGRES_INDEXES = (
+    "CREATE INDEX IF NOT EXISTS core_post_description_fts "
+    "ON core_post USING GIN (to_tsvector('english', description))",
+    "CREATE INDEX IF NOT EXISTS core_profile_search_fts "
+    "ON core_profile USING GIN (to_tsvector('simple', username || ' ' || bio))",
+    "CREATE INDEX IF NOT EXISTS core_profile_username_trgm ON core_profile USING GIN (username gin_trgm_ops)",
+)
+POSTGRES_DROP = (
+    "DROP INDEX IF EXISTS core_post_description_fts",
+    "DROP INDEX IF EXISTS core_profile_search_fts",
+    "DROP INDEX IF EXISTS core_profile_username_trgm",
+)
+
+SQLITE_INDEXES = (
+    "CREATE VIRTUAL TABLE core_post_fts USING fts5(description, content='core_post', content_rowid='id', "
+    "tokenize='porter unicode61')",
+    "CREATE TRIGGER core_post_fts_ai AFTER INSERT ON core_post BEGIN "
+    "INSERT INTO core_post_fts(rowid, description) VALUES (new.id, new.description); END",
+    "CREATE TRIGGER core_post_fts_ad AFTER DELETE ON core_post BEGIN "
+    "INSERT INTO core_post_fts(core_post_fts, rowid, description) VALUES ('delete', old.id, old.description); END",
+    "CREATE TRIGGER core_post_fts_au AFTER UPDATE OF description ON core_post BEGIN "
+    "INSERT INTO core_post_fts(core_post_fts, rowid, description) VALUES ('delete', old.id, old.description); "
+    "INSERT INTO core_post_fts(rowid, description) VALUES (new.id, new.description); END",
+    "INSERT INTO core_post_fts(core_post_fts) VALUES ('rebuild')",
+    "CREATE VIRTUAL TABLE core_profile_fts USING fts5(username, bio, content='core_profile', content_rowid='id', "
+    "tokenize='trigram')",
+    "CREATE TRIGGER core_profile_fts_ai AFTER INSERT ON core_profile BEGIN "
+    "INSERT INTO core_profile_fts(rowid, username, bio) VALUES (new.id, new.username, new.bio); END",
+    "CREATE TRIGGER core_profile_fts_ad AFTER DELETE ON core_profile BEGIN "
+    "INSERT INTO core_profile_fts(core_profile_fts, rowid, username, bio) "
+    "VALUES ('delete', old.id, old.username, old.bio); END",
+    "CREATE TRIGGER core_profile_fts_au AFTER UPDATE OF username, bio ON core_profile BEGIN "
+    "INSERT INTO core_profile_fts(core_profile_fts, rowid, username, bio) "
+    "VALUES ('delete', old.id, old.username, old.bio); "
+    "INSERT INTO core_profile_fts(rowid, username, bio) VALUES (new.id, new.username, new.bio); END",
+    "INSERT INTO core_profile_fts(core_profile_fts) VALUES ('rebuild')",
+)
+SQLITE_DROP = tuple(
+    f"DROP TRIGGER IF EXISTS {fts}_{suffix}"
+    for fts in ("core_post_fts", "core_profile_fts") for suffix in ("ai", "ad", "au")
+) + (
+    "DROP TABLE IF EXISTS core_post_fts",
+    "DROP TABLE IF EXISTS core_profile_fts",
+)
+
+
+def create_pg_trgm(schema_editor):
+    """
+    The username index needs the pg_trgm extension, and creating an extension
+    needs the CREATE privilege on the database (superuser before PostgreSQL 13,
+    where pg_trgm is not a trusted extension). If the migrating role lacks it,
+    have an administrator run `CREATE EXTENSION pg_trgm;` once, then migrate again.
+    """
+    with schema_editor.connection.cursor() as cursor:
+        cursor.execute("SELECT 1 FROM pg_extension WHERE extname = 'pg_trgm'")
+        if cursor.fetchone():
+            return
+    try:
+        schema_editor.execute("CREATE EXTENSION IF NOT EXISTS pg_trgm")
+    except DatabaseError as error:
+        raise RuntimeError(
+            "Could not create the pg_trgm extension needed by the search indexes "
+            f"({error}). Ask a database administrator to run `CREATE EXTENSION pg_trgm;` "
+            "in this database, then run the migrations again."
+        ) from error
+
+
+def create_indexes(apps, schema_editor):
+    vendor = schema_editor.connection.vendor
+    if vendor == 'postgresql':
+        create_pg_trgm(schema_editor)
+        statements = POSTGRES_INDEXES
+    else:
+        statements = SQLITE_INDEXES if vendor == 'sqlite' else ()
+    for statement in statements:
+        schema_editor.execute(statement)
+
+
+def drop_indexes(apps, schema_editor):
+    # pg_trgm stays installed: other objects may use it
+    statements = {'postgresql': POSTGRES_DROP, 'sqlite': SQLITE_DROP}.get(schema_editor.connection.vendor, ())
+    for statement in statements:
+        schema_editor.execute(statement)
+
+
+class Migration(migrations.Migration):
+    """Full-text search indexes (see core/search.py); none on other databases."""
+
+    dependencies = [
+        ('core', '0009_post_hot_score'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_indexes, drop_indexes),
+    ]
@@ -0,0 +1,79 @@
+# Generated by Django 5.2.18 on 2026-10-18 03:25
+
+from django.db import migrations, models
+from django.db.models import Count, IntegerField, OuterRef, Subquery, Sum
+from django.db.models.functions import Coalesce
+
+# the profile half of 0010's SQLite search index, spelled out like there
+SQLITE_PROFILE_INDEX = (
+    "DROP TRIGGER IF EXISTS core_profile_fts_ai",
+    "DROP TRIGGER IF EXISTS core_profile_fts_ad",
+    "DROP TRIGGER IF EXISTS core_profile_fts_au",
+    "DROP TABLE IF EXISTS core_profile_fts",
+    "CREATE VIRTUAL TABLE core_profile_fts USING fts5(username, bio, content='core_profile', content_rowid='id', "
+    "tokenize='trigram')",
+    "CREATE TRIGGER core_profile_fts_ai AFTER INSERT ON core_profile BEGIN "
+    "INSERT INTO core_profile_fts(rowid, username, bio) VALUES (new.id, new.username, new.bio); END",
+    "CREATE TRIGGER core_profile_fts_ad AFTER DELETE ON core_profile BEGIN "
+    "INSERT INTO core_profile_fts(core_profile_fts, rowid, username, bio) "
+    "VALUES ('delete', old.id, old.username, old.bio); END",
+    "CREATE TRIGGER core_profile_fts_au AFTER UPDATE OF username, bio ON core_profile BEGIN "
+    "INSERT INTO core_profile_fts(core_profile_fts, rowid, username, bio) "
+    "VALUES ('delete', old.id, old.username, old.bio); "
+    "INSERT INTO core_profile_fts(rowid, username, bio) VALUES (new.id, new.username, new.bio); END",
+    "INSERT INTO core_profile_fts(core_profile_fts) VALUES ('rebuild')",
+)
+
+
+def restore_profile_search(apps, schema_editor):
+    # adding the columns rebuilt core_profile on SQLite, without the FTS triggers
+    if schema_editor.connection.vendor == 'sqlite':
+        for statement in SQLITE_PROFILE_INDEX:
+            schema_editor.execute(statement)
+
+
+def count_existing_posts(apps, schema_editor):
+    Post = apps.get_model('core', 'Post')
+    Profile = apps.get_model('core', 'Profile')
+
+    def per_author(aggregate):
+        totals = (
+            Post.objects.filter(author=OuterRef('pk')).order_by()
+            .values('author').annotate(total=aggregate).values('total')
+        )
+        return Coalesce(Subquery(totals, output_field=IntegerField()), 0)
+
+    Profile.objects.update(
+        posts_count=per_author(Count('pk')),
+        likes_received=per_author(Sum('likes_count')),
+        dislikes_received=per_author(Sum('dislikes_count')),
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0010_search_indexes'),
+    ]
+
+    operations = [
+        # unapplying removes the columns (another rebuild) after this
+        migrations.RunPython(migrations.RunPython.noop, restore_profile_search),
+        migrations.AddField(
+            model_name='profile',
+            name='dislikes_received',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='profile',
+            name='likes_received',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='profile',
+            name='posts_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.RunPython(count_existing_posts, migrations.RunPython.noop),
+        migrations.RunPython(restore_profile_search, migrations.RunPython.noop),
+    ]
@@ -5,9 +5,13 @@ from django.contrib.auth import get_user_model
 from django.db.models import F
 from django.utils import timezone
 
+from .ranking import hot_score
+
 User = get_user_model()
 
 
+# With the content-addressed default storage (core/storage.py) these only pick
+# the directory and extension; the stored name is the hash of the content.
 def upload_to_profile(instance, filename):
     ext = os.path.splitext(filename)[1]
     return f"profiles/{uuid.uuid4().hex}{ext}"
@@ -29,7 +33,19 @@ class Profile(models.Model):
     location = models.CharField(max_length=100, blank=True)
     phone = models.CharField(max_length=30, blank=True)
     profile_image = models.ImageField(upload_to=upload_to_profile, null=True, blank=True)
+    # resized copies of profile_image, see core/images.py
+    profile_image_variants = models.JSONField(default=dict, blank=True)
     date_of_birth = models.DateField(null=True, blank=True)
+    # kept by core/timelines.py on follow / unfollow
+    followers_count = models.PositiveIntegerField(default=0, db_index=True)
+    following_count = models.PositiveIntegerField(default=0)
+    # kept by core/profile_stats.py on post create / delete and reactions
+    posts_count = models.PositiveIntegerField(default=0)
+    likes_received = models.PositiveIntegerField(default=0)
+    dislikes_received = models.PositiveIntegerField(default=0)
+    # bumped when the password is changed (not when its hash is upgraded); tokens
+    # minted before the bump are revoked, see core/authentication.py
+    password_version = models.PositiveIntegerField(default=0)
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
@@ -39,6 +55,24 @@ class Profile(models.Model):
     def __str__(self):
         return f"{self.username} ({self.user.email if self.user and hasattr(self.user, 'email') else self.pk})"
 
+    # denormalized counters and password_version, only ever moved by F() updates (see above)
+    COUNTER_FIELDS = (
+        'followers_count', 'following_count', 'posts_count', 'likes_received', 'dislikes_received',
+        'password_version',
+    )
+
+    def save(self, *args, **kwargs):
+        # a full save of a loaded row would write back the counters as they were read,
+        # undoing the follows / posts / reactions counted since: leave them out
+        if not self._state.adding and kwargs.get('update_fields') is None and not kwargs.get('force_insert'):
+            kwargs['update_fields'] = [
+                field.name for field in self._meta.concrete_fields
+                if not field.primary_key and field.name not in self.COUNTER_FIELDS
+            ]
+        # storing the image and counting its reference in one transaction (core/storage.py)
+        with transaction.atomic():
+            super().save(*args, **kwargs)
+
 
 class Post(models.Model):
     """
@@ -47,9 +81,15 @@ class Post(models.Model):
     """
     author = models.ForeignKey(Profile, on_delete=models.CASCADE, related_name='posts')
     image = models.ImageField(upload_to=upload_to_post)
+    # resized copies of image, see core/images.py
+    image_variants = models.JSONField(default=dict, blank=True)
     description = models.TextField(blank=True, max_length=1000)
     likes_count = models.PositiveIntegerField(default=0)
     dislikes_count = models.PositiveIntegerField(default=0)
+    # core/ranking.py; written together with the counters
+    hot_score = models.FloatField(default=0)
+    # set whenever the counters are written; `reconcile_counts --since` audits from it
+    reactions_changed_at = models.DateTimeField(null=True, blank=True, db_index=True)
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
@@ -57,24 +97,32 @@ class Post(models.Model):
         ordering = ['-created_at']
         indexes = [
             models.Index(fields=['-created_at']),
+            # one author's posts newest first (fan-out on read, author pages)
+            models.Index(fields=['author', '-created_at']),
+            # ?ranking=hot pages
+            models.Index(fields=['-hot_score', '-id']),
         ]
 
     def __str__(self):
         return f"Post {self.pk} by {self.author.username}"
 
+    def save(self, *args, **kwargs):
+        from .profile_stats import post_created
+        adding = self._state.adding
+        if adding:
+            self.hot_score = hot_score(self.likes_count, self.dislikes_count, self.created_at or timezone.now())
+        # the image's reference count (core/storage.py) and the author's posts_count
+        # are written in the same transaction as the row
+        with transaction.atomic():
+            super().save(*args, **kwargs)
+            if adding:
+                post_created(self.author_id)
+
     def refresh_counts_from_reactions(self):
-        """Utility to rebuild counts from PostReaction table (useful for audits)."""
-        from django.db.models import Sum, Q
-        agg = self.reactions.aggregate(
-            likes=Sum('reaction', filter=Q(reaction=1)),
-            dislikes=Sum('reaction', filter=Q(reaction=-1))
-        )
-        # agg may return None; compute safely
-        likes = self.reactions.filter(reaction=1).count()
-        dislikes = self.reactions.filter(reaction=-1).count()
-        self.likes_count = likes
-        self.dislikes_count = dislikes
-        self.save(update_fields=['likes_count', 'dislikes_count'])
+        """Rebuild this post's counts from the PostReaction table (for whole-table audits use `manage.py reconcile_counts`)."""
+        from .reactions import reconcile_posts
+        reconcile_posts([self.pk])
+        self.refresh_from_db(fields=['likes_count', 'dislikes_count', 'reactions_changed_at'])
 
 
 class PostReaction(models.Model):
@@ -102,3 +150,104 @@ class PostReaction(models.Model):
 
     def __str__(self):
         return f"{self.user.username} -> {self.post.pk} : {self.get_reaction_display()}"
+
+
+class PostCounterDelta(models.Model):
+    """
+    Append-only log of like/dislike counter changes, written by the lock-free
+    reaction path (REACTION_COUNTER_MODE = "deltas") instead of updating the hot
+    Post row. `fold_reaction_deltas` periodically folds them into
+    Post.likes_count / Post.dislikes_count and deletes them.
+    """
+    post = models.ForeignKey(Post, on_delete=models.CASCADE, related_name='counter_deltas')
+    likes_delta = models.SmallIntegerField(default=0)
+    dislikes_delta = models.SmallIntegerField(default=0)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    def __str__(self):
+        return f"Post {self.post_id}: {self.likes_delta:+d} / {self.dislikes_delta:+d}"
+
+
+class ChunkedUpload(models.Model):
+    """
+    A resumable post-image upload in progress (see core/uploads.py).
+    Chunks are appended to a partial file in media storage; `offset` is the
+    number of bytes received so far.
+    """
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    owner = models.ForeignKey(Profile, on_delete=models.CASCADE, related_name='uploads')
+    filename = models.CharField(max_length=255)
+    total_size = models.PositiveIntegerField()
+    offset = models.PositiveIntegerField(default=0)
+    content_type = models.CharField(max_length=50, blank=True)
+    width = models.PositiveIntegerField(null=True, blank=True)
+    height = models.PositiveIntegerField(null=True, blank=True)
+    # set once the upload is completed into a post
+    sha256 = models.CharField(max_length=64, blank=True)
+    post = models.OneToOneField(Post, on_delete=models.SET_NULL, null=True, blank=True, related_name='upload')
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"Upload {self.pk} ({self.offset}/{self.total_size} bytes)"
+
+    @property
+    def partial_name(self):
+        return f"uploads/partial/{self.pk.hex}.part"
+
+
+class MediaBlob(models.Model):
+    """
+    Reference count for a stored media file, keyed by its storage name.
+    Identical uploads share one content-addressed file; it is deleted together
+    with its derived variants when the last Post/Profile referencing it goes.
+    """
+    name = models.CharField(max_length=255, primary_key=True)
+    refcount = models.PositiveIntegerField(default=0)
+    # resized copies built from this file, {"320": <name>, ...} (see core/images.py)
+    variants = models.JSONField(default=dict, blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"{self.name} ({self.refcount} refs)"
+
+
+class Follow(models.Model):
+    """follower sees followee's posts in their home timeline (see core/timelines.py)."""
+    follower = models.ForeignKey(Profile, on_delete=models.CASCADE, related_name='following')
+    followee = models.ForeignKey(Profile, on_delete=models.CASCADE, related_name='followers')
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        unique_together = ('follower', 'followee')
+        indexes = [
+            # fan-out: everyone following an author
+            models.Index(fields=['followee', 'follower']),
+        ]
+
+    def __str__(self):
+        return f"{self.follower_id} -> {self.followee_id}"
+
+
+class TimelineEntry(models.Model):
+    """
+    One post in one profile's precomputed home timeline, written when the post
+    is fanned out. created_at is the post's, so a timeline page is a range scan
+    of the (owner, -created_at, -post) index.
+    """
+    owner = models.ForeignKey(Profile, on_delete=models.CASCADE, related_name='timeline')
+    post = models.ForeignKey(Post, on_delete=models.CASCADE, related_name='timeline_entries')
+    # the post's author, so unfollowing can drop that author's entries
+    author = models.ForeignKey(Profile, on_delete=models.CASCADE, related_name='+')
+    created_at = models.DateTimeField()
+
+    class Meta:
+        unique_together = ('owner', 'post')
+        indexes = [
+            models.Index(fields=['owner', '-created_at', '-post']),
+            models.Index(fields=['owner', 'author']),
+        ]
+
+    def __str__(self):
+        return f"Post {self.post_id} in {self.owner_id}'s timeline"
@@ -0,0 +1,220 @@
+# core/pagination.py
+import base64
+import binascii
+import json
+from collections import OrderedDict
+
+from django.core.exceptions import ValidationError
+from django.db.models import Q
+from rest_framework import exceptions
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import BasePagination
+from rest_framework.response import Response
+from rest_framework.utils.urls import replace_query_param
+
+
+class FeedCursorPagination(BasePagination):
+    """
+    Keyset (seek) pagination over a unique ordering, `(-created_at, -id)` by default.
+
+    The opaque cursor carries the ordering values of the row at the edge of the
+    current page, so every page is a `WHERE (created_at, id) < (...)` range scan
+    on the created_at index: fetch time does not depend on how deep the client
+    has scrolled, and posts inserted at the head never shift the pages behind.
+    """
+    ordering = ("-created_at", "-id")
+    page_size = 20
+    max_page_size = 100
+    page_size_query_param = "page_size"
+    cursor_query_param = "cursor"
+    invalid_cursor_message = "Invalid cursor"
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.prepare(request)
+        return self.get_page(queryset, self.cursor, self.page_size)
+
+    def prepare(self, request):
+        """Read page size and cursor off the request without touching the database."""
+        self.request = request
+        self.base_url = request.build_absolute_uri()
+        self.page_size = self.get_page_size(request)
+        self.cursor = self.decode_cursor(request)
+        self.next_cursor = None
+        self.previous_cursor = None
+
+    def get_page(self, queryset, cursor, page_size):
+        """
+        Fetch one page starting after `cursor` (a `(reverse, values)` tuple or None).
+        Sets `next_cursor` / `previous_cursor` tokens for the response links.
+        """
+        rows = list(self.page_queryset(queryset, cursor, page_size))
+        return self.finish_page(rows, cursor, page_size)
+
+    async def aget_page(self, queryset, cursor, page_size):
+        """`get_page` on the async ORM."""
+        rows = [row async for row in self.page_queryset(queryset, cursor, page_size)]
+        return self.finish_page(rows, cursor, page_size)
+
+    def page_queryset(self, queryset, cursor, page_size):
+        """The (unevaluated) query for one page plus the row that tells us there is more."""
+        reverse, position = cursor if cursor else (False, None)
+        if position is not None:
+            queryset = queryset.filter(self._seek_filter(queryset.model, position, reverse))
+        return queryset.order_by(*self._ordering(reverse))[:page_size + 1]
+
+    def finish_page(self, rows, cursor, page_size):
+        reverse, position = cursor if cursor else (False, None)
+        has_more = len(rows) > page_size
+        rows = rows[:page_size]
+        if reverse:
+            rows.reverse()
+
+        self.next_cursor = None
+        self.previous_cursor = None
+        if rows:
+            if has_more or reverse:
+                self.next_cursor = self.encode_cursor(False, self.position_of(rows[-1]))
+            if (has_more and reverse) or (not reverse and position is not None):
+                self.previous_cursor = self.encode_cursor(True, self.position_of(rows[0]))
+        return rows
+
+    def get_page_size(self, request):
+        try:
+            size = int(request.query_params[self.page_size_query_param])
+        except (KeyError, ValueError):
+            return self.page_size
+        if size <= 0:
+            return self.page_size
+        return min(size, self.max_page_size)
+
+    # --- cursor encoding ---
+    def position_of(self, obj):
+        opts = obj._meta
+        return [opts.get_field(name.lstrip("-")).value_to_string(obj) for name in self.ordering]
+
+    def encode_cursor(self, reverse, position):
+        payload = json.dumps({"r": int(reverse), "p": position}, separators=(",", ":"))
+        return base64.urlsafe_b64encode(payload.encode("ascii")).decode("ascii").rstrip("=")
+
+    def decode_cursor(self, request):
+        encoded = request.query_params.get(self.cursor_query_param)
+        if not encoded:
+            return None
+        try:
+            padded = encoded + "=" * (-len(encoded) % 4)
+            payload = json.loads(base64.urlsafe_b64decode(padded.encode("ascii")))
+            reverse = bool(payload["r"])
+            position = payload["p"]
+            if not isinstance(position, list) or len(position) != len(self.ordering):
+                raise ValueError
+            # we only ever encode strings and numbers; anything else was tampered with
+            if any(isinstance(value, bool) or not isinstance(value, (str, int, float)) for value in position):
+                raise ValueError
+        except (TypeError, ValueError, KeyError, UnicodeEncodeError, binascii.Error):
+            raise NotFound(self.invalid_cursor_message)
+        return reverse, position
+
+    # --- query building ---
+    def _ordering(self, reverse):
+        if not reverse:
+            return self.ordering
+        return tuple(name[1:] if name.startswith("-") else "-" + name for name in self.ordering)
+
+    def _seek_filter(self, model, position, reverse):
+        """
+        Row-value comparison spelled out for the ORM:
+        (a < x) OR (a = x AND b < y) OR ...  for descending fields.
+        """
+        values = []
+        for name, raw in zip(self.ordering, position):
+            field = model._meta.get_field(name.lstrip("-"))
+            try:
+                values.append(field.to_python(raw))
+            except (ValidationError, TypeError, ValueError):
+                raise NotFound(self.invalid_cursor_message)
+
+        condition = Q()
+        for i, name in enumerate(self.ordering):
+            descending = name.startswith("-") != reverse
+            lookup = "lt" if descending else "gt"
+            clause = {prev.lstrip("-"): values[j] for j, prev in enumerate(self.ordering[:i])}
+            clause[f"{name.lstrip('-')}__{lookup}"] = values[i]
+            condition |= Q(**clause)
+        return condition
+
+    # --- response ---
+    def get_next_link(self):
+        if self.next_cursor is None:
+            return None
+        return replace_query_param(self.base_url, self.cursor_query_param, self.next_cursor)
+
+    def get_previous_link(self):
+        if self.previous_cursor is None:
+            return None
+        return replace_query_param(self.base_url, self.cursor_query_param, self.previous_cursor)
+
+    def get_paginated_response(self, data):
+        return Response(OrderedDict([
+            ("next", self.get_next_link()),
+            ("previous", self.get_previous_link()),
+            ("results", data),
+        ]))
+
+    def get_paginated_response_schema(self, schema):
+        return {
+            "type": "object",
+            "required": ["results"],
+            "properties": {
+                "next": {"type": "string", "nullable": True, "format": "uri"},
+                "previous": {"type": "string", "nullable": True, "format": "uri"},
+                "results": schema,
+            },
+        }
+
+
+class HotFeedPagination(FeedCursorPagination):
+    """
+    Keyset pages over the stored hot score (core/ranking.py), highest first.
+    Scores move as reactions come in, so a post can show up on two pages or
+    be skipped while a client is paging; the newest-first feed has no such drift.
+    """
+    ordering = ("-hot_score", "-id")
+
+
+FEED_RANKINGS = {"new": FeedCursorPagination, "hot": HotFeedPagination}
+
+
+def feed_ranking(query_params):
+    """`(ranking, paginator)` for the feed's ?ranking= (new by default)."""
+    ranking = query_params.get("ranking") or "new"
+    if ranking not in FEED_RANKINGS:
+        raise exceptions.ValidationError({"ranking": f"Must be one of: {', '.join(FEED_RANKINGS)}."})
+    return ranking, FEED_RANKINGS[ranking]()
+
+
+class SearchPagination(FeedCursorPagination):
+    """
+    Forward-only keyset pages over search results ranked by the database
+    (core/search.py); the cursor carries the (rank, id) of the last row.
+    """
+    ordering = ("-rank", "-id")
+
+    def after(self):
+        """Cursor position as `(rank, id)`, or None for the first page."""
+        if self.cursor is None:
+            return None
+        rank, pk = self.cursor[1]
+        try:
+            return float(rank), int(pk)
+        except (TypeError, ValueError):
+            raise NotFound(self.invalid_cursor_message)
+
+    def finish_hits(self, hits, page_size):
+        """Trim the extra row fetched to detect a next page and set the cursor."""
+        self.next_cursor = None
+        self.previous_cursor = None
+        if len(hits) > page_size:
+            hits = hits[:page_size]
+            pk, rank = hits[-1]
+            self.next_cursor = self.encode_cursor(False, [rank, pk])
+        return hits
@@ -0,0 +1,145 @@
+# core/passwords.py
+"""
+Password hashing for login and signup, off the request threads.
+
+PBKDF2 and friends are deliberately slow: a burst of logins run on the request
+workers keeps every one of them busy on CPU and the feed waits behind it.
+Here the hashing runs in a pool of PASSWORD_HASH_WORKERS processes, so it can
+use every core without holding the GIL of the serving process, and at most
+PASSWORD_HASH_QUEUE hashes wait for a free worker; past that, login and signup
+answer 503 with Retry-After instead of queueing without bound.
+
+- A correct password stored with an older hasher (or fewer iterations) is
+  rehashed with PASSWORD_HASHERS[0] in the same round trip and saved.
+- A wrong username / password pair is remembered for LOGIN_FAILURE_CACHE_TTL
+  seconds (keyed by an HMAC, never the password, and by the stored hash so a
+  password change or signup clears it), and repeats are refused without
+  hashing again.
+
+With PASSWORD_HASH_WORKERS = 0 hashing runs inline, like Django does.
+"""
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from multiprocessing import get_context
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.contrib.auth.hashers import get_hasher, identify_hasher, is_password_usable
+from django.contrib.auth.hashers import make_password as _make_password
+from django.core.cache import cache
+from django.utils.crypto import salted_hmac
+from django.utils.translation import gettext_lazy as _
+from rest_framework import status
+from rest_framework.exceptions import APIException
+
+_pool = None
+_slots = None
+_pool_lock = threading.Lock()
+
+
+class HashingBusy(APIException):
+    status_code = status.HTTP_503_SERVICE_UNAVAILABLE
+    default_detail = _("Too many logins in progress, try again in a moment.")
+    default_code = "hashing_busy"
+    wait = 1  # sent as Retry-After by DRF's exception handler
+
+
+# --- run in the worker processes ---
+def _encode(password):
+    return _make_password(password)
+
+
+def _check(password, encoded):
+    """(correct, new hash if it should be upgraded to the preferred hasher else None)."""
+    if not is_password_usable(encoded):
+        return False, None
+    try:
+        hasher = identify_hasher(encoded)
+    except ValueError:
+        return False, None
+    if not hasher.verify(password, encoded):
+        return False, None
+    preferred = get_hasher()
+    if hasher.algorithm != preferred.algorithm or preferred.must_update(encoded):
+        return True, _make_password(password)
+    return True, None
+
+
+# --- pool ---
+def get_pool():
+    global _pool, _slots
+    with _pool_lock:
+        if _pool is None:
+            # spawn: forking a threaded server process can copy held locks into the child
+            _pool = ProcessPoolExecutor(settings.PASSWORD_HASH_WORKERS, mp_context=get_context("spawn"))
+            _slots = threading.BoundedSemaphore(settings.PASSWORD_HASH_WORKERS + settings.PASSWORD_HASH_QUEUE)
+        return _pool, _slots
+
+
+def shutdown():
+    global _pool, _slots
+    with _pool_lock:
+        if _pool is not None:
+            _pool.shutdown(cancel_futures=True)
+        _pool = _slots = None
+
+
+def _run(func, *args):
+    if settings.PASSWORD_HASH_WORKERS <= 0:
+        return func(*args)
+    pool, slots = get_pool()
+    if not slots.acquire(blocking=False):
+        raise HashingBusy()
+    try:
+        return pool.submit(func, *args).result()
+    except BrokenProcessPool:
+        # a worker died; start a fresh pool on the next call
+        shutdown()
+        raise HashingBusy()
+    finally:
+        slots.release()
+
+
+# --- API ---
+def make_password(password):
+    """Hash of `password` with the preferred hasher, computed in the pool."""
+    return _run(_encode, password)
+
+
+def _failure_key(username, password, encoded):
+    digest = salted_hmac("core.passwords.failure", f"{username}\0{password}\0{encoded}").hexdigest()
+    return f"login-failure:{digest}"
+
+
+def authenticate(username, password):
+    """
+    The active user with these credentials, or None. Same result as
+    django.contrib.auth.authenticate() with the ModelBackend, minus the hashing
+    on this thread.
+    """
+    User = get_user_model()
+    try:
+        user = User._default_manager.get_by_natural_key(username)
+    except User.DoesNotExist:
+        user = None
+    encoded = user.password if user is not None else ""
+
+    key = _failure_key(username, password, encoded)
+    if cache.get(key):
+        return None
+
+    if user is None:
+        # hash anyway so unknown usernames take as long as wrong passwords
+        _run(_encode, password)
+        correct = False
+    else:
+        correct, rehashed = _run(_check, password, encoded)
+        if rehashed:
+            user.password = rehashed
+            user.save(update_fields=["password"])
+
+    if not correct:
+        cache.set(key, True, settings.LOGIN_FAILURE_CACHE_TTL)
+        return None
+    return user if user.is_active else None
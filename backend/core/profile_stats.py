@@ -0,0 +1,126 @@
+# core/profile_stats.py
+"""
+Denormalized author statistics on Profile: posts_count, likes_received and
+dislikes_received, so a profile page reads them off one row instead of
+aggregating Post / PostReaction.
+
+They are written in the transaction that changes what they count: Post.save
+(new post), the post_delete signal (core/signals.py) and the reaction paths in
+core/reactions.py, always as `F() + n` updates after the post rows involved are
+locked (post first, then its author), so concurrent writers cannot deadlock.
+With REACTION_COUNTER_MODE = "deltas" the received totals move when the deltas
+are folded into the posts, together with the posts' own counters.
+
+`reconcile` audits them against Post (`manage.py reconcile_counts --profiles`).
+"""
+from collections import defaultdict, namedtuple
+
+from django.db import transaction
+from django.db.models import Case, Count, F, IntegerField, Sum, Value, When
+from django.db.models.functions import Coalesce
+
+from .models import Profile
+
+STAT_FIELDS = ("posts_count", "likes_received", "dislikes_received")
+
+
+def post_created(author_id):
+    Profile.objects.filter(pk=author_id).update(posts_count=F("posts_count") + 1)
+
+
+def post_deleted(post):
+    """Take a deleted post (with the counters it had when it went) off its author's totals."""
+    Profile.objects.filter(pk=post.author_id).update(
+        posts_count=F("posts_count") - 1,
+        likes_received=F("likes_received") - post.likes_count,
+        dislikes_received=F("dislikes_received") - post.dislikes_count,
+    )
+
+
+def credit(deltas):
+    """
+    Add counter changes to the authors' received totals. `deltas` is an
+    iterable of (author_id, likes_delta, dislikes_delta); one UPDATE per author,
+    in id order.
+    """
+    totals = defaultdict(lambda: [0, 0])
+    for author_id, likes_delta, dislikes_delta in deltas:
+        totals[author_id][0] += likes_delta
+        totals[author_id][1] += dislikes_delta
+    for author_id in sorted(totals):
+        likes_delta, dislikes_delta = totals[author_id]
+        if likes_delta or dislikes_delta:
+            Profile.objects.filter(pk=author_id).update(
+                likes_received=F("likes_received") + likes_delta,
+                dislikes_received=F("dislikes_received") + dislikes_delta,
+            )
+
+
+# --- reconciliation ---
+# stored: (posts_count, likes_received, dislikes_received) on the row; expected: from Post
+ProfileDrift = namedtuple("ProfileDrift", "profile_id stored expected")
+
+
+def _audit(profile_ids):
+    """One grouped aggregate over the batch's posts."""
+    rows = (
+        Profile.objects.filter(pk__in=profile_ids).order_by()
+        .annotate(
+            actual_posts=Count("posts"),
+            actual_likes=Coalesce(Sum("posts__likes_count"), 0),
+            actual_dislikes=Coalesce(Sum("posts__dislikes_count"), 0),
+        )
+        .values_list("pk", *STAT_FIELDS, "actual_posts", "actual_likes", "actual_dislikes")
+    )
+    return [
+        ProfileDrift(pk, tuple(row[:3]), tuple(row[3:]))
+        for pk, *row in rows
+        if tuple(row[:3]) != tuple(row[3:])
+    ]
+
+
+def _case(values):
+    return Case(
+        *(When(pk=profile_id, then=Value(value)) for profile_id, value in values.items()),
+        default=Value(0), output_field=IntegerField(),
+    )
+
+
+def reconcile_profiles(profile_ids, dry_run=False):
+    """
+    Audit the given profiles and, unless `dry_run`, overwrite the stats that
+    drifted. Returns the drifts found.
+
+    Only the drifted profiles are locked and re-audited. The posts are not
+    locked: a writer that changed a post but not yet its author waits for our
+    profile lock and then adds its delta on top of the value we wrote.
+    """
+    drifts = _audit(profile_ids)
+    if not drifts or dry_run:
+        return drifts
+
+    with transaction.atomic():
+        locked = list(
+            Profile.objects.select_for_update().filter(pk__in=[drift.profile_id for drift in drifts])
+            .order_by("pk").values_list("pk", flat=True)
+        )
+        drifts = _audit(locked)
+        if drifts:
+            Profile.objects.filter(pk__in=[drift.profile_id for drift in drifts]).update(**{
+                field: _case({drift.profile_id: drift.expected[index] for drift in drifts})
+                for index, field in enumerate(STAT_FIELDS)
+            })
+    return drifts
+
+
+def reconcile(batch_size=1000, dry_run=False):
+    """Reconcile every profile in id-ordered batches. Yields (profiles checked, drifts) per batch."""
+    last = 0
+    while True:
+        profile_ids = list(
+            Profile.objects.filter(pk__gt=last).order_by("pk").values_list("pk", flat=True)[:batch_size]
+        )
+        if not profile_ids:
+            return
+        last = profile_ids[-1]
+        yield len(profile_ids), reconcile_profiles(profile_ids, dry_run=dry_run)
@@ -0,0 +1,55 @@
+# core/ranking.py
+"""
+"Hot" ranking for the feed (GET /api/posts/?ranking=hot).
+
+    hot = sign(s) * log10(max(|s|, 1)) + (created_at - EPOCH) / DECAY_SECONDS,  s = likes - dislikes
+
+Time enters as an offset that only depends on when the post was created, so
+newer posts outrank older ones unless those have ~10x the net votes per
+DECAY_SECONDS of age, and a score never has to be recomputed as time passes:
+it only changes when the counters do. It is stored in the indexed
+Post.hot_score column, written together with the counters (core/reactions.py),
+so a ranked page is a keyset scan of the (-hot_score, -id) index.
+
+Changing EPOCH or DECAY_SECONDS needs a rescore of every post
+(`manage.py reconcile_counts --rescore`).
+"""
+import math
+from datetime import datetime, timezone
+
+from django.db.models import Case, FloatField, Value, When
+
+EPOCH = datetime(2024, 1, 1, tzinfo=timezone.utc)
+DECAY_SECONDS = 45000  # 12.5 hours buys a factor of ten in votes
+
+
+def hot_score(likes, dislikes, created_at):
+    net = likes - dislikes
+    order = math.log10(max(abs(net), 1))
+    sign = (net > 0) - (net < 0)
+    return round(sign * order + (created_at - EPOCH).total_seconds() / DECAY_SECONDS, 7)
+
+
+def hot_score_case(scores):
+    """CASE expression giving each post its score from {post_id: score}."""
+    return Case(
+        *(When(pk=post_id, then=Value(score)) for post_id, score in scores.items()),
+        default=Value(0.0), output_field=FloatField(),
+    )
+
+
+def refresh_hot_scores(post_ids):
+    """
+    Recompute the stored score of `post_ids` from their counters: one locking
+    read, one UPDATE. Call it inside a transaction.
+    """
+    from .models import Post
+
+    rows = (
+        Post.objects.select_for_update().filter(pk__in=post_ids).order_by("pk")
+        .values_list("pk", "likes_count", "dislikes_count", "created_at")
+    )
+    scores = {pk: hot_score(likes, dislikes, created_at) for pk, likes, dislikes, created_at in rows}
+    if scores:
+        Post.objects.filter(pk__in=list(scores)).update(hot_score=hot_score_case(scores))
+    return scores
@@ -0,0 +1,439 @@
+# core/reactions.py
+"""
+Reaction toggles for the sync and async react views.
+
+The default path (`toggle_reaction_locked`) takes a row lock on the Post for
+every like or dislike, so reactions on one hot post are serialised behind that
+lock. The lock-free path (REACTION_COUNTER_MODE = "deltas", `toggle_reaction`)
+makes the toggle a single statement on PostReaction and appends the counter
+change to PostCounterDelta; `fold_counter_deltas` adds the deltas to
+Post.likes_count / dislikes_count in the background.
+
+`reconcile_counts` audits the stored counters against PostReaction batch by
+batch (`manage.py reconcile_counts`).
+
+Every path that writes the Post counters also moves the author's received
+totals on Profile in the same transaction (core/profile_stats.py).
+
+`apply_reactions` replays a batch of toggles for one viewer (offline clients,
+partner imports) in one transaction with a fixed number of statements.
+"""
+from collections import defaultdict, namedtuple
+
+from django.conf import settings
+from django.db import IntegrityError, connection, transaction
+from django.db.models import Case, Count, F, IntegerField, OuterRef, Q, Subquery, Sum, Value, When
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+
+from . import feed_cache, profile_stats
+from .models import Post, PostReaction, PostCounterDelta
+from .ranking import hot_score, hot_score_case, refresh_hot_scores
+
+# replays of a bulk batch that raced a concurrent first reaction (apply_reactions)
+CONFLICT_ATTEMPTS = 3
+
+# toggle outcomes; UNCHANGED: a concurrent toggle stored the same reaction first
+REMOVED, CREATED, SWITCHED, UNCHANGED = 0, 1, 2, 3
+
+_TOGGLE_SQL = """
+WITH removed AS (
+    DELETE FROM core_postreaction
+    WHERE user_id = %(user)s AND post_id = %(post)s AND reaction = %(value)s
+    RETURNING reaction
+), upserted AS (
+    INSERT INTO core_postreaction (user_id, post_id, reaction, created_at, updated_at)
+    SELECT %(user)s, %(post)s, %(value)s, %(now)s, %(now)s
+    WHERE NOT EXISTS (SELECT 1 FROM removed)
+    ON CONFLICT (user_id, post_id) DO UPDATE
+        SET reaction = EXCLUDED.reaction, updated_at = EXCLUDED.updated_at
+        -- the conflicting row was committed after our DELETE looked: only a
+        -- different reaction is a switch, the same one is left alone
+        WHERE core_postreaction.reaction <> EXCLUDED.reaction
+    RETURNING (xmax = 0) AS inserted
+), outcome AS (
+    SELECT CASE
+        WHEN EXISTS (SELECT 1 FROM removed) THEN 0
+        WHEN (SELECT inserted FROM upserted) THEN 1
+        WHEN EXISTS (SELECT 1 FROM upserted) THEN 2
+        ELSE 3
+    END AS kind
+), delta AS (
+    INSERT INTO core_postcounterdelta (post_id, likes_delta, dislikes_delta, created_at)
+    SELECT %(post)s,
+           CASE kind WHEN 0 THEN -%(like)s WHEN 1 THEN %(like)s ELSE %(like)s - %(dislike)s END,
+           CASE kind WHEN 0 THEN -%(dislike)s WHEN 1 THEN %(dislike)s ELSE %(dislike)s - %(like)s END,
+           %(now)s
+    FROM outcome
+    WHERE kind <> 3
+)
+SELECT kind FROM outcome
+"""
+
+
+def counter_deltas(value, outcome):
+    """(likes_delta, dislikes_delta) for toggling `value` (1 / -1) with the given outcome."""
+    like, dislike = (1, 0) if value == 1 else (0, 1)
+    if outcome == UNCHANGED:
+        return 0, 0
+    if outcome == REMOVED:
+        return -like, -dislike
+    if outcome == CREATED:
+        return like, dislike
+    return like - dislike, dislike - like
+
+
+def toggle_reaction_locked(profile_id, post_id, value):
+    """
+    Toggle under a row lock on the Post, updating its counters and hot score in place.
+    Returns (post with author joined, the viewer's reaction afterwards: 1 / -1 / None).
+    Raises Post.DoesNotExist.
+    """
+    with transaction.atomic():
+        post = Post.objects.select_for_update().get(pk=post_id)
+        existing = PostReaction.objects.filter(user_id=profile_id, post=post).first()
+
+        current = value  # the viewer's reaction once we are done
+
+        # case 1: no reaction yet -> create one
+        if existing is None:
+            PostReaction.objects.create(user_id=profile_id, post=post, reaction=value)
+            outcome = CREATED
+
+        # case 2: same reaction -> remove it (toggle off)
+        elif existing.reaction == value:
+            existing.delete()
+            current = None
+            outcome = REMOVED
+
+        # case 3: opposite reaction -> switch like <-> dislike
+        else:
+            existing.reaction = value
+            existing.save(update_fields=["reaction", "updated_at"])
+            outcome = SWITCHED
+
+        # the row is locked, so the new counters can be written as plain values
+        likes_delta, dislikes_delta = counter_deltas(value, outcome)
+        likes = post.likes_count + likes_delta
+        dislikes = post.dislikes_count + dislikes_delta
+        Post.objects.filter(pk=post.pk).update(
+            likes_count=likes,
+            dislikes_count=dislikes,
+            hot_score=hot_score(likes, dislikes, post.created_at),
+            reactions_changed_at=timezone.now(),
+        )
+        profile_stats.credit([(post.author_id, likes_delta, dislikes_delta)])
+
+        # reload with the updated counters
+        post = Post.objects.select_related("author").get(pk=post.pk)
+    return post, current
+
+
+def toggle_reaction(profile_id, post_id, value):
+    """
+    Apply the like/dislike toggle for one user and record the counter delta.
+    Returns the outcome (REMOVED, CREATED, SWITCHED or UNCHANGED). Raises
+    IntegrityError if the post does not exist.
+    """
+    if connection.vendor == "postgresql":
+        like, dislike = (1, 0) if value == 1 else (0, 1)
+        with connection.cursor() as cursor:
+            cursor.execute(_TOGGLE_SQL, {
+                "user": profile_id, "post": post_id, "value": value,
+                "like": like, "dislike": dislike, "now": timezone.now(),
+            })
+            return cursor.fetchone()[0]
+
+    # portable fallback (SQLite in tests): same result, a few more statements
+    with transaction.atomic():
+        existing = PostReaction.objects.filter(user_id=profile_id, post_id=post_id).first()
+        if existing is None:
+            PostReaction.objects.create(user_id=profile_id, post_id=post_id, reaction=value)
+            outcome = CREATED
+        elif existing.reaction == value:
+            existing.delete()
+            outcome = REMOVED
+        else:
+            existing.reaction = value
+            existing.save(update_fields=["reaction", "updated_at"])
+            outcome = SWITCHED
+        likes_delta, dislikes_delta = counter_deltas(value, outcome)
+        PostCounterDelta.objects.create(post_id=post_id, likes_delta=likes_delta, dislikes_delta=dislikes_delta)
+    return outcome
+
+
+def replay_toggles(initial, operations):
+    """
+    Final reaction per post after applying `operations` ((post_id, value) pairs,
+    in order) with the toggle/switch rules on top of `initial` ({post_id: value}).
+    """
+    final = dict(initial)
+    for post_id, value in operations:
+        final[post_id] = None if final.get(post_id) == value else value
+    return final
+
+
+def _counter_case(values):
+    """CASE expression giving each post its value from {post_id: value} (0 for others)."""
+    return Case(
+        *(When(pk=post_id, then=Value(value)) for post_id, value in values.items()),
+        default=Value(0), output_field=IntegerField(),
+    )
+
+
+def apply_reactions(profile_id, operations):
+    """
+    Apply many toggles for one viewer as if sent one by one, in one transaction.
+    `operations` is a list of (post_id, value) pairs. Returns
+    ({post_id: reaction afterwards (1 / -1 / None)}, ids of posts that do not exist);
+    operations on missing posts are skipped.
+
+    Whatever the batch size this runs a fixed number of statements: the posts
+    are locked in id order (so concurrent batches cannot deadlock), the viewer's
+    reactions are read once, and the net change is written with one DELETE,
+    one INSERT, one UPDATE per reaction value, one counter UPDATE and one
+    UPDATE per author whose totals moved. In
+    "deltas" mode the posts are not locked; the counter changes are appended
+    to PostCounterDelta like the single toggle does.
+
+    Nothing locks a reaction that does not exist yet, so a concurrent first
+    reaction by the same viewer can make our INSERT hit the (user, post)
+    unique constraint; the batch is then replayed on top of the row that won,
+    as if it had been sent after it.
+    """
+    for attempt in range(CONFLICT_ATTEMPTS):
+        try:
+            return _apply_reactions(profile_id, operations)
+        except IntegrityError:
+            if attempt == CONFLICT_ATTEMPTS - 1:
+                raise
+
+
+def _apply_reactions(profile_id, operations):
+    post_ids = sorted({post_id for post_id, _ in operations})
+    with transaction.atomic():
+        if settings.REACTION_COUNTER_MODE == "deltas":
+            found = set(Post.objects.filter(pk__in=post_ids).values_list("pk", flat=True))
+        else:
+            counters = {
+                pk: (likes, dislikes, created_at, author_id)
+                for pk, likes, dislikes, created_at, author_id in Post.objects.select_for_update()
+                .filter(pk__in=post_ids).order_by("pk")
+                .values_list("pk", "likes_count", "dislikes_count", "created_at", "author_id")
+            }
+            found = set(counters)
+        missing = [post_id for post_id in post_ids if post_id not in found]
+
+        initial = dict(
+            PostReaction.objects.select_for_update()
+            .filter(user_id=profile_id, post_id__in=found).order_by("post_id")
+            .values_list("post_id", "reaction")
+        )
+        final = replay_toggles(initial, [(post_id, value) for post_id, value in operations if post_id in found])
+
+        removed, created, switched = [], [], defaultdict(list)
+        likes, dislikes = {}, {}
+        for post_id in sorted(found):
+            before, after = initial.get(post_id), final.get(post_id)
+            if before == after:
+                continue
+            if after is None:
+                removed.append(post_id)
+            elif before is None:
+                created.append(post_id)
+            else:
+                switched[after].append(post_id)
+            likes[post_id] = (after == 1) - (before == 1)
+            dislikes[post_id] = (after == -1) - (before == -1)
+
+        if removed:
+            PostReaction.objects.filter(user_id=profile_id, post_id__in=removed).delete()
+        if created:
+            PostReaction.objects.bulk_create(
+                PostReaction(user_id=profile_id, post_id=post_id, reaction=final[post_id]) for post_id in created
+            )
+        for value, ids in switched.items():
+            PostReaction.objects.filter(user_id=profile_id, post_id__in=ids).update(
+                reaction=value, updated_at=timezone.now(),
+            )
+
+        if likes and settings.REACTION_COUNTER_MODE == "deltas":
+            PostCounterDelta.objects.bulk_create(
+                PostCounterDelta(post_id=post_id, likes_delta=likes[post_id], dislikes_delta=dislikes[post_id])
+                for post_id in likes
+            )
+        elif likes:
+            # rows locked above: write the new counters and scores as plain values
+            new_likes, new_dislikes, scores = {}, {}, {}
+            for post_id in likes:
+                old_likes, old_dislikes, created_at, _ = counters[post_id]
+                new_likes[post_id] = old_likes + likes[post_id]
+                new_dislikes[post_id] = old_dislikes + dislikes[post_id]
+                scores[post_id] = hot_score(new_likes[post_id], new_dislikes[post_id], created_at)
+            Post.objects.filter(pk__in=list(likes)).update(
+                likes_count=_counter_case(new_likes),
+                dislikes_count=_counter_case(new_dislikes),
+                hot_score=hot_score_case(scores),
+                reactions_changed_at=timezone.now(),
+            )
+            profile_stats.credit((counters[post_id][3], likes[post_id], dislikes[post_id]) for post_id in likes)
+    return {post_id: final.get(post_id) for post_id in sorted(found)}, missing
+
+
+def with_pending_counts(queryset):
+    """Annotate posts with counters that include deltas not folded in yet."""
+    return queryset.annotate(
+        pending_likes=Coalesce(Sum("counter_deltas__likes_delta"), 0),
+        pending_dislikes=Coalesce(Sum("counter_deltas__dislikes_delta"), 0),
+    ).annotate(
+        current_likes=F("likes_count") + F("pending_likes"),
+        current_dislikes=F("dislikes_count") + F("pending_dislikes"),
+    )
+
+
+def fold_counter_deltas(batch_size=10000):
+    """
+    Fold up to `batch_size` pending deltas into the Post counters.
+    Returns the ids of the posts that changed.
+
+    The batch is read and deleted by explicit id, so deltas committed while we
+    run are left for the next pass rather than dropped; rows are claimed with
+    SKIP LOCKED so several folders can run side by side.
+    """
+    with transaction.atomic():
+        rows = list(
+            PostCounterDelta.objects.select_for_update(skip_locked=True).order_by("id")
+            .values_list("id", "post_id", "likes_delta", "dislikes_delta")[:batch_size]
+        )
+        if not rows:
+            return []
+
+        totals = defaultdict(lambda: [0, 0])
+        for _, post_id, likes_delta, dislikes_delta in rows:
+            totals[post_id][0] += likes_delta
+            totals[post_id][1] += dislikes_delta
+
+        # consistent lock order across concurrent folders: the posts, then their authors
+        authors = dict(
+            Post.objects.select_for_update().filter(pk__in=list(totals)).order_by("pk")
+            .values_list("pk", "author_id")
+        )
+        for post_id in sorted(totals):
+            likes_delta, dislikes_delta = totals[post_id]
+            if likes_delta or dislikes_delta:
+                Post.objects.filter(pk=post_id).update(
+                    likes_count=F("likes_count") + likes_delta,
+                    dislikes_count=F("dislikes_count") + dislikes_delta,
+                    reactions_changed_at=timezone.now(),
+                )
+        profile_stats.credit(
+            (authors[post_id], *totals[post_id]) for post_id in sorted(totals) if post_id in authors
+        )
+        PostCounterDelta.objects.filter(id__in=[row[0] for row in rows]).delete()
+        refresh_hot_scores(sorted(totals))
+
+        changed = sorted(totals)
+        transaction.on_commit(lambda: _invalidate_posts(changed))
+    return changed
+
+
+def _invalidate_posts(post_ids):
+    for post_id in post_ids:
+        feed_cache.post_changed(post_id)
+
+
+# --- reconciliation ---
+# likes / dislikes: the values likes_count / dislikes_count should hold
+Drift = namedtuple("Drift", "post_id likes_count dislikes_count likes dislikes")
+
+
+def _pending(field):
+    deltas = (
+        PostCounterDelta.objects.filter(post=OuterRef("pk")).order_by()
+        .values("post").annotate(total=Sum(field)).values("total")
+    )
+    return Coalesce(Subquery(deltas, output_field=IntegerField()), 0)
+
+
+def _audit(post_ids):
+    """
+    One grouped aggregate over the batch: stored counters, reaction counts and
+    the deltas not folded in yet, all read from the same snapshot.
+    """
+    rows = (
+        Post.objects.filter(pk__in=post_ids).order_by()
+        .annotate(
+            actual_likes=Count("reactions", filter=Q(reactions__reaction=1)),
+            actual_dislikes=Count("reactions", filter=Q(reactions__reaction=-1)),
+            pending_likes=_pending("likes_delta"),
+            pending_dislikes=_pending("dislikes_delta"),
+        )
+        .values_list(
+            "pk", "likes_count", "dislikes_count",
+            "actual_likes", "actual_dislikes", "pending_likes", "pending_dislikes",
+        )
+    )
+    drifts = []
+    for pk, likes_count, dislikes_count, likes, dislikes, pending_likes, pending_dislikes in rows:
+        # pending deltas are added by the next fold, so the row must not include them yet
+        expected = (likes - pending_likes, dislikes - pending_dislikes)
+        if (likes_count, dislikes_count) != expected:
+            drifts.append(Drift(pk, likes_count, dislikes_count, *expected))
+    return drifts
+
+
+def reconcile_posts(post_ids, dry_run=False):
+    """
+    Audit the given posts and, unless `dry_run`, correct the counters that
+    drifted. Returns the drifts found (as read under the row locks).
+
+    The audit itself takes no locks; only drifted rows are locked (in id order),
+    re-audited and fixed with one UPDATE, so the transaction stays short.
+    """
+    drifts = _audit(post_ids)
+    if not drifts or dry_run:
+        return drifts
+
+    with transaction.atomic():
+        authors = dict(
+            Post.objects.select_for_update().filter(pk__in=[drift.post_id for drift in drifts])
+            .order_by("pk").values_list("pk", "author_id")
+        )
+        drifts = _audit(list(authors))
+        if drifts:
+            Post.objects.filter(pk__in=[drift.post_id for drift in drifts]).update(
+                likes_count=_counter_case({drift.post_id: drift.likes for drift in drifts}),
+                dislikes_count=_counter_case({drift.post_id: drift.dislikes for drift in drifts}),
+            )
+            # the authors' totals were built on the drifted counters: recount them from the fixed ones
+            profile_stats.reconcile_profiles(sorted({authors[drift.post_id] for drift in drifts}))
+            changed = [drift.post_id for drift in drifts]
+            refresh_hot_scores(changed)
+            transaction.on_commit(lambda: _invalidate_posts(changed))
+    return drifts
+
+
+def reconcile_counts(since=None, batch_size=1000, dry_run=False, rescore=False):
+    """
+    Reconcile all posts, or with `since` only those whose counters or pending
+    deltas changed at or after it, in id-ordered batches; with `rescore` also
+    recompute their hot scores (after a change to core/ranking.py).
+    Yields (posts checked, drifts) per batch.
+    """
+    posts = Post.objects.order_by("pk")
+    if since is not None:
+        posts = posts.filter(
+            Q(reactions_changed_at__gte=since)
+            | Q(pk__in=PostCounterDelta.objects.filter(created_at__gte=since).values("post_id"))
+        )
+    last = 0
+    while True:
+        post_ids = list(posts.filter(pk__gt=last).values_list("pk", flat=True)[:batch_size])
+        if not post_ids:
+            return
+        last = post_ids[-1]
+        drifts = reconcile_posts(post_ids, dry_run=dry_run)
+        if rescore and not dry_run:
+            with transaction.atomic():
+                refresh_hot_scores(post_ids)
+        yield len(post_ids), drifts
@@ -0,0 +1,202 @@
+# core/realtime.py
+"""
+Live feed updates pushed to the browser (GET /api/stream/, Server-Sent Events).
+
+Writers publish into an in-process broker: reaction views the new counters of
+a post, post creation a new-post notice. Nothing is sent right away; every
+REALTIME_WINDOW seconds a flusher thread takes what accumulated, keeping only
+the latest counters per post, and hands each subscriber one batch with the
+counters of the posts it is showing plus the new-post notices. A post liked a
+hundred times in a window costs each viewer one event.
+
+Subscribers are either asyncio queues (the stream served by an ASGI server)
+or plain thread queues (WSGI / runserver), so publishing is thread safe and
+never blocks on a slow client: a full queue drops the batch, and the next one
+carries the current counters anyway.
+
+Long-lived streams need an ASGI server (socialnet/asgi.py): there a stream is
+a coroutine. Under WSGI each open stream holds a worker thread, so `stream`
+ends after REALTIME_WSGI_STREAM_SECONDS and asks the browser to come back
+after REALTIME_WSGI_RETRY_SECONDS: short polls that cannot take the whole
+worker pool.
+
+The broker only sees the writes of its own process; with several workers,
+replace it by one backed by a shared pub/sub (e.g. Redis) with the same
+publish / subscribe interface.
+"""
+import asyncio
+import json
+import logging
+import queue
+import threading
+import time
+
+from django.conf import settings
+
+QUEUE_SIZE = 100
+
+logger = logging.getLogger(__name__)
+
+
+class Subscription:
+    def __init__(self, post_ids, loop=None):
+        self.post_ids = frozenset(post_ids)
+        self.loop = loop
+        self.queue = asyncio.Queue(QUEUE_SIZE) if loop is not None else queue.Queue(QUEUE_SIZE)
+
+    def deliver(self, batch):
+        if self.loop is not None:
+            self.loop.call_soon_threadsafe(self._put, batch)
+        else:
+            self._put(batch)
+
+    def _put(self, batch):
+        try:
+            self.queue.put_nowait(batch)
+        except (asyncio.QueueFull, queue.Full):
+            pass
+
+
+class Broker:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._counts = {}
+        self._new_posts = []
+        self._subscribers = set()
+        self._flusher = None
+
+    # --- publishing (any thread) ---
+    def counts_changed(self, post_id, likes_count, dislikes_count):
+        with self._lock:
+            if self._subscribers:
+                self._counts[post_id] = {"likes_count": likes_count, "dislikes_count": dislikes_count}
+
+    def post_created(self, post_id, author):
+        with self._lock:
+            if self._subscribers:
+                self._new_posts.append({"id": post_id, "author": author})
+
+    # --- subscribing ---
+    def subscribe(self, post_ids, loop=None):
+        subscription = Subscription(post_ids, loop)
+        with self._lock:
+            self._subscribers.add(subscription)
+            if self._flusher is None:
+                self._flusher = threading.Thread(target=self._run, name="realtime-flusher", daemon=True)
+                self._flusher.start()
+        return subscription
+
+    def unsubscribe(self, subscription):
+        with self._lock:
+            self._subscribers.discard(subscription)
+
+    # --- delivery ---
+    def flush(self):
+        """Send what accumulated since the last flush; returns the number of batches delivered."""
+        with self._lock:
+            counts, new_posts = self._counts, self._new_posts
+            self._counts, self._new_posts = {}, []
+            subscribers = list(self._subscribers)
+        delivered = 0
+        if not counts and not new_posts:
+            return delivered
+        for subscription in subscribers:
+            batch = {}
+            visible = {str(pk): value for pk, value in counts.items() if pk in subscription.post_ids}
+            if visible:
+                batch["counts"] = visible
+            if new_posts:
+                batch["posts"] = new_posts
+            if not batch:
+                continue
+            try:
+                subscription.deliver(batch)
+            except Exception:
+                # e.g. the subscriber's event loop closed before it unsubscribed
+                logger.exception("Dropping realtime subscriber after a failed delivery")
+                self.unsubscribe(subscription)
+                continue
+            delivered += 1
+        return delivered
+
+    def _run(self):
+        """Flusher thread body; on the way out it clears `_flusher` so the next subscribe starts a new one."""
+        try:
+            while True:
+                time.sleep(settings.REALTIME_WINDOW)
+                try:
+                    self.flush()
+                except Exception:
+                    logger.exception("Realtime flush failed")
+        finally:
+            with self._lock:
+                if self._flusher is threading.current_thread():
+                    self._flusher = None
+
+
+broker = Broker()
+
+
+def counts_changed(post):
+    broker.counts_changed(post.pk, post.likes_count, post.dislikes_count)
+
+
+def post_created(post):
+    broker.post_created(post.pk, post.author.username)
+
+
+# --- Server-Sent Events encoding ---
+def sse_events(batch):
+    """One SSE event per kind in the batch: `counts` ({post id: counters}) and `posts` (new-post notices)."""
+    return "".join(
+        f"event: {kind}\ndata: {json.dumps(batch[kind], separators=(',', ':'))}\n\n"
+        for kind in ("counts", "posts") if kind in batch
+    )
+
+
+def sse_preamble(retry_seconds):
+    """Tell EventSource how long to wait before reconnecting once the stream ends."""
+    return f"retry: {int(retry_seconds * 1000)}\n\n"
+
+
+SSE_PREAMBLE = sse_preamble(3)
+SSE_HEARTBEAT = ": ping\n\n"
+
+
+async def astream(post_ids):
+    """Async SSE body for `post_ids`; ends after REALTIME_STREAM_SECONDS and the browser reconnects."""
+    subscription = broker.subscribe(post_ids, asyncio.get_running_loop())
+    deadline = time.monotonic() + settings.REALTIME_STREAM_SECONDS
+    try:
+        yield SSE_PREAMBLE
+        while (remaining := deadline - time.monotonic()) > 0:
+            try:
+                batch = await asyncio.wait_for(
+                    subscription.queue.get(), min(settings.REALTIME_HEARTBEAT, remaining)
+                )
+            except asyncio.TimeoutError:
+                yield SSE_HEARTBEAT
+                continue
+            yield sse_events(batch)
+    finally:
+        broker.unsubscribe(subscription)
+
+
+def stream(post_ids):
+    """
+    `astream` for WSGI servers: blocks this request's thread between events, so
+    it ends after REALTIME_WSGI_STREAM_SECONDS (see above).
+    """
+    subscription = broker.subscribe(post_ids)
+    deadline = time.monotonic() + min(settings.REALTIME_STREAM_SECONDS, settings.REALTIME_WSGI_STREAM_SECONDS)
+    try:
+        yield sse_preamble(settings.REALTIME_WSGI_RETRY_SECONDS)
+        while (remaining := deadline - time.monotonic()) > 0:
+            try:
+                batch = subscription.queue.get(timeout=min(settings.REALTIME_HEARTBEAT, remaining))
+            except queue.Empty:
+                yield SSE_HEARTBEAT
+                continue
+            yield sse_events(batch)
+    finally:
+        broker.unsubscribe(subscription)
@@ -0,0 +1,120 @@
+# core/routing.py
+"""
+Read replica routing.
+
+Writes, and reads by default, go to the primary (`default`). Views that only
+read (ReplicaReadsMixin: the feed, profile and search GETs) send their queries
+to one of DATABASE_REPLICAS for the rest of the request, picked at random.
+
+Replicas lag behind the primary, so a user who just wrote (any successful
+POST / PUT / PATCH / DELETE, e.g. a reaction or a new post) reads from the
+primary for REPLICA_STICKY_SECONDS afterwards and sees their own write
+(ReplicaStickinessMiddleware). The mark is kept in the default cache; with
+several web processes that cache has to be shared (Redis, Memcached) for the
+stickiness to follow the user across them.
+
+Whatever goes into a shared cache is read from the PRIMARY explicitly (see
+core/feed_cache.py): a lagging replica's rows would otherwise be cached for
+everyone, the sticky writer included, long after the replica caught up.
+
+Nothing here is active unless DATABASE_REPLICAS is set (DB_REPLICA_HOSTS).
+"""
+import random
+from contextvars import ContextVar
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.core.cache import cache
+from django.core.exceptions import MiddlewareNotUsed
+from rest_framework.permissions import SAFE_METHODS
+
+PRIMARY = "default"
+
+# alias the current request reads from; None = the primary
+_read_alias = ContextVar("read_alias", default=None)
+
+
+class ReplicaRouter:
+    def db_for_read(self, model, **hints):
+        return _read_alias.get()
+
+    def db_for_write(self, model, **hints):
+        return PRIMARY
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # replicas hold the same rows as the primary
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        return False if db != PRIMARY and db in settings.DATABASE_REPLICAS else None
+
+
+def _sticky_key(user_id):
+    return f"db-sticky:{user_id}"
+
+
+def mark_sticky(user):
+    cache.set(_sticky_key(user.pk), True, settings.REPLICA_STICKY_SECONDS)
+
+
+def is_sticky(user):
+    return cache.get(_sticky_key(user.pk)) is not None
+
+
+class ReplicaReadsMixin:
+    """
+    For read-only API views: safe requests read from a replica unless the user
+    wrote recently. Authentication and permission checks still read from the
+    primary; the switch happens right before the handler runs.
+    """
+
+    def initial(self, request, *args, **kwargs):
+        super().initial(request, *args, **kwargs)
+        if (
+            settings.DATABASE_REPLICAS
+            and request.method in SAFE_METHODS
+            and not (request.user.is_authenticated and is_sticky(request.user))
+        ):
+            self._read_alias_token = _read_alias.set(random.choice(settings.DATABASE_REPLICAS))
+
+    def finalize_response(self, request, response, *args, **kwargs):
+        token = getattr(self, "_read_alias_token", None)
+        if token is not None:
+            _read_alias.reset(token)
+            self._read_alias_token = None
+        return super().finalize_response(request, response, *args, **kwargs)
+
+
+class ReplicaStickinessMiddleware:
+    """
+    Marks the user as sticky to the primary after a successful write. Runs on
+    both the sync and the async views; removed from the stack at startup when
+    no replicas are configured.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        if not settings.DATABASE_REPLICAS:
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        response = self.get_response(request)
+        self.process(request, response)
+        return response
+
+    async def __acall__(self, request):
+        response = await self.get_response(request)
+        self.process(request, response)
+        return response
+
+    def process(self, request, response):
+        # DRF hands the authenticated user back to the Django request
+        user = getattr(request, "user", None)
+        if request.method not in SAFE_METHODS and response.status_code < 400 and user and user.is_authenticated:
+            mark_sticky(user)
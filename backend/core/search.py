@@ -0,0 +1,116 @@
+# core/search.py
+"""
+Full-text search over post descriptions and profiles (GET /api/search/).
+
+The indexes live in the database and are maintained by it on every write
+(migration 0010):
+
+- PostgreSQL: GIN expression indexes on to_tsvector('english', description)
+  and to_tsvector('simple', username || ' ' || bio), plus a pg_trgm index on
+  username for partial / misspelt names. The migration creates the pg_trgm
+  extension, which takes the CREATE privilege on the database (superuser
+  before PostgreSQL 13); without it, an administrator runs
+  `CREATE EXTENSION pg_trgm;` once before migrating.
+- SQLite (local runs, tests): FTS5 external-content tables core_post_fts
+  (porter stemming) and core_profile_fts (trigram), kept in sync by triggers.
+  SQLite rebuilds a table for most AddField / AlterField operations, dropping
+  its triggers: a migration that does so re-creates that table's index
+  afterwards (as 0011 does for core_profile).
+
+A search is one statement returning `(id, rank)` for one page, best match
+first, with a keyset cursor on (rank, id); the index narrows the candidates
+to the rows containing the terms, so latency follows the number of matches,
+not the size of the table. Other databases fall back to unindexed icontains.
+"""
+import re
+
+from django.db import connection
+
+from .models import Post, Profile
+
+_WORD_RE = re.compile(r"\w+")
+
+# --- PostgreSQL ---
+_PG_POSTS = """
+SELECT id, rank FROM (
+    SELECT p.id, ts_rank(to_tsvector('english', p.description), q)::float8 AS rank
+    FROM core_post p, websearch_to_tsquery('english', %(text)s) q
+    WHERE to_tsvector('english', p.description) @@ q
+) hits
+{after}
+ORDER BY rank DESC, id DESC
+LIMIT %(limit)s
+"""
+
+_PG_PROFILES = """
+SELECT id, rank FROM (
+    SELECT p.id,
+           (ts_rank(to_tsvector('simple', p.username || ' ' || p.bio), q) + similarity(p.username, %(text)s))::float8
+           AS rank
+    FROM core_profile p, websearch_to_tsquery('simple', %(text)s) q
+    WHERE to_tsvector('simple', p.username || ' ' || p.bio) @@ q OR p.username %% %(text)s
+) hits
+{after}
+ORDER BY rank DESC, id DESC
+LIMIT %(limit)s
+"""
+
+# --- SQLite FTS5 (bm25 is lower-is-better) ---
+_SQLITE_SEARCH = """
+SELECT id, rank FROM (
+    SELECT rowid AS id, -bm25({table}) AS rank FROM {table} WHERE {table} MATCH %(text)s
+)
+{after}
+ORDER BY rank DESC, id DESC
+LIMIT %(limit)s
+"""
+
+_AFTER = "WHERE rank < %(rank)s OR (rank = %(rank)s AND id < %(id)s)"
+
+
+def _fts5_terms(text):
+    # quoted terms: user input is never parsed as FTS5 syntax
+    return " ".join(f'"{word}"' for word in _WORD_RE.findall(text))
+
+
+def _fts5_phrase(text):
+    return '"' + text.replace('"', '""') + '"'
+
+
+def search(kind, text, after, limit):
+    """
+    One page of `kind` ("posts" / "profiles") matching `text`: [(id, rank), ...],
+    best first, starting after the `(rank, id)` cursor position `after` (or None).
+    """
+    params = {"text": text, "limit": limit}
+    if after is not None:
+        params["rank"], params["id"] = after
+    where = _AFTER if after is not None else ""
+
+    if connection.vendor == "postgresql":
+        sql = (_PG_POSTS if kind == "posts" else _PG_PROFILES).format(after=where)
+    elif connection.vendor == "sqlite":
+        if kind == "posts":
+            params["text"] = _fts5_terms(text)
+        else:
+            params["text"] = _fts5_phrase(text)
+        if not params["text"].strip('"'):
+            return []
+        sql = _SQLITE_SEARCH.format(table=f"core_{kind[:-1]}_fts", after=where)
+    else:
+        return _unindexed(kind, text, after, limit)
+
+    with connection.cursor() as cursor:
+        cursor.execute(sql, params)
+        return [(pk, float(rank)) for pk, rank in cursor.fetchall()]
+
+
+def _unindexed(kind, text, after, limit):
+    """Sequential-scan fallback for other databases: every match ranks 1.0, newest id first."""
+    if kind == "posts":
+        queryset = Post.objects.filter(description__icontains=text)
+    else:
+        queryset = Profile.objects.filter(username__icontains=text) | Profile.objects.filter(bio__icontains=text)
+    if after is not None:
+        queryset = queryset.filter(pk__lt=after[1])
+    return [(pk, 1.0) for pk in queryset.order_by("-pk").values_list("pk", flat=True)[:limit]]
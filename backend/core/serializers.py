@@ -2,9 +2,12 @@ from rest_framework import serializers
 from django.conf import settings
 from django.core.exceptions import ValidationError
 from django.utils.translation import gettext_lazy as _
+from django.db import transaction
 from django.db.models import Q
 
-from .models import Profile, Post, PostReaction
+from .images import srcset
+from .metrics import TimedSerializerMixin
+from .models import Profile, Post, PostReaction, ChunkedUpload
 
 # --- Helpers ---
 ALLOWED_IMAGE_TYPES = ("image/jpeg", "image/png")
@@ -26,9 +29,10 @@ def validate_image_file(file):
 
 
 # --- Serializers ---
-class ProfileSerializer(serializers.ModelSerializer):
+class ProfileSerializer(TimedSerializerMixin, serializers.ModelSerializer):
     user_email = serializers.EmailField(source="user.email", read_only=True)
     profile_image = serializers.ImageField(required=False, allow_null=True)
+    profile_image_srcset = serializers.SerializerMethodField(read_only=True)
 
     class Meta:
         model = Profile
@@ -40,6 +44,7 @@ class ProfileSerializer(serializers.ModelSerializer):
             "location",
             "phone",
             "profile_image",
+            "profile_image_srcset",
             "date_of_birth",
             "created_at",
             "updated_at",
@@ -51,6 +56,32 @@ class ProfileSerializer(serializers.ModelSerializer):
             validate_image_file(file)
         return file
 
+    def get_profile_image_srcset(self, obj):
+        return srcset(obj.profile_image, obj.profile_image_variants, self.context.get("request"))
+
+
+class PublicProfileSerializer(serializers.ModelSerializer):
+    """What other users may see of a profile (search results, author pages)."""
+    profile_image_srcset = serializers.SerializerMethodField(read_only=True)
+
+    class Meta:
+        model = Profile
+        fields = (
+            "id",
+            "username",
+            "bio",
+            "profile_image",
+            "profile_image_srcset",
+            "followers_count",
+            "posts_count",
+            "likes_received",
+            "dislikes_received",
+        )
+        read_only_fields = fields
+
+    def get_profile_image_srcset(self, obj):
+        return srcset(obj.profile_image, obj.profile_image_variants, self.context.get("request"))
+
 
 class PostReactionSerializer(serializers.ModelSerializer):
     # Accept 'like'/'dislike' strings on input
@@ -76,10 +107,41 @@ class PostReactionSerializer(serializers.ModelSerializer):
         return rep
 
 
-class PostSerializer(serializers.ModelSerializer):
+def get_viewer_profile(request):
+    """The authenticated user's Profile, or None (anonymous / profile missing)."""
+    if request is None or not request.user.is_authenticated:
+        return None
+    try:
+        return request.user.profile
+    except Exception:
+        return None
+
+
+class PostListSerializer(TimedSerializerMixin, serializers.ListSerializer):
+    """
+    Feed rendering path: loads the viewer's reactions for the whole page in a
+    single query instead of one `reactions.filter(...)` per post.
+    Pair it with a queryset that does `select_related("author")`. Callers that
+    already know the reactions can pass them as context["user_reactions"].
+    """
+
+    def to_representation(self, data):
+        posts = list(data.all() if hasattr(data, "all") else data)
+        profile = get_viewer_profile(self.context.get("request"))
+        if profile is not None and posts and "user_reactions" not in self.context:
+            self.context["user_reactions"] = dict(
+                PostReaction.objects.filter(
+                    user=profile, post__in=[post.pk for post in posts]
+                ).values_list("post_id", "reaction")
+            )
+        return super().to_representation(posts)
+
+
+class PostSerializer(TimedSerializerMixin, serializers.ModelSerializer):
     author = serializers.CharField(source="author.username", read_only=True)
     author_id = serializers.IntegerField(source="author.id", read_only=True)
     image = serializers.ImageField(required=True)
+    image_srcset = serializers.SerializerMethodField(read_only=True)
     likes_count = serializers.IntegerField(read_only=True)
     dislikes_count = serializers.IntegerField(read_only=True)
     user_reaction = serializers.SerializerMethodField(read_only=True)
@@ -91,6 +153,7 @@ class PostSerializer(serializers.ModelSerializer):
             "author",
             "author_id",
             "image",
+            "image_srcset",
             "description",
             "likes_count",
             "dislikes_count",
@@ -99,25 +162,29 @@ class PostSerializer(serializers.ModelSerializer):
             "updated_at",
         )
         read_only_fields = ("id", "author", "likes_count", "dislikes_count", "created_at", "updated_at")
+        list_serializer_class = PostListSerializer
 
     def validate_image(self, file):
         if file:
             validate_image_file(file)
         return file
 
+    def get_image_srcset(self, obj):
+        return srcset(obj.image, obj.image_variants, self.context.get("request"))
+
     def get_user_reaction(self, obj):
-        request = self.context.get("request", None)
-        if request is None or not request.user.is_authenticated:
-            return None
-        # the Profile object may not exist for the user (ensure it does)
-        try:
-            profile = request.user.profile
-        except Exception:
+        # batched path: PostListSerializer already fetched the page's reactions
+        user_reactions = self.context.get("user_reactions")
+        if user_reactions is not None:
+            value = user_reactions.get(obj.pk)
+        else:
+            profile = get_viewer_profile(self.context.get("request", None))
+            if profile is None:
+                return None
+            value = obj.reactions.filter(user=profile).values_list("reaction", flat=True).first()
+        if value is None:
             return None
-        reaction_obj = obj.reactions.filter(user=profile).first()
-        if not reaction_obj:
-            return None
-        return "like" if reaction_obj.reaction == 1 else "dislike"
+        return "like" if value == 1 else "dislike"
 
     def create(self, validated_data):
         """
@@ -133,4 +200,41 @@ class PostSerializer(serializers.ModelSerializer):
             raise serializers.ValidationError("Profile not found for current user.")
 
         validated_data["author"] = profile
-        return super().create(validated_data)
+        post = super().create(validated_data)
+
+        from . import feed_cache, realtime
+        transaction.on_commit(lambda: feed_cache.post_created(post))
+        transaction.on_commit(lambda: realtime.post_created(post))
+        return post
+
+
+class ChunkedUploadSerializer(TimedSerializerMixin, serializers.ModelSerializer):
+    """Start / inspect a resumable post-image upload (see core/uploads.py)."""
+    size = serializers.IntegerField(source="total_size", min_value=1, max_value=MAX_IMAGE_SIZE)
+
+    class Meta:
+        model = ChunkedUpload
+        fields = ("id", "filename", "size", "offset", "content_type", "width", "height", "sha256", "post", "created_at")
+        read_only_fields = ("id", "offset", "content_type", "width", "height", "sha256", "post", "created_at")
+
+
+class ChunkedUploadCompleteSerializer(serializers.Serializer):
+    description = serializers.CharField(required=False, allow_blank=True, max_length=1000)
+
+
+class ReactionOperationSerializer(serializers.Serializer):
+    post_id = serializers.IntegerField(min_value=1)
+    reaction = serializers.ChoiceField(choices=("like", "dislike"))
+
+
+class BulkReactionSerializer(serializers.Serializer):
+    operations = serializers.ListField(
+        child=ReactionOperationSerializer(), allow_empty=False, max_length=settings.REACTION_BULK_MAX_OPERATIONS,
+    )
+
+    def validated_operations(self):
+        """[(post_id, 1 / -1), ...] in request order."""
+        return [
+            (operation["post_id"], 1 if operation["reaction"] == "like" else -1)
+            for operation in self.validated_data["operations"]
+        ]
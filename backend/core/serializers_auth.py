@@ -1,7 +1,8 @@
 # core/serializers_auth.py
 from rest_framework import serializers
 from django.contrib.auth.models import User
-from django.contrib.auth import authenticate
+
+from . import passwords
 
 
 class SignupSerializer(serializers.ModelSerializer):
@@ -16,7 +17,7 @@ class SignupSerializer(serializers.ModelSerializer):
             username=validated_data["username"],
             email=validated_data["email"]
         )
-        user.set_password(validated_data["password"])
+        user.password = passwords.make_password(validated_data["password"])
         user.save()
         return user
 
@@ -26,7 +27,7 @@ class LoginSerializer(serializers.Serializer):
     password = serializers.CharField(write_only=True)
 
     def validate(self, data):
-        user = authenticate(
+        user = passwords.authenticate(
             username=data.get("username"),
             password=data.get("password")
         )
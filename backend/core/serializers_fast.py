@@ -0,0 +1,106 @@
+# core/serializers_fast.py
+"""
+Precompiled read-side representations of Post and Profile.
+
+A DRF ModelSerializer builds its Field objects per instance tree and dispatches
+every value through get_attribute / to_representation into an OrderedDict.
+Here each field is a plain getter compiled once at import, and a
+representation is one dict comprehension over the wanted names. The output is
+the same as PostSerializer / ProfileSerializer (core/tests.py checks it); the
+feed cache fill and GET /api/profile/ use it, writes keep the DRF serializers.
+
+`?fields=a,b` sparse fieldsets are parsed by `sparse_fields`: only the listed
+keys are built and sent, which also skips the absolute-URL work for the image
+fields when they aren't asked for.
+"""
+from django.conf import settings
+from django.utils import timezone
+from rest_framework.exceptions import ValidationError
+
+from .images import srcset
+from .serializers import PostSerializer, ProfileSerializer
+
+POST_FIELDS = PostSerializer.Meta.fields
+PROFILE_FIELDS = ProfileSerializer.Meta.fields
+
+
+def sparse_fields(query_params, available):
+    """The `?fields=` subset of `available` in canonical order, or None for all of them."""
+    raw = query_params.get("fields")
+    if not raw:
+        return None
+    requested = {name.strip() for name in raw.split(",") if name.strip()}
+    unknown = requested.difference(available)
+    if unknown:
+        raise ValidationError({"fields": [f"Unknown field(s): {', '.join(sorted(unknown))}."]})
+    return tuple(name for name in available if name in requested)
+
+
+# --- value conversions, as the DRF fields do them ---
+def _datetime(value):
+    if value is None:
+        return None
+    if settings.USE_TZ:
+        value = timezone.localtime(value)
+    value = value.isoformat()
+    return value[:-6] + "Z" if value.endswith("+00:00") else value
+
+
+def _date(value):
+    return value.isoformat() if value is not None else None
+
+
+def _file_url(field_file, request):
+    if not field_file:
+        return None
+    url = field_file.url
+    return request.build_absolute_uri(url) if request is not None else url
+
+
+# --- Post (viewer independent: user_reaction is the feed overlay's job) ---
+_POST_GETTERS = {
+    "id": lambda post, request: post.pk,
+    "author": lambda post, request: post.author.username,
+    "author_id": lambda post, request: post.author_id,
+    "image": lambda post, request: _file_url(post.image, request),
+    "image_srcset": lambda post, request: srcset(post.image, post.image_variants, request),
+    "description": lambda post, request: post.description,
+    "likes_count": lambda post, request: post.likes_count,
+    "dislikes_count": lambda post, request: post.dislikes_count,
+    "user_reaction": lambda post, request: None,
+    "created_at": lambda post, request: _datetime(post.created_at),
+    "updated_at": lambda post, request: _datetime(post.updated_at),
+}
+
+
+def post_data(post, request=None, fields=POST_FIELDS):
+    """PostSerializer(post).data for no viewer; relative URLs unless `request` is given."""
+    return {name: _POST_GETTERS[name](post, request) for name in fields}
+
+
+def posts_data(posts, request=None, fields=POST_FIELDS):
+    getters = [(name, _POST_GETTERS[name]) for name in fields]
+    return [{name: getter(post, request) for name, getter in getters} for post in posts]
+
+
+# --- Profile (the owner's view of it) ---
+_PROFILE_GETTERS = {
+    "id": lambda profile, request: profile.pk,
+    "username": lambda profile, request: profile.username,
+    "user_email": lambda profile, request: profile.user.email,
+    "bio": lambda profile, request: profile.bio,
+    "location": lambda profile, request: profile.location,
+    "phone": lambda profile, request: profile.phone,
+    "profile_image": lambda profile, request: _file_url(profile.profile_image, request),
+    "profile_image_srcset": lambda profile, request: srcset(
+        profile.profile_image, profile.profile_image_variants, request
+    ),
+    "date_of_birth": lambda profile, request: _date(profile.date_of_birth),
+    "created_at": lambda profile, request: _datetime(profile.created_at),
+    "updated_at": lambda profile, request: _datetime(profile.updated_at),
+}
+
+
+def profile_data(profile, request=None, fields=PROFILE_FIELDS):
+    """ProfileSerializer(profile).data; select_related("user") when user_email is wanted."""
+    return {name: _PROFILE_GETTERS[name](profile, request) for name in fields}
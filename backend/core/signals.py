@@ -1,9 +1,17 @@
 # core/signals.py
 from django.contrib.auth import get_user_model
-from django.db.models.signals import post_save
+from django.db.models import F
+from django.db.models.signals import post_delete, post_init, post_save
 from django.dispatch import receiver
 
-from .models import Profile
+from .authentication import user_cache
+from .images import needs_variants, process_post_image, process_profile_image
+from .models import Post, Profile
+from .profile_stats import post_deleted
+from .storage import acquire, release
+from .tasks import run_in_background
+from .timelines import fan_out_post
+from .usernames import create_profile
 
 User = get_user_model()
 
@@ -11,21 +19,88 @@ User = get_user_model()
 @receiver(post_save, sender=User)
 def create_or_update_profile(sender, instance, created, **kwargs):
     """
-    Whenever a User is created, ensure a Profile exists.
-    Also, when User is saved, we can update the profile if needed.
+    Whenever a User is created, ensure a Profile exists, under a unique username
+    derived from the login name or e-mail (see core/usernames.py).
     """
     if created:
-        # New user → create profile with a default username if missing
-        username = instance.username or (instance.email.split("@")[0] if instance.email else f"user_{instance.pk}")
-        # Ensure username is unique
-        base_username = username
-        counter = 1
-        while Profile.objects.filter(username=username).exists():
-            username = f"{base_username}_{counter}"
-            counter += 1
-
-        Profile.objects.create(user=instance, username=username)
-    else:
-        # Existing user saved → just save related profile if it exists
-        if hasattr(instance, "profile"):
-            instance.profile.save()
+        create_profile(instance)
+
+
+@receiver(post_save, sender=Post)
+def schedule_post_image_variants(sender, instance, **kwargs):
+    if needs_variants(instance.image, instance.image_variants):
+        run_in_background(process_post_image, instance.pk)
+
+
+@receiver(post_save, sender=Post)
+def schedule_post_fan_out(sender, instance, created, **kwargs):
+    if created:
+        run_in_background(fan_out_post, instance.pk)
+
+
+@receiver(post_save, sender=Profile)
+def schedule_profile_image_variants(sender, instance, **kwargs):
+    if needs_variants(instance.profile_image, instance.profile_image_variants):
+        run_in_background(process_profile_image, instance.pk)
+
+
+@receiver(post_delete, sender=Post)
+def update_author_stats(sender, instance, origin=None, **kwargs):
+    # a cascade from the author's own deletion: the totals go with the profile
+    if isinstance(origin, Post) or getattr(origin, "model", None) is Post:
+        post_deleted(instance)
+
+
+# --- media reference counts (see core/storage.py) ---
+MEDIA_FIELDS = {Post: "image", Profile: "profile_image"}
+
+
+def _stored_name(instance, field):
+    # read the raw attribute: touching a deferred field here would cost a query per row
+    value = instance.__dict__.get(field)
+    return getattr(value, "name", value) or ""
+
+
+@receiver(post_init, sender=Post)
+@receiver(post_init, sender=Profile)
+def remember_media_name(sender, instance, **kwargs):
+    instance._media_name = _stored_name(instance, MEDIA_FIELDS[sender])
+
+
+@receiver(post_save, sender=Post)
+@receiver(post_save, sender=Profile)
+def update_media_refs(sender, instance, created, **kwargs):
+    current = _stored_name(instance, MEDIA_FIELDS[sender])
+    previous = "" if created else instance._media_name
+    if current != previous:
+        acquire(current)
+        release(previous)
+    instance._media_name = current
+
+
+@receiver(post_delete, sender=Post)
+@receiver(post_delete, sender=Profile)
+def release_media_refs(sender, instance, **kwargs):
+    release(_stored_name(instance, MEDIA_FIELDS[sender]))
+
+
+# --- authentication cache (see core/authentication.py) ---
+@receiver(post_save, sender=User)
+@receiver(post_delete, sender=User)
+def evict_cached_user(sender, instance, **kwargs):
+    user_cache.evict(instance.pk)
+
+
+@receiver(post_save, sender=User)
+def revoke_tokens_on_password_change(sender, instance, created, **kwargs):
+    # set_password() leaves _password set until save() returns; hash upgrades
+    # (core/passwords.py, Django's check_password setter) do not
+    if not created and instance._password is not None:
+        Profile.objects.filter(user=instance).update(password_version=F("password_version") + 1)
+        user_cache.evict(instance.pk)
+
+
+@receiver(post_save, sender=Profile)
+@receiver(post_delete, sender=Profile)
+def evict_cached_profile_user(sender, instance, **kwargs):
+    user_cache.evict(instance.user_id)
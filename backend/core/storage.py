@@ -0,0 +1,137 @@
+# core/storage.py
+"""
+Content-addressed media storage and reference counting.
+
+Files are named after the SHA-256 of their content, so reposting the same
+image stores (and later resizes and serves) it once, and the URL stays the
+same for CDN and browser caches. MediaBlob rows count how many Post/Profile
+images point at each file; the file and its variants are removed once the
+count drops to zero.
+
+Reusing an existing file and deleting an unreferenced one are serialised on
+the MediaBlob row: `save` (and uploads.finish) decide under `hold`, which locks
+the row until the end of the transaction, and `collect` deletes the files while
+it holds the same lock. Post.save / Profile.save store the file and count the
+reference (core/signals.py) in one transaction, so a file cannot be collected
+between the two.
+"""
+import hashlib
+import os
+import tempfile
+
+from django.core.files import File
+from django.core.files.storage import FileSystemStorage, default_storage
+from django.db import IntegrityError, transaction
+from django.db.models import F
+from django.utils.encoding import filepath_to_uri
+
+from .models import MediaBlob
+
+
+def content_name(name, digest):
+    """`posts/whatever.PNG` + digest -> `posts/ab/<digest>.png`"""
+    directory = os.path.dirname(name)
+    extension = os.path.splitext(name)[1].lower()
+    return os.path.join(directory, digest[:2], digest + extension)
+
+
+class ContentAddressedStorage(FileSystemStorage):
+    """FileSystemStorage that stores each distinct content once, under its hash."""
+
+    def save(self, name, content, max_length=None):
+        if name is None:
+            name = content.name
+        if not hasattr(content, "chunks"):
+            content = File(content, name)
+
+        hasher = hashlib.sha256()
+        for chunk in content.chunks():
+            hasher.update(chunk)
+        name = content_name(name, hasher.hexdigest())
+
+        with transaction.atomic():
+            if hold(name, self):
+                return name
+            return super().save(name, content, max_length=max_length)
+
+    def get_available_name(self, name, max_length=None):
+        # the name is the content's hash: a file already there holds the same bytes
+        return name
+
+    def _save(self, name, content):
+        # write next to the target and rename over it: two saves of the same
+        # content racing past `hold` leave one complete file, never a partial
+        # one or a suffixed copy
+        full_path = self.path(name)
+        directory = os.path.dirname(full_path)
+        os.makedirs(directory, exist_ok=True)
+        fd, temporary = tempfile.mkstemp(dir=directory, prefix=".saving-")
+        try:
+            with os.fdopen(fd, "wb") as output:
+                for chunk in content.chunks():
+                    output.write(chunk)
+            if self.file_permissions_mode is not None:
+                os.chmod(temporary, self.file_permissions_mode)
+            os.replace(temporary, full_path)
+        except BaseException:
+            if os.path.exists(temporary):
+                os.remove(temporary)
+            raise
+        return name
+
+    def url(self, name):
+        # base_url always ends in "/" and stored names have no "." / ".." segments,
+        # so FileSystemStorage.url's urljoin comes down to a concatenation; it is
+        # called for every image URL in every serialized post
+        url = filepath_to_uri(name).lstrip("/")
+        if self.base_url is None or "/." in "/" + url:
+            return super().url(name)
+        return self.base_url + url
+
+
+def is_content_addressed():
+    return isinstance(default_storage, ContentAddressedStorage)
+
+
+# --- reference counting ---
+def hold(name, storage=None):
+    """
+    Lock `name`'s MediaBlob row (if it has one) until the transaction ends and
+    tell whether the stored file can be reused. A `collect` of that name has
+    either finished (row and files gone) or waits until we have counted our
+    reference and committed.
+    """
+    MediaBlob.objects.select_for_update().filter(name=name).first()
+    return (storage or default_storage).exists(name)
+
+
+def acquire(name):
+    if not name:
+        return
+    if MediaBlob.objects.filter(name=name).update(refcount=F("refcount") + 1):
+        return
+    try:
+        with transaction.atomic():
+            MediaBlob.objects.create(name=name, refcount=1)
+    except IntegrityError:
+        MediaBlob.objects.filter(name=name).update(refcount=F("refcount") + 1)
+
+
+def release(name):
+    if not name:
+        return
+    MediaBlob.objects.filter(name=name, refcount__gt=0).update(refcount=F("refcount") - 1)
+    transaction.on_commit(lambda: collect(name))
+
+
+def collect(name):
+    """Delete the file (and its variants) if nothing references it any more."""
+    with transaction.atomic():
+        blob = MediaBlob.objects.select_for_update().filter(name=name, refcount=0).first()
+        if blob is None:
+            return
+        names = [blob.name, *blob.variants.values()]
+        blob.delete()
+        # still under the row lock, so `hold` never sees a file that is about to go
+        for stored in names:
+            default_storage.delete(stored)
@@ -0,0 +1,50 @@
+# core/tasks.py
+"""
+Small in-process worker pool for work that should not hold up a request
+(image variants, ...). Jobs are queued once the surrounding transaction
+commits; with BACKGROUND_WORKERS = 0 they run inline instead.
+"""
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.db import connection, transaction
+
+logger = logging.getLogger(__name__)
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def get_executor():
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(
+                max_workers=settings.BACKGROUND_WORKERS,
+                thread_name_prefix="core-background",
+            )
+        return _executor
+
+
+def run_in_background(func, *args):
+    """Run `func(*args)` on the worker pool after the current transaction commits."""
+    def submit():
+        if settings.BACKGROUND_WORKERS <= 0:
+            _run(func, args, inline=True)
+        else:
+            get_executor().submit(_run, func, args)
+
+    transaction.on_commit(submit)
+
+
+def _run(func, args, inline=False):
+    try:
+        func(*args)
+    except Exception:
+        logger.exception("Background job %s%r failed", func.__name__, args)
+    finally:
+        # worker threads keep their own connection; don't leak it between jobs
+        if not inline:
+            connection.close()
@@ -1,3 +1,1146 @@
-from django.test import TestCase
+import base64
+import io
+import json
+import tempfile
+import os
+import time
+from datetime import timedelta
+from unittest import mock
 
-# Create your tests here.
+from PIL import Image
+from asgiref.sync import sync_to_async
+from django.contrib.auth.hashers import make_password
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.core.exceptions import ValidationError
+from django.core.files.storage import default_storage
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import CommandError, call_command
+from django.db import connection, transaction
+from django.db.models import F
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework.test import APITestCase
+
+from . import feed_cache, passwords, profile_stats, reactions, realtime
+from .authentication import tokens_for_user, user_cache
+from .usernames import allocate_username, bulk_create_users, taken_usernames
+from .models import ChunkedUpload, MediaBlob, Post, PostCounterDelta, PostReaction, Profile, TimelineEntry
+from .ranking import hot_score, refresh_hot_scores
+from .reactions import Drift, fold_counter_deltas, reconcile_counts, reconcile_posts
+from .routing import ReplicaRouter
+from .storage import collect
+from .uploads import expire_uploads, sniff_image
+from .serializers import PostSerializer, ProfileSerializer
+from .serializers_fast import post_data, profile_data
+from .views import ProfileView
+
+
+def make_image(name="test.png", size=(8, 8)):
+    buffer = io.BytesIO()
+    Image.new("RGB", size, "red").save(buffer, "PNG")
+    return SimpleUploadedFile(name, buffer.getvalue(), content_type="image/png")
+
+
+class FeedQueryCountTests(APITestCase):
+    """The feed must cost a constant number of queries per page, not 2N+1."""
+
+    def setUp(self):
+        self.viewer = User.objects.create_user("viewer", "viewer@example.com", "secret123")
+        self.author = User.objects.create_user("author", "author@example.com", "secret123")
+        self.client.force_authenticate(self.viewer)
+
+    def make_posts(self, count):
+        for i in range(count):
+            post = Post.objects.create(author=self.author.profile, image="posts/test.jpg", description=f"post {i}")
+            if i % 2 == 0:
+                PostReaction.objects.create(user=self.viewer.profile, post=post, reaction=1 if i % 4 == 0 else -1)
+
+    def fetch_feed(self):
+        # cold feed cache, and a fresh user object like the JWT authenticator gives us
+        feed_cache.get_cache().clear()
+        self.client.force_authenticate(User.objects.get(pk=self.viewer.pk))
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.get(reverse("posts"), {"page_size": 100})
+        self.assertEqual(response.status_code, 200)
+        return response, len(ctx.captured_queries)
+
+    def test_query_count_does_not_grow_with_page_size(self):
+        self.make_posts(3)
+        _, small_page = self.fetch_feed()
+        self.make_posts(30)
+        response, large_page = self.fetch_feed()
+
+        self.assertEqual(len(response.data["results"]), 33)
+        self.assertEqual(small_page, large_page)
+        # viewer profile, the page (authors joined), the viewer's reactions
+        self.assertLessEqual(large_page, 3)
+
+    def test_user_reaction_is_reported_per_post(self):
+        self.make_posts(4)
+        response, _ = self.fetch_feed()
+        reactions = {item["description"]: item["user_reaction"] for item in response.data["results"]}
+        self.assertEqual(reactions, {"post 0": "like", "post 1": None, "post 2": "dislike", "post 3": None})
+
+
+class KeysetPaginationTests(APITestCase):
+    def setUp(self):
+        feed_cache.get_cache().clear()
+        user = User.objects.create_user("pager", "pager@example.com", "secret123")
+        self.client.force_authenticate(user)
+        posts = [Post.objects.create(author=user.profile, image="posts/test.jpg") for _ in range(5)]
+        # three posts share a timestamp: the id breaks the tie
+        tied = timezone.now() - timedelta(hours=1)
+        Post.objects.filter(pk__in=[post.pk for post in posts[1:4]]).update(created_at=tied)
+        self.expected = list(Post.objects.order_by("-created_at", "-id").values_list("pk", flat=True))
+
+    def page(self, url, **params):
+        response = self.client.get(url, params)
+        self.assertEqual(response.status_code, 200)
+        return response.data
+
+    def test_forward_and_backward_pages_over_ties(self):
+        pages, url = [], reverse("posts") + "?page_size=2"
+        while url:
+            data = self.page(url)
+            pages.append([item["id"] for item in data["results"]])
+            url = data["next"]
+        self.assertEqual(pages, [self.expected[0:2], self.expected[2:4], self.expected[4:]])
+
+        last = self.page(reverse("posts") + "?page_size=2")
+        last = self.page(self.page(last["next"])["next"])
+        back = self.page(last["previous"])
+        self.assertEqual([item["id"] for item in back["results"]], self.expected[2:4])
+        self.assertEqual([item["id"] for item in self.page(back["previous"])["results"]], self.expected[0:2])
+
+    def test_invalid_or_tampered_cursors_are_not_found(self):
+        def token(payload):
+            return base64.urlsafe_b64encode(json.dumps(payload).encode()).decode().rstrip("=")
+
+        for cursor in ("!!!", token({"r": 0}), token({"r": 0, "p": [{"a": 1}, 1]}),
+                       token({"r": 0, "p": ["yesterday", "1"]}), token({"r": 0, "p": [None, True]}),
+                       token({"r": 0, "p": ["2026-01-01T00:00:00Z", [1]]})):
+            self.assertEqual(self.client.get(reverse("posts"), {"cursor": cursor}).status_code, 404, cursor)
+
+
+@override_settings(MEDIA_ROOT=tempfile.mkdtemp(), BACKGROUND_WORKERS=0)
+class FeedCacheTests(APITestCase):
+    def setUp(self):
+        feed_cache.get_cache().clear()
+        self.user = User.objects.create_user("reader", "reader@example.com", "secret123")
+        self.client.force_authenticate(self.user)
+        self.post = Post.objects.create(author=self.user.profile, image="posts/test.jpg", description="first")
+
+    def feed(self):
+        return self.client.get(reverse("posts")).data["results"]
+
+    def test_warm_feed_only_loads_the_viewer(self):
+        self.feed()
+        self.client.force_authenticate(User.objects.get(pk=self.user.pk))
+        with self.assertNumQueries(1):  # request.user.profile
+            self.feed()
+
+    def test_writes_update_cached_pages(self):
+        self.feed()
+        self.client.post(reverse("react-post", args=[self.post.pk]), {"reaction": "like"})
+        item = self.feed()[0]
+        self.assertEqual((item["likes_count"], item["user_reaction"]), (1, "like"))
+
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.post(reverse("posts"), {"image": make_image(), "description": "second"})
+        new_id = response.data["id"]
+        self.assertEqual([p["id"] for p in self.feed()], [new_id, self.post.pk])
+
+        self.client.delete(reverse("delete-post", args=[new_id]))
+        self.assertEqual([p["id"] for p in self.feed()], [self.post.pk])
+
+
+class ClaimsJWTAuthenticationTests(APITestCase):
+    def setUp(self):
+        feed_cache.get_cache().clear()
+        user_cache.clear()
+        self.user = User.objects.create_user("claims", "claims@example.com", "secret123")
+        token = tokens_for_user(self.user).access_token
+        self.assertEqual(token["profile_id"], self.user.profile.pk)
+        self.client.credentials(HTTP_AUTHORIZATION=f"Bearer {token}")
+
+    def test_warm_request_skips_the_user_lookup(self):
+        self.client.get(reverse("posts"))
+        with self.assertNumQueries(0):  # cached user, cached (empty) feed page
+            response = self.client.get(reverse("posts"))
+        self.assertEqual(response.status_code, 200)
+
+    def test_deactivation_and_password_change_take_effect(self):
+        self.client.get(reverse("posts"))
+        self.user.is_active = False
+        self.user.save()
+        self.assertEqual(self.client.get(reverse("posts")).status_code, 401)
+
+        self.user.is_active = True
+        self.user.set_password("changed123")
+        self.user.save()
+        self.assertEqual(self.client.get(reverse("posts")).status_code, 401)
+
+
+@override_settings(PASSWORD_HASH_WORKERS=0)
+class PasswordHashingTests(APITestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user("hasher", "hasher@example.com", "secret123")
+
+    def login(self, password):
+        return self.client.post(reverse("login"), {"username": "hasher", "password": password})
+
+    def test_old_hashes_are_upgraded_on_login(self):
+        User.objects.filter(pk=self.user.pk).update(password=make_password("secret123", hasher="pbkdf2_sha1"))
+        self.assertEqual(self.login("secret123").status_code, 200)
+        self.user.refresh_from_db()
+        self.assertTrue(self.user.password.startswith("pbkdf2_sha256$"))
+        self.assertEqual(self.login("secret123").status_code, 200)
+
+    def test_hash_upgrade_keeps_existing_tokens(self):
+        User.objects.filter(pk=self.user.pk).update(password=make_password("secret123", hasher="pbkdf2_sha1"))
+        self.user.refresh_from_db()
+        token = tokens_for_user(self.user).access_token
+        self.assertEqual(self.login("secret123").status_code, 200)
+        user_cache.clear()
+        self.client.credentials(HTTP_AUTHORIZATION=f"Bearer {token}")
+        self.assertEqual(self.client.get(reverse("posts")).status_code, 200)
+
+        self.user.refresh_from_db()
+        self.user.set_password("changed123")
+        self.user.save()
+        self.assertEqual(self.client.get(reverse("posts")).status_code, 401)
+
+    def test_repeated_failures_skip_the_hash_until_the_password_changes(self):
+        self.assertEqual(self.login("wrong").status_code, 400)
+        with mock.patch("core.passwords._check") as check:
+            self.assertEqual(self.login("wrong").status_code, 400)
+        check.assert_not_called()
+
+        self.user.set_password("wrong")
+        self.user.save()
+        self.assertEqual(self.login("wrong").status_code, 200)
+
+    @override_settings(PASSWORD_HASH_WORKERS=1)
+    def test_signup_and_login_through_the_process_pool(self):
+        self.addCleanup(passwords.shutdown)
+        response = self.client.post(
+            reverse("signup"), {"username": "pooled", "email": "pooled@example.com", "password": "secret123"}
+        )
+        self.assertEqual(response.status_code, 201)
+        self.assertTrue(User.objects.get(username="pooled").check_password("secret123"))
+        self.assertEqual(self.login("secret123").status_code, 200)
+
+
+class AsyncViewTests(APITestCase):
+    """The async endpoints answer exactly like their sync counterparts."""
+
+    def setUp(self):
+        feed_cache.get_cache().clear()
+        user_cache.clear()
+        self.user = User.objects.create_user("async", "async@example.com", "secret123")
+        self.post = Post.objects.create(author=self.user.profile, image="posts/test.jpg", description="first")
+        self.auth = f"Bearer {tokens_for_user(self.user).access_token}"
+        self.client.credentials(HTTP_AUTHORIZATION=self.auth)
+
+    async def test_feed_and_react_match_the_sync_views(self):
+        response = await self.async_client.post(
+            reverse("react-post-async", args=[self.post.pk]), {"reaction": "like"},
+            content_type="application/json", headers={"authorization": self.auth},
+        )
+        self.assertEqual((response.json()["likes_count"], response.json()["user_reaction"]), (1, "like"))
+
+        async_feed = (await self.async_client.get(reverse("posts-async"), headers={"authorization": self.auth})).json()
+        sync_feed = (await sync_to_async(self.client.get)(reverse("posts"))).json()
+        self.assertEqual(async_feed, sync_feed)
+        self.assertEqual(async_feed["results"][0]["user_reaction"], "like")
+
+    async def test_requires_a_token(self):
+        response = await self.async_client.get(reverse("posts-async"))
+        self.assertEqual(response.status_code, 401)
+
+
+class UsernameAllocationTests(TestCase):
+    def test_first_free_suffix_comes_from_one_query(self):
+        User.objects.create_user("sam", "a@example.com")
+        User.objects.create_user("sam_1", "b@example.com")
+        with self.assertNumQueries(1):
+            self.assertEqual(allocate_username("sam"), "sam_2")
+
+    def test_only_candidate_shaped_names_are_fetched(self):
+        for name in ("sam", "sam_3", "samantha", "sam_smith", "sam_3x", "xsam_1"):
+            User.objects.create_user(name, f"{name}@example.com")
+        self.assertEqual(taken_usernames(["sam"]), {"sam", "sam_3"})
+        long_base = "y" * 30
+        for name in (long_base, "y" * 28 + "_1", "y" * 27 + "_12", "y" * 29):
+            User.objects.create_user(name, f"{name}@example.com")
+        self.assertEqual(taken_usernames([long_base]), {long_base, "y" * 28 + "_1", "y" * 27 + "_12"})
+
+    def test_bulk_create_users_allocates_across_the_batch(self):
+        renamed = User.objects.create_user("renamed", "renamed@example.com")
+        Profile.objects.filter(user=renamed).update(username="dup")
+        users = bulk_create_users([
+            User(username="dup", password="!"),
+            User(username="x" * 40, password="!"),
+            User(username="x" * 41, password="!"),
+        ])
+        self.assertEqual([user.profile.username for user in users], ["dup_1", "x" * 30, "x" * 28 + "_1"])
+        self.assertEqual(Profile.objects.count(), 4)
+
+
+@override_settings(MEDIA_ROOT=tempfile.mkdtemp(), IMAGE_VARIANT_WIDTHS=(320,))
+class GenerateDataTests(TestCase):
+    def test_generated_counters_agree_with_the_rows(self):
+        call_command("generate_data", users=6, posts=15, reactions=40, images=2, batch_size=4, stdout=io.StringIO())
+        self.assertEqual(User.objects.filter(username__startswith="gen_").count(), 6)
+        self.assertEqual(Post.objects.count(), 15)
+        self.assertTrue(PostReaction.objects.exists())
+
+        self.assertEqual(list(reconcile_counts(dry_run=True)), [(15, [])])  # likes / dislikes per post
+        self.assertEqual(list(profile_stats.reconcile(dry_run=True)), [(6, [])])
+        self.assertEqual(sum(Profile.objects.values_list("posts_count", flat=True)), 15)
+        blobs = dict(MediaBlob.objects.values_list("name", "refcount"))
+        self.assertEqual(len(blobs), 2)
+        for name, refcount in blobs.items():
+            self.assertEqual(refcount, Post.objects.filter(image=name).count())
+
+        with self.assertRaises(CommandError):  # same prefix again without --flush
+            call_command("generate_data", users=1, posts=1, stdout=io.StringIO())
+
+
+class MetricsTests(APITestCase):
+    def setUp(self):
+        self.user = User.objects.create_user("metered", "metered@example.com", "secret123")
+        self.client.force_authenticate(self.user)
+        feed_cache.get_cache().clear()
+
+    @override_settings(METRICS_ALLOWED_IPS=["127.0.0.1"])
+    def test_feed_request_is_recorded_per_view(self):
+        self.client.get(reverse("posts"))
+        body = self.client.get(reverse("metrics")).content.decode()
+        self.assertIn('socialnet_sql_queries_count{view="PostListCreateView",method="GET"}', body)
+        self.assertIn('socialnet_requests_total{view="PostListCreateView",method="GET",status="200"}', body)
+
+    @override_settings(METRICS_QUERY_THRESHOLD=0)
+    def test_requests_above_the_query_threshold_are_logged(self):
+        with self.assertLogs("core.metrics", "WARNING") as logs:
+            self.client.get(reverse("posts"))
+        self.assertIn("PostListCreateView", logs.output[0])
+
+    @override_settings(METRICS_TOKEN="s3cret")
+    def test_token_protects_the_endpoint(self):
+        self.assertEqual(self.client.get(reverse("metrics")).status_code, 403)
+        response = self.client.get(reverse("metrics"), headers={"authorization": "Bearer s3cret"})
+        self.assertEqual(response.status_code, 200)
+
+    @override_settings(METRICS_TOKEN="", DEBUG=False, METRICS_ALLOWED_IPS=["10.0.0.5"])
+    def test_without_a_token_only_allowed_addresses_get_in(self):
+        self.assertEqual(self.client.get(reverse("metrics")).status_code, 403)
+        self.assertEqual(self.client.get(reverse("metrics"), REMOTE_ADDR="10.0.0.5").status_code, 200)
+        with override_settings(DEBUG=True):
+            self.assertEqual(self.client.get(reverse("metrics")).status_code, 200)
+
+
+@override_settings(REACTION_COUNTER_MODE="deltas")
+class CounterDeltaTests(APITestCase):
+    """The lock-free reaction path: toggles append deltas, the fold moves the counters."""
+
+    def setUp(self):
+        feed_cache.get_cache().clear()
+        self.author = User.objects.create_user("delta", "delta@example.com").profile
+        self.post = Post.objects.create(author=self.author, image="posts/test.jpg")
+        self.fans = [User.objects.create_user(f"deltafan{i}", f"deltafan{i}@example.com") for i in range(2)]
+
+    def react(self, user, reaction):
+        self.client.force_authenticate(user)
+        response = self.client.post(reverse("react-post", args=[self.post.pk]), {"reaction": reaction})
+        self.assertEqual(response.status_code, 200)
+        return response.data["likes_count"], response.data["dislikes_count"], response.data["user_reaction"]
+
+    def stored(self):
+        self.post.refresh_from_db()
+        self.author.refresh_from_db()
+        return (self.post.likes_count, self.post.dislikes_count,
+                self.author.likes_received, self.author.dislikes_received)
+
+    def test_insert_switch_and_remove_fold_into_the_counters(self):
+        first, second = self.fans
+        self.assertEqual(self.react(first, "like"), (1, 0, "like"))  # insert
+        self.assertEqual(self.react(second, "like"), (2, 0, "like"))
+        self.assertEqual(self.react(first, "dislike"), (1, 1, "dislike"))  # switch
+        self.assertEqual(self.react(second, "like"), (0, 1, None))  # remove
+
+        # the responses add the pending deltas; the rows move only when folded
+        self.assertEqual(PostCounterDelta.objects.filter(post=self.post).count(), 4)
+        self.assertEqual(self.stored(), (0, 0, 0, 0))
+        self.assertEqual(fold_counter_deltas(), [self.post.pk])
+        self.assertEqual(self.stored(), (0, 1, 0, 1))
+        self.assertFalse(PostCounterDelta.objects.exists())
+        self.assertEqual(fold_counter_deltas(), [])
+        self.assertEqual(list(reconcile_counts()), [(1, [])])
+
+    def test_outcomes_map_to_counter_deltas(self):
+        self.assertEqual(reactions.counter_deltas(1, reactions.CREATED), (1, 0))
+        self.assertEqual(reactions.counter_deltas(-1, reactions.REMOVED), (0, -1))
+        self.assertEqual(reactions.counter_deltas(-1, reactions.SWITCHED), (-1, 1))
+        # a concurrent toggle stored the same reaction first: nothing to count
+        self.assertEqual(reactions.counter_deltas(1, reactions.UNCHANGED), (0, 0))
+
+
+class BulkReactionTests(APITestCase):
+    def setUp(self):
+        self.viewer = User.objects.create_user("bulk", "bulk@example.com", "secret123")
+        author = User.objects.create_user("bulkauthor", "bulkauthor@example.com", "secret123")
+        self.posts = [Post.objects.create(author=author.profile, image="posts/test.jpg") for _ in range(3)]
+        PostReaction.objects.create(user=self.viewer.profile, post=self.posts[1], reaction=-1)
+        Post.objects.filter(pk=self.posts[1].pk).update(dislikes_count=1)
+        Profile.objects.filter(pk=author.profile.pk).update(dislikes_received=1)
+        self.client.force_authenticate(self.viewer)
+
+    def test_operations_apply_in_order_with_toggle_semantics(self):
+        a, b, c = (post.pk for post in self.posts)
+        operations = [
+            {"post_id": a, "reaction": "like"},
+            {"post_id": b, "reaction": "like"},  # switch
+            {"post_id": c, "reaction": "like"},
+            {"post_id": c, "reaction": "like"},  # toggled back off
+            {"post_id": 999999, "reaction": "like"},
+        ]
+        response = self.client.post(reverse("react-bulk"), {"operations": operations}, format="json")
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data["missing"], [999999])
+        counts = {item["id"]: (item["likes_count"], item["dislikes_count"], item["user_reaction"])
+                  for item in response.data["results"]}
+        self.assertEqual(counts, {a: (1, 0, "like"), b: (1, 0, "like"), c: (0, 0, None)})
+        self.assertEqual(
+            dict(PostReaction.objects.filter(user=self.viewer.profile).values_list("post_id", "reaction")),
+            {a: 1, b: 1},
+        )
+
+    def test_invalid_operation_rejects_the_batch(self):
+        operations = [{"post_id": self.posts[0].pk, "reaction": "like"}, {"post_id": self.posts[2].pk, "reaction": "love"}]
+        response = self.client.post(reverse("react-bulk"), {"operations": operations}, format="json")
+        self.assertEqual(response.status_code, 400)
+        self.assertFalse(PostReaction.objects.filter(post=self.posts[0]).exists())
+
+    @override_settings(REACTION_COUNTER_MODE="deltas")
+    def test_a_racing_first_reaction_replays_the_batch_instead_of_failing(self):
+        post = self.posts[0]
+        replay = reactions.replay_toggles
+        calls = []
+
+        def concurrent_like_lands(initial, operations):
+            calls.append(initial)
+            if len(calls) == 1:  # another request's first like, after we read the viewer's reactions
+                PostReaction.objects.create(user=self.viewer.profile, post=post, reaction=1)
+            return replay(initial, operations)
+
+        with mock.patch("core.reactions.replay_toggles", concurrent_like_lands):
+            response = self.client.post(reverse("react-bulk"), {"operations": [{"post_id": post.pk, "reaction": "like"}]},
+                                        format="json")
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(calls), 2)  # the insert hit the unique constraint and the batch was replayed
+        self.assertEqual(response.data["results"][0]["user_reaction"], "like")
+        fold_counter_deltas()
+        post.refresh_from_db()
+        self.assertEqual(post.likes_count, PostReaction.objects.filter(post=post, reaction=1).count())
+
+
+class ReconcileCountsTests(TestCase):
+    def setUp(self):
+        author = User.objects.create_user("counted", "counted@example.com", "secret123")
+        fans = [User.objects.create_user(f"fan{i}", f"fan{i}@example.com").profile for i in range(3)]
+        self.posts = [Post.objects.create(author=author.profile, image="posts/test.jpg") for _ in range(3)]
+        for fan, value in zip(fans, (1, 1, -1)):
+            PostReaction.objects.create(user=fan, post=self.posts[0], reaction=value)
+        Post.objects.filter(pk=self.posts[0].pk).update(likes_count=2, dislikes_count=1)
+        Post.objects.filter(pk=self.posts[1].pk).update(likes_count=5)  # drifted
+
+    def test_batches_are_one_aggregate_and_drift_is_fixed(self):
+        with self.assertNumQueries(3):  # batch ids, audit, next (empty) batch
+            batches = list(reconcile_counts(batch_size=10, dry_run=True))
+        self.assertEqual([(checked, [drift.post_id for drift in drifts]) for checked, drifts in batches],
+                         [(3, [self.posts[1].pk])])
+
+        drifts = reconcile_posts([post.pk for post in self.posts])
+        self.assertEqual(drifts, [Drift(self.posts[1].pk, 5, 0, 0, 0)])
+        self.assertEqual(Post.objects.get(pk=self.posts[1].pk).likes_count, 0)
+        self.assertEqual(reconcile_posts([post.pk for post in self.posts]), [])
+
+    def test_pending_deltas_are_left_to_the_fold(self):
+        PostCounterDelta.objects.create(post=self.posts[0], likes_delta=1)
+        PostReaction.objects.create(user=self.posts[0].author, post=self.posts[0], reaction=1)
+        self.assertEqual(reconcile_posts([self.posts[0].pk]), [])
+
+    def test_since_selects_posts_with_changed_counters(self):
+        Post.objects.filter(pk=self.posts[2].pk).update(reactions_changed_at=timezone.now())
+        since = timezone.now() - timedelta(minutes=1)
+        self.assertEqual([checked for checked, _ in reconcile_counts(since)], [1])
+
+
+@override_settings(BACKGROUND_WORKERS=0)
+class HomeTimelineTests(APITestCase):
+    def setUp(self):
+        self.viewer, self.friend, self.star, self.stranger = (
+            User.objects.create_user(name, f"{name}@example.com").profile
+            for name in ("reader", "friend", "star", "stranger")
+        )
+        self.client.force_authenticate(self.viewer.user)
+        feed_cache.get_cache().clear()
+
+    def post_as(self, profile, description):
+        with self.captureOnCommitCallbacks(execute=True):
+            # variants marked as built: only the fan-out job runs
+            return Post.objects.create(
+                author=profile, image="posts/test.jpg", image_variants={"source": "posts/test.jpg"},
+                description=description,
+            )
+
+    def home(self, **params):
+        response = self.client.get(reverse("home-feed"), params)
+        self.assertEqual(response.status_code, 200)
+        return response.data
+
+    def test_follow_backfills_and_new_posts_fan_out(self):
+        self.post_as(self.friend, "before")
+        self.assertEqual(self.client.post(reverse("follow", args=[self.friend.pk])).data,
+                         {"following": True, "followers_count": 1})
+        self.post_as(self.friend, "after")
+        self.post_as(self.viewer, "mine")
+        self.post_as(self.stranger, "unrelated")
+
+        self.assertEqual([item["description"] for item in self.home()["results"]], ["mine", "after", "before"])
+        self.assertEqual(TimelineEntry.objects.filter(owner=self.friend).count(), 2)
+
+        self.client.delete(reverse("follow", args=[self.friend.pk]))
+        self.assertEqual([item["description"] for item in self.home()["results"]], ["mine"])
+
+    @override_settings(TIMELINE_FANOUT_LIMIT=0)
+    def test_big_authors_are_merged_in_on_read(self):
+        self.client.post(reverse("follow", args=[self.star.pk]))
+        for i in range(3):
+            self.post_as(self.star, f"star {i}")
+            self.post_as(self.viewer, f"mine {i}")
+        self.assertFalse(TimelineEntry.objects.filter(author=self.star).exclude(owner=self.star).exists())
+
+        first = self.home(page_size=4)
+        # timeline entries, followed big authors, their posts; then post data and the viewer's reactions
+        with self.assertNumQueries(5):
+            second = self.client.get(first["next"]).data
+        descriptions = [item["description"] for item in first["results"] + second["results"]]
+        self.assertEqual(descriptions, ["mine 2", "star 2", "mine 1", "star 1", "mine 0", "star 0"])
+
+
+class HotFeedTests(APITestCase):
+    def setUp(self):
+        self.viewer = User.objects.create_user("ranker", "ranker@example.com")
+        self.client.force_authenticate(self.viewer)
+        feed_cache.get_cache().clear()
+        author = User.objects.create_user("hotauthor", "hotauthor@example.com").profile
+        self.old, self.new = (
+            Post.objects.create(author=author, image="posts/test.jpg", description=name) for name in ("old", "new")
+        )
+        Post.objects.filter(pk=self.old.pk).update(created_at=timezone.now() - timedelta(hours=20))
+        self.old.refresh_from_db()
+        fans = [User.objects.create_user(f"hotfan{i}", f"hotfan{i}@example.com").profile for i in range(100)]
+        PostReaction.objects.bulk_create(PostReaction(user=fan, post=self.old, reaction=1) for fan in fans)
+        Post.objects.filter(pk=self.old.pk).update(likes_count=100)
+
+    def ranked(self):
+        feed_cache.get_cache().clear()
+        response = self.client.get(reverse("posts"), {"ranking": "hot"})
+        self.assertEqual(response.status_code, 200)
+        return [item["description"] for item in response.data["results"]]
+
+    def test_score_is_kept_with_the_counters(self):
+        self.assertEqual(self.ranked(), ["new", "old"])  # scores not refreshed yet
+        with transaction.atomic():
+            refresh_hot_scores([self.old.pk])
+        self.assertEqual(self.ranked(), ["old", "new"])
+
+        self.client.post(reverse("react-post", args=[self.new.pk]), {"reaction": "like"})
+        self.assertAlmostEqual(
+            Post.objects.get(pk=self.new.pk).hot_score, hot_score(1, 0, self.new.created_at), places=6,
+        )
+
+    def test_unknown_ranking_is_rejected(self):
+        self.assertEqual(self.client.get(reverse("posts"), {"ranking": "top"}).status_code, 400)
+
+
+class ConditionalGetTests(APITestCase):
+    def setUp(self):
+        feed_cache.get_cache().clear()
+        self.user = User.objects.create_user("poller", "poller@example.com", "secret123")
+        self.client.force_authenticate(self.user)
+        self.post = Post.objects.create(author=self.user.profile, image="posts/test.jpg", description="post")
+
+    def test_unchanged_feed_page_is_not_modified_until_a_reaction(self):
+        etag = self.client.get(reverse("posts"))["ETag"]
+        with mock.patch("core.feed_cache.assemble") as assemble:
+            response = self.client.get(reverse("posts"), HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response["ETag"], etag)
+        assemble.assert_not_called()
+
+        self.client.post(reverse("react-post", args=[self.post.pk]), {"reaction": "like"})
+        response = self.client.get(reverse("posts"), HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data["results"][0]["user_reaction"], "like")
+
+    def test_profile_revalidates_by_etag_and_date(self):
+        response = self.client.get(reverse("profile"))
+        etag, last_modified = response["ETag"], response["Last-Modified"]
+        self.assertEqual(self.client.get(reverse("profile"), HTTP_IF_NONE_MATCH=etag).status_code, 304)
+        self.assertEqual(self.client.get(reverse("profile"), HTTP_IF_MODIFIED_SINCE=last_modified).status_code, 304)
+
+        self.client.patch(reverse("profile"), {"bio": "changed"})
+        response = self.client.get(reverse("profile"), HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual((response.status_code, response.data["bio"]), (200, "changed"))
+
+    def test_each_renderer_has_its_own_etag(self):
+        for name in ("posts", "profile"):
+            compact = self.client.get(reverse(name))
+            self.assertIn("Accept", compact["Vary"])
+            indented = self.client.get(reverse(name), HTTP_ACCEPT="application/json; indent=4",
+                                       HTTP_IF_NONE_MATCH=compact["ETag"])
+            self.assertEqual(indented.status_code, 200, name)
+            self.assertNotEqual(indented["ETag"], compact["ETag"])
+            self.assertIn(b"\n    ", indented.content)
+
+
+class FastSerializationTests(APITestCase):
+    def setUp(self):
+        feed_cache.get_cache().clear()
+        self.user = User.objects.create_user("sparse", "sparse@example.com", "secret123")
+        self.client.force_authenticate(self.user)
+        self.post = Post.objects.create(
+            author=self.user.profile, image="posts/test.jpg", description="post",
+            image_variants={"source": "posts/test.jpg", "widths": {"320": "posts/test_320.webp"}},
+        )
+
+    def test_fast_paths_match_the_drf_serializers(self):
+        request = self.client.get(reverse("profile")).wsgi_request
+        post = Post.objects.select_related("author").get(pk=self.post.pk)
+        profile = Profile.objects.select_related("user").get(pk=self.user.profile.pk)
+        self.assertEqual(post_data(post), PostSerializer(post).data)
+        self.assertEqual(profile_data(profile, request), ProfileSerializer(profile, context={"request": request}).data)
+
+    def test_sparse_fieldsets(self):
+        response = self.client.get(reverse("posts"), {"fields": "id,likes_count,user_reaction"})
+        self.assertEqual(response.json()["results"], [{"id": self.post.pk, "likes_count": 0, "user_reaction": None}])
+        response = self.client.get(reverse("profile"), {"fields": "username"})
+        self.assertEqual(response.json(), {"username": "sparse"})
+        self.assertEqual(self.client.get(reverse("posts"), {"fields": "id,secret"}).status_code, 400)
+
+
+class SearchTests(APITestCase):
+    def setUp(self):
+        viewer = User.objects.create_user("searcher", "searcher@example.com")
+        self.client.force_authenticate(viewer)
+        feed_cache.get_cache().clear()
+        self.author = User.objects.create_user("mountaineer", "mountaineer@example.com").profile
+        for description in ("Sunset over the mountains", "mountain lake, mountain air", "city lights"):
+            Post.objects.create(author=self.author, image="posts/test.jpg", description=description)
+
+    def search(self, **params):
+        response = self.client.get(reverse("search"), params)
+        self.assertEqual(response.status_code, 200)
+        return response.data
+
+    def test_posts_are_ranked_and_paged(self):
+        first = self.search(q="mountain", page_size=1)
+        self.assertEqual([item["description"] for item in first["results"]], ["mountain lake, mountain air"])
+        second = self.client.get(first["next"]).data
+        self.assertEqual([item["description"] for item in second["results"]], ["Sunset over the mountains"])
+        self.assertIsNone(second["next"])
+
+    def test_index_follows_writes(self):
+        post = Post.objects.get(description="city lights")
+        post.description = "harbour lights"
+        post.save()
+        self.assertEqual(self.search(q="city")["results"], [])
+        self.assertEqual(len(self.search(q="harbour")["results"]), 1)
+        post.delete()
+        self.assertEqual(self.search(q="harbour")["results"], [])
+
+    def test_profiles_match_partial_names(self):
+        Profile.objects.filter(pk=self.author.pk).update(bio="climbs things")
+        results = self.search(q="untai", type="profiles")["results"]
+        self.assertEqual([item["username"] for item in results], ["mountaineer"])
+        self.assertNotIn("phone", results[0])
+        self.assertEqual(len(self.search(q="climbs", type="profiles")["results"]), 1)
+
+
+@override_settings(REALTIME_HEARTBEAT=5, REALTIME_STREAM_SECONDS=5)
+class PostStreamTests(APITestCase):
+    def setUp(self):
+        self.user = User.objects.create_user("watcher", "watcher@example.com")
+        author = User.objects.create_user("streamer", "streamer@example.com").profile
+        self.watched, self.other = (Post.objects.create(author=author, image="posts/test.jpg") for _ in range(2))
+        self.token = str(tokens_for_user(self.user).access_token)
+
+    def test_counts_are_coalesced_per_window_for_watched_posts(self):
+        response = self.client.get(reverse("post-stream"), {"posts": str(self.watched.pk), "access_token": self.token})
+        self.assertEqual(response["Content-Type"], "text/event-stream")
+        events = iter(response.streaming_content)
+        self.assertEqual(next(events), b"retry: 10000\n\n")  # subscribed from here on
+
+        self.client.force_authenticate(self.user)
+        for reaction in ("like", "dislike", "like"):
+            self.client.post(reverse("react-post", args=[self.watched.pk]), {"reaction": reaction})
+        self.client.post(reverse("react-post", args=[self.other.pk]), {"reaction": "like"})
+        realtime.broker.flush()
+
+        self.assertEqual(
+            next(events).decode(),
+            f'event: counts\ndata: {{"{self.watched.pk}":{{"likes_count":1,"dislikes_count":0}}}}\n\n',
+        )
+        response.close()
+
+    def test_requires_a_token(self):
+        self.assertEqual(self.client.get(reverse("post-stream")).status_code, 401)
+
+    @override_settings(REALTIME_WSGI_STREAM_SECONDS=0, REALTIME_WSGI_RETRY_SECONDS=20)
+    def test_wsgi_streams_are_short_polls(self):
+        response = self.client.get(reverse("post-stream"), {"posts": str(self.watched.pk), "access_token": self.token})
+        started = time.monotonic()
+        self.assertEqual(list(response.streaming_content), [b"retry: 20000\n\n"])
+        self.assertLess(time.monotonic() - started, 1)
+        self.assertFalse(realtime.broker._subscribers)
+
+    def test_a_failing_subscriber_does_not_stop_the_others(self):
+        broker = realtime.Broker()
+        broken, healthy = broker.subscribe([self.watched.pk]), broker.subscribe([self.watched.pk])
+        broken.deliver = mock.Mock(side_effect=RuntimeError("event loop is closed"))
+        broker.counts_changed(self.watched.pk, 1, 0)
+        with self.assertLogs("core.realtime", "ERROR"):
+            self.assertEqual(broker.flush(), 1)
+        self.assertEqual(healthy.queue.get_nowait(), {"counts": {str(self.watched.pk): {"likes_count": 1, "dislikes_count": 0}}})
+        self.assertNotIn(broken, broker._subscribers)
+
+    def test_a_dead_flusher_is_restarted(self):
+        broker = realtime.Broker()
+        with mock.patch.object(realtime.time, "sleep", side_effect=SystemExit):
+            subscription = broker.subscribe([self.watched.pk])
+            broker._flusher.join(5)
+        self.assertIsNone(broker._flusher)
+        broker.unsubscribe(subscription)
+        with mock.patch.object(realtime.Broker, "_run"):
+            broker.subscribe([self.watched.pk])
+        self.assertIsNotNone(broker._flusher)
+
+
+@override_settings(DATABASE_REPLICAS=["default"], REPLICA_STICKY_SECONDS=5)
+class ReplicaRoutingTests(APITestCase):
+    """The test database stands in for the replica: reads routed to it name it, primary reads are None."""
+
+    def setUp(self):
+        cache.clear()
+        feed_cache.get_cache().clear()
+        self.user = User.objects.create_user("replica", "replica@example.com", "secret123")
+        self.client.force_authenticate(self.user)
+        self.post = Post.objects.create(author=self.user.profile, image="posts/test.jpg", description="post")
+
+        self.reads = []
+        route = ReplicaRouter.db_for_read
+
+        def record(router, model, **hints):
+            alias = route(router, model, **hints)
+            self.reads.append(alias)
+            return alias
+
+        patcher = mock.patch.object(ReplicaRouter, "db_for_read", record)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_reads_go_to_the_replica_until_the_user_writes(self):
+        self.assertEqual(self.client.get(reverse("profile-posts", args=[self.user.profile.pk])).status_code, 200)
+        self.assertEqual(set(self.reads), {"default"})
+        self.reads.clear()
+        Post.objects.count()  # outside the request: back on the primary
+        self.assertEqual(self.reads, [None])
+
+        self.reads.clear()
+        self.client.post(reverse("react-post", args=[self.post.pk]), {"reaction": "like"})
+        self.assertEqual(set(self.reads), {None})
+
+        self.reads.clear()
+        response = self.client.get(reverse("profile-posts", args=[self.user.profile.pk]))
+        self.assertEqual(response.data["results"][0]["likes_count"], 1)
+        self.assertEqual(set(self.reads), {None})
+
+    def test_feed_cache_is_never_filled_from_a_lagging_replica(self):
+        # the "replica" serves core_post as of now; later writes only reach the primary
+        with connection.cursor() as cursor:
+            cursor.execute("CREATE TEMP TABLE lagging_core_post AS SELECT * FROM core_post")
+        self.addCleanup(self.drop_lagging_table)
+        replica_read = []
+
+        def lagging(execute, sql, params, many, context):
+            if replica_read and 'FROM "core_post"' in sql:
+                replica_read.clear()
+                sql = sql.replace('FROM "core_post"', 'FROM "lagging_core_post" "core_post"')
+            return execute(sql, params, many, context)
+
+        route = ReplicaRouter.db_for_read
+
+        def record(router, model, **hints):
+            alias = route(router, model, **hints)
+            if alias is not None and model is Post:
+                replica_read.append(alias)
+            return alias
+
+        other = User.objects.create_user("lagreader", "lagreader@example.com", "secret123")
+        with mock.patch.object(ReplicaRouter, "db_for_read", record), connection.execute_wrapper(lagging):
+            self.client.post(reverse("react-post", args=[self.post.pk]), {"reaction": "like"})
+            self.client.force_authenticate(other)  # not sticky: reads from the replica
+            self.assertEqual(self.client.get(reverse("posts")).data["results"][0]["likes_count"], 1)
+
+            self.client.force_authenticate(self.user)
+            response = self.client.get(reverse("posts"))
+        self.assertEqual(response.data["results"][0]["likes_count"], 1)
+        self.assertEqual(response.data["results"][0]["user_reaction"], "like")
+
+    def drop_lagging_table(self):
+        with connection.cursor() as cursor:
+            cursor.execute("DROP TABLE lagging_core_post")
+
+
+class ProfileStatsTests(APITestCase):
+    def setUp(self):
+        feed_cache.get_cache().clear()
+        self.author = User.objects.create_user("prolific", "prolific@example.com", "secret123")
+        self.fans = [User.objects.create_user(f"reader{i}", f"reader{i}@example.com") for i in range(2)]
+        self.posts = [
+            Post.objects.create(author=self.author.profile, image="posts/test.jpg", description=f"post {i}")
+            for i in range(3)
+        ]
+
+    def stats(self):
+        return Profile.objects.values_list(*profile_stats.STAT_FIELDS).get(pk=self.author.profile.pk)
+
+    def test_profile_edits_do_not_write_back_stale_counters(self):
+        read = ProfileView.get_object
+
+        def read_then_concurrent_writes(view):
+            profile = read(view)
+            # a post, a reaction and a follow land while the edit is in flight
+            Profile.objects.filter(pk=profile.pk).update(
+                posts_count=F("posts_count") + 1, likes_received=F("likes_received") + 1,
+                followers_count=F("followers_count") + 1,
+            )
+            return profile
+
+        self.client.force_authenticate(self.author)
+        with mock.patch.object(ProfileView, "get_object", read_then_concurrent_writes):
+            response = self.client.patch(reverse("profile"), {"bio": "edited"})
+        self.assertEqual(response.status_code, 200)
+        profile = Profile.objects.get(pk=self.author.profile.pk)
+        self.assertEqual((profile.bio, profile.followers_count), ("edited", 1))
+        self.assertEqual(self.stats(), (4, 1, 0))
+
+    def test_counters_follow_posts_and_reactions(self):
+        first, second, _ = (post.pk for post in self.posts)
+        self.assertEqual(self.stats(), (3, 0, 0))
+
+        self.client.force_authenticate(self.fans[0])
+        self.client.post(reverse("react-post", args=[first]), {"reaction": "like"})
+        self.client.post(reverse("react-post", args=[second]), {"reaction": "like"})
+        self.client.force_authenticate(self.fans[1])
+        operations = [{"post_id": first, "reaction": "dislike"}, {"post_id": second, "reaction": "like"}]
+        self.client.post(reverse("react-bulk"), {"operations": operations}, format="json")
+        self.assertEqual(self.stats(), (3, 3, 1))
+
+        with override_settings(REACTION_COUNTER_MODE="deltas"):
+            self.client.post(reverse("react-post", args=[first]), {"reaction": "like"})  # switch
+            self.assertEqual(self.stats(), (3, 3, 1))  # until the fold
+            fold_counter_deltas()
+        self.assertEqual(self.stats(), (3, 4, 0))
+
+        self.client.force_authenticate(self.author)
+        self.assertEqual(self.client.delete(reverse("delete-post", args=[first])).status_code, 204)
+        self.assertEqual(self.stats(), (2, 2, 0))
+        self.assertEqual(list(profile_stats.reconcile()), [(3, [])])
+
+    def test_author_pages_cost_a_fixed_number_of_queries(self):
+        other = Post.objects.create(author=self.fans[0].profile, image="posts/test.jpg")
+        self.client.force_authenticate(self.fans[1])
+        with self.assertNumQueries(1):
+            response = self.client.get(reverse("profile-detail", args=[self.author.profile.pk]))
+        self.assertEqual((response.data["posts_count"], response.data["likes_received"]), (3, 0))
+
+        url = reverse("profile-posts", args=[self.author.profile.pk])
+        self.client.get(url)  # fills the feed cache
+        with self.assertNumQueries(1):  # the page of ids; items and reactions come from the feed cache
+            response = self.client.get(url, {"page_size": 2})
+        self.assertEqual([item["id"] for item in response.data["results"]],
+                         [self.posts[2].pk, self.posts[1].pk])
+        response = self.client.get(response.data["next"])
+        self.assertEqual([item["id"] for item in response.data["results"]], [self.posts[0].pk])
+        self.assertNotIn(other.pk, [item["id"] for item in response.data["results"]])
+        self.assertEqual(self.client.get(reverse("profile-posts", args=[999999])).status_code, 404)
+
+
+@override_settings(MEDIA_ROOT=tempfile.mkdtemp(), BACKGROUND_WORKERS=0)
+class MediaStorageTests(TestCase):
+    def setUp(self):
+        self.author = User.objects.create_user("hoarder", "hoarder@example.com").profile
+
+    def post(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            return Post.objects.create(author=self.author, image=make_image())
+
+    def delete(self, post):
+        with self.captureOnCommitCallbacks(execute=True):
+            post.delete()
+
+    def test_identical_images_share_one_file_until_the_last_reference_goes(self):
+        first, second = self.post(), self.post()
+        name = first.image.name
+        self.assertEqual(second.image.name, name)
+        self.assertEqual(MediaBlob.objects.get(name=name).refcount, 2)
+        directory, filename = name.rsplit("/", 1)
+        self.assertEqual(default_storage.listdir(directory)[1], [filename])
+
+        self.delete(first)
+        self.assertEqual(MediaBlob.objects.get(name=name).refcount, 1)
+        self.assertTrue(default_storage.exists(name))
+        self.delete(second)
+        self.assertFalse(MediaBlob.objects.filter(name=name).exists())
+        self.assertFalse(default_storage.exists(name))
+
+    def test_racing_identical_saves_overwrite_instead_of_suffixing(self):
+        name = self.post().image.name
+        with mock.patch("core.storage.hold", return_value=False):  # both got past the reuse check
+            self.assertEqual(default_storage.save("posts/again.png", make_image()), name)
+        directory, filename = name.rsplit("/", 1)
+        self.assertEqual(default_storage.listdir(directory)[1], [filename])
+
+    def test_a_collected_file_is_written_again_for_a_new_reference(self):
+        post = self.post()
+        name = post.image.name
+        MediaBlob.objects.filter(name=name).update(refcount=0)
+        collect(name)  # the collector won the row lock
+        self.assertFalse(default_storage.exists(name))
+
+        self.assertEqual(self.post().image.name, name)
+        self.assertTrue(default_storage.exists(name))
+        self.assertEqual(MediaBlob.objects.get(name=name).refcount, 1)
+
+
+@override_settings(MEDIA_ROOT=tempfile.mkdtemp(), MEDIA_ACCEL_REDIRECT_PREFIX="", MEDIA_SENDFILE_HEADER="")
+class MediaServingTests(TestCase):
+    def setUp(self):
+        self.image = make_image()
+        self.data = self.image.read()
+        self.name = default_storage.save("posts/test.png", self.image)
+        self.url = f"/media/{self.name}"
+
+    def test_content_addressed_files_are_immutable_with_a_strong_etag(self):
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(b"".join(response.streaming_content), self.data)
+        digest = os.path.splitext(os.path.basename(self.name))[0]
+        self.assertEqual(response["ETag"], f'"{digest}"')
+        self.assertIn("immutable", response["Cache-Control"])
+        self.assertEqual(response["Content-Type"], "image/png")
+
+        response = self.client.get(self.url, HTTP_IF_NONE_MATCH=f'"{digest}"')
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response["ETag"], f'"{digest}"')
+
+    def test_single_byte_ranges(self):
+        response = self.client.get(self.url, HTTP_RANGE="bytes=2-5")
+        self.assertEqual(response.status_code, 206)
+        self.assertEqual(b"".join(response.streaming_content), self.data[2:6])
+        self.assertEqual(response["Content-Range"], f"bytes 2-5/{len(self.data)}")
+
+        response = self.client.get(self.url, HTTP_RANGE="bytes=-4")
+        self.assertEqual(b"".join(response.streaming_content), self.data[-4:])
+
+        response = self.client.get(self.url, HTTP_RANGE=f"bytes={len(self.data)}-")
+        self.assertEqual(response.status_code, 416)
+        self.assertEqual(response["Content-Range"], f"bytes */{len(self.data)}")
+
+        # a stale If-Range gets the whole file
+        response = self.client.get(self.url, HTTP_RANGE="bytes=2-5", HTTP_IF_RANGE='"stale"')
+        self.assertEqual(response.status_code, 200)
+
+    def test_legacy_upload_names_are_served_without_immutable_caching(self):
+        legacy = f"posts/{'a1' * 16}.jpg"  # an upload named before content addressing (migration 0006)
+        with open(default_storage.path(legacy), "wb") as handle:
+            handle.write(b"legacy bytes")
+        response = self.client.get(f"/media/{legacy}")
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(b"".join(response.streaming_content), b"legacy bytes")
+        self.assertNotIn("immutable", response["Cache-Control"])
+        stat = os.stat(default_storage.path(legacy))
+        self.assertEqual(response["ETag"], f'"{stat.st_size:x}-{stat.st_mtime_ns:x}"')
+        self.assertEqual(self.client.get(f"/media/{legacy}", HTTP_IF_NONE_MATCH=response["ETag"]).status_code, 304)
+
+    def test_files_outside_the_upload_directories_are_not_served(self):
+        os.makedirs(default_storage.path("exports"), exist_ok=True)
+        with open(default_storage.path("exports/notes.txt"), "w") as handle:
+            handle.write("not an upload")
+        self.assertEqual(self.client.get("/media/exports/notes.txt").status_code, 404)
+        self.assertEqual(self.client.get("/media/posts/../" + self.name).status_code, 404)
+        self.assertEqual(self.client.get(self.url.replace("/posts/", "/profiles/")).status_code, 404)
+
+
+@override_settings(MEDIA_ROOT=tempfile.mkdtemp(), BACKGROUND_WORKERS=0,
+                   IMAGE_VARIANT_WIDTHS=(320, 640, 2000), IMAGE_VARIANT_FORMAT="WEBP")
+class ImageVariantTests(APITestCase):
+    def setUp(self):
+        feed_cache.get_cache().clear()
+        self.user = User.objects.create_user("resizer", "resizer@example.com")
+        self.client.force_authenticate(self.user)
+
+    def post(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            return Post.objects.create(author=self.user.profile, image=make_image(size=(1200, 600)))
+
+    def test_variants_are_built_recorded_and_served_in_the_srcset(self):
+        post = self.post()
+        post.refresh_from_db()
+        name = post.image.name
+        widths = post.image_variants["widths"]
+        self.assertEqual(post.image_variants["source"], name)
+        self.assertEqual(sorted(widths, key=int), ["320", "640", "1200"])  # never upscaled
+        self.assertEqual(MediaBlob.objects.get(name=name).variants, widths)
+        for width, variant in widths.items():
+            with default_storage.open(variant) as handle, Image.open(handle) as image:
+                self.assertEqual((image.format, image.width), ("WEBP", int(width)))
+
+        item = self.client.get(reverse("posts")).data["results"][0]
+        self.assertEqual(set(item["image_srcset"]), set(widths))
+        self.assertTrue(item["image_srcset"]["320"].endswith(default_storage.url(widths["320"])))
+
+    def test_variants_are_shared_and_deleted_with_the_last_reference(self):
+        first = self.post()
+        with mock.patch("core.images.build_variants") as build:
+            second = self.post()
+        build.assert_not_called()  # same content: the recorded variants are reused
+        first.refresh_from_db()
+        second.refresh_from_db()
+        self.assertEqual(second.image_variants, first.image_variants)
+
+        variants = list(first.image_variants["widths"].values())
+        with self.captureOnCommitCallbacks(execute=True):
+            first.delete()
+        self.assertTrue(all(default_storage.exists(variant) for variant in variants))
+        with self.captureOnCommitCallbacks(execute=True):
+            second.delete()
+        self.assertFalse(any(default_storage.exists(variant) for variant in variants))
+        self.assertFalse(MediaBlob.objects.filter(name=first.image.name).exists())
+
+
+def image_bytes(format="PNG", size=(8, 8)):
+    buffer = io.BytesIO()
+    Image.new("RGB", size, "blue").save(buffer, format)
+    return buffer.getvalue()
+
+
+@override_settings(MEDIA_ROOT=tempfile.mkdtemp(), BACKGROUND_WORKERS=0)
+class ResumableUploadTests(APITestCase):
+    def setUp(self):
+        self.user = User.objects.create_user("uploader", "uploader@example.com", "secret123")
+        self.client.force_authenticate(self.user)
+
+    def start(self, data, filename="cat.png"):
+        response = self.client.post(reverse("uploads"), {"filename": filename, "size": len(data)}, format="json")
+        self.assertEqual(response.status_code, 201)
+        return response.data["id"]
+
+    def put(self, upload_id, data, start, total):
+        return self.client.generic(
+            "PUT", reverse("upload-chunk", args=[upload_id]), data,
+            content_type="application/octet-stream",
+            HTTP_CONTENT_RANGE=f"bytes {start}-{start + len(data) - 1}/{total}",
+        )
+
+    def complete(self, upload_id):
+        with self.captureOnCommitCallbacks(execute=True):
+            return self.client.post(reverse("upload-complete", args=[upload_id]), {"description": "up"}, format="json")
+
+    def test_chunks_resume_at_the_stored_offset_and_completing_twice_is_idempotent(self):
+        data = image_bytes("JPEG", (40, 30))
+        upload_id = self.start(data, "cat.jpg")
+        half = len(data) // 2
+        self.assertEqual(self.put(upload_id, data[:half], 0, len(data)).data["offset"], half)
+
+        response = self.put(upload_id, data[half + 1:], half + 1, len(data))  # skipped a byte
+        self.assertEqual((response.status_code, response.data), (409, {"offset": half}))
+        self.assertEqual(self.client.get(reverse("upload-chunk", args=[upload_id])).data["offset"], half)
+        self.assertEqual(self.complete(upload_id).status_code, 400)  # incomplete
+
+        response = self.put(upload_id, data[half:], half, len(data))
+        self.assertEqual((response.data["content_type"], response.data["width"], response.data["height"]),
+                         ("image/jpeg", 40, 30))
+        first = self.complete(upload_id)
+        self.assertEqual(first.status_code, 201)
+        second = self.complete(upload_id)
+        self.assertEqual((second.status_code, second.data["id"]), (200, first.data["id"]))
+        post = Post.objects.get(pk=first.data["id"])
+        with post.image.open("rb") as stored:
+            self.assertEqual(stored.read(), data)
+        self.assertFalse(default_storage.exists(ChunkedUpload.objects.get(pk=upload_id).partial_name))
+
+    def test_oversize_uploads_are_refused(self):
+        response = self.client.post(reverse("uploads"), {"filename": "big.png", "size": 6 * 1024 * 1024}, format="json")
+        self.assertEqual(response.status_code, 400)
+        data = image_bytes()
+        upload_id = self.start(data)
+        self.assertEqual(self.put(upload_id, data + b"extra", 0, len(data)).status_code, 400)
+
+    def test_content_is_checked_not_the_name(self):
+        buffer = io.BytesIO()
+        Image.new("RGB", (8, 8)).save(buffer, "GIF")
+        gif = buffer.getvalue()
+        upload_id = self.start(gif, "forged.png")
+        response = self.put(upload_id, gif, 0, len(gif))
+        self.assertEqual(response.status_code, 400)
+        self.assertIn("Unsupported image type", response.data["detail"])
+
+    def test_truncated_headers_are_rejected(self):
+        with self.assertRaises(ValidationError):
+            sniff_image(b"\x89PNG\r\n\x1a\n\x00\x00\x00\x0dIHDX" + b"\x00" * 8)
+        self.assertEqual(sniff_image(image_bytes()[:20]), ("image/png", None, None))
+
+        for data in (image_bytes()[:20], image_bytes("JPEG")[:12]):
+            upload_id = self.start(data)
+            response = self.put(upload_id, data, 0, len(data))
+            self.assertEqual((response.status_code, response.data["detail"]), (400, "Uploaded file is invalid."))
+
+    def test_completion_can_be_retried_after_the_post_failed(self):
+        data = image_bytes()
+        upload_id = self.start(data)
+        self.put(upload_id, data, 0, len(data))
+        with mock.patch("core.views.Post.objects.create", side_effect=RuntimeError("database went away")):
+            with self.assertRaises(RuntimeError):
+                self.complete(upload_id)
+        response = self.complete(upload_id)
+        self.assertEqual(response.status_code, 201)
+        image = Post.objects.get(pk=response.data["id"]).image
+        self.assertTrue(image.storage.exists(image.name))
+
+    def test_abandoned_uploads_expire_and_partial_files_are_never_served(self):
+        data = image_bytes()
+        stale, fresh = self.start(data), self.start(data)
+        self.put(stale, data[:10], 0, len(data))
+        self.put(fresh, data[:10], 0, len(data))
+        ChunkedUpload.objects.filter(pk=stale).update(updated_at=timezone.now() - timedelta(days=2))
+        orphan = default_storage.path("uploads/partial/crashed.part")  # written like append_chunk does
+        with open(orphan, "wb") as handle:
+            handle.write(b"junk")
+        os.utime(orphan, (time.time() - 2 * 86400,) * 2)
+
+        partial_name = ChunkedUpload.objects.get(pk=fresh).partial_name
+        self.assertEqual(self.client.get(f"/media/{partial_name}").status_code, 404)
+
+        self.assertEqual(expire_uploads(timedelta(hours=24)), (1, 1))
+        self.assertFalse(ChunkedUpload.objects.filter(pk=stale).exists())
+        self.assertTrue(default_storage.exists(partial_name))
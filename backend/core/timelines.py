@@ -0,0 +1,155 @@
+# core/timelines.py
+"""
+Home timelines over the follow graph.
+
+Fan-out on write: when a post is created, a background job inserts a
+TimelineEntry for the author and for every follower, so reading a home page
+is one range scan of the viewer's own entries, whatever they follow.
+
+Authors with more than TIMELINE_FANOUT_LIMIT followers are not fanned out
+(one post would mean millions of rows); their posts are merged in at read
+time instead, from the (author, -created_at) index. Such authors are few, so
+the read side looks them up from a short-lived cached id list and only asks
+which of them the viewer follows: the cost of a page depends on the page size
+and the number of big authors followed, not on how many profiles the viewer
+follows.
+
+A post is always written to its author's own timeline. Following backfills
+the newest TIMELINE_BACKFILL posts of the followee; unfollowing drops all of
+them. An author crossing the limit keeps the entries already written.
+"""
+from itertools import chain, islice
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import F
+
+from . import feed_cache
+from .models import Follow, Post, Profile, TimelineEntry
+from .pagination import FeedCursorPagination
+
+_CELEBRITIES_KEY = "timeline:celebrities"
+
+
+def is_celebrity(followers_count):
+    return followers_count > settings.TIMELINE_FANOUT_LIMIT
+
+
+def celebrity_ids():
+    """Ids of the profiles that are not fanned out, cached for TIMELINE_CELEBRITY_TTL seconds."""
+    cache = feed_cache.get_cache()
+    ids = cache.get(_CELEBRITIES_KEY)
+    if ids is None:
+        ids = list(
+            Profile.objects.filter(followers_count__gt=settings.TIMELINE_FANOUT_LIMIT)
+            .values_list("pk", flat=True)
+        )
+        cache.set(_CELEBRITIES_KEY, ids, settings.TIMELINE_CELEBRITY_TTL)
+    return ids
+
+
+# --- follow graph ---
+def follow(follower, followee):
+    """Returns False if `follower` already followed `followee`."""
+    with transaction.atomic():
+        _, created = Follow.objects.get_or_create(follower=follower, followee=followee)
+        if not created:
+            return False
+        Profile.objects.filter(pk=follower.pk).update(following_count=F("following_count") + 1)
+        Profile.objects.filter(pk=followee.pk).update(followers_count=F("followers_count") + 1)
+
+        followers_count = Profile.objects.values_list("followers_count", flat=True).get(pk=followee.pk)
+        if not is_celebrity(followers_count):
+            recent = (
+                Post.objects.filter(author=followee).order_by("-created_at")
+                .values_list("pk", "created_at")[:settings.TIMELINE_BACKFILL]
+            )
+            TimelineEntry.objects.bulk_create(
+                [TimelineEntry(owner=follower, post_id=pk, author=followee, created_at=created_at)
+                 for pk, created_at in recent],
+                ignore_conflicts=True,
+            )
+    return True
+
+
+def unfollow(follower, followee):
+    """Returns False if `follower` did not follow `followee`."""
+    with transaction.atomic():
+        deleted, _ = Follow.objects.filter(follower=follower, followee=followee).delete()
+        if not deleted:
+            return False
+        Profile.objects.filter(pk=follower.pk).update(following_count=F("following_count") - 1)
+        Profile.objects.filter(pk=followee.pk).update(followers_count=F("followers_count") - 1)
+        TimelineEntry.objects.filter(owner=follower, author=followee).delete()
+    return True
+
+
+# --- fan-out on write ---
+def fan_out_post(post_id):
+    """Background job: insert the post into its author's and (unless a big author) the followers' timelines."""
+    row = (
+        Post.objects.filter(pk=post_id)
+        .values_list("author_id", "created_at", "author__followers_count").first()
+    )
+    if row is None:
+        return
+    author_id, created_at, followers_count = row
+
+    owners = [author_id]
+    if not is_celebrity(followers_count):
+        followers = Follow.objects.filter(followee_id=author_id).values_list("follower_id", flat=True)
+        owners = chain(owners, followers.iterator())
+    for batch in _batches(owners, settings.TIMELINE_FANOUT_BATCH):
+        TimelineEntry.objects.bulk_create(
+            [TimelineEntry(owner_id=owner, post_id=post_id, author_id=author_id, created_at=created_at)
+             for owner in batch],
+            ignore_conflicts=True,
+        )
+
+
+def _batches(iterable, size):
+    iterator = iter(iterable)
+    while batch := list(islice(iterator, size)):
+        yield batch
+
+
+# --- reading ---
+class TimelinePagination(FeedCursorPagination):
+    """FeedCursorPagination over TimelineEntry rows; same (created_at, post id) cursor as the global feed."""
+    ordering = ("-created_at", "-post_id")
+
+
+def home_page(profile, paginator):
+    """
+    Entries (TimelineEntry, unsaved ones for merged-in posts) of one page of
+    `profile`'s home timeline, after paginator.prepare(); sets its cursors.
+    """
+    cursor, page_size = paginator.cursor, paginator.page_size
+    rows = list(paginator.page_queryset(
+        TimelineEntry.objects.filter(owner=profile).only("created_at", "post"), cursor, page_size,
+    ))
+
+    big_authors = celebrity_ids()
+    if big_authors:
+        followed = list(
+            Follow.objects.filter(follower=profile, followee_id__in=big_authors).values_list("followee_id", flat=True)
+        )
+        if followed:
+            posts = Post.objects.filter(author_id__in=followed).only("created_at")
+            rows += [
+                TimelineEntry(created_at=post.created_at, post_id=post.pk)
+                for post in FeedCursorPagination().page_queryset(posts, cursor, page_size)
+            ]
+            rows = _merge(rows, reverse=bool(cursor and cursor[0]))
+
+    return paginator.finish_page(rows, cursor, page_size)
+
+
+def _merge(rows, reverse):
+    """Both sources in page order (newest first, oldest first for a reverse cursor), duplicates dropped."""
+    seen, merged = set(), []
+    for row in sorted(rows, key=lambda row: (row.created_at, row.post_id), reverse=not reverse):
+        if row.post_id not in seen:
+            seen.add(row.post_id)
+            merged.append(row)
+    return merged
@@ -0,0 +1,241 @@
+# core/uploads.py
+"""
+Streaming, resumable uploads for post images.
+
+The request body of each chunk is copied to the partial file in fixed-size
+blocks, so memory per upload is bounded by UPLOAD_BLOCK_SIZE plus a small
+header window, whatever the file size. While the bytes stream past we check
+the magic number, read the dimensions out of the header and feed the SHA-256.
+Partial files live under MEDIA_ROOT (PARTIAL_DIR, never served by
+core/media.py), so completion is a hard link into place rather than another
+copy; this needs a filesystem-backed media storage. Uploads abandoned before
+completion are removed by `expire_uploads` (`manage.py expire_uploads`).
+"""
+import hashlib
+import os
+import struct
+import threading
+import time
+from collections import OrderedDict
+
+from django.core.exceptions import ValidationError
+from django.core.files.storage import default_storage
+from django.db import transaction
+from django.utils import timezone
+from django.utils.translation import gettext_lazy as _
+
+from .models import ChunkedUpload, upload_to_post
+from .storage import content_name, hold, is_content_addressed
+
+PARTIAL_DIR = "uploads/partial/"
+UPLOAD_BLOCK_SIZE = 64 * 1024
+HEADER_WINDOW = 64 * 1024  # dimensions must be readable from the first 64 KB
+MAX_IMAGE_DIMENSION = 10000
+
+PNG_MAGIC = b"\x89PNG\r\n\x1a\n"
+JPEG_MAGIC = b"\xff\xd8\xff"
+# SOF markers carry the frame size; C4 (DHT), C8 (JPG) and CC (DAC) do not
+_JPEG_SOF = {0xC0, 0xC1, 0xC2, 0xC3, 0xC5, 0xC6, 0xC7, 0xC9, 0xCA, 0xCB, 0xCD, 0xCE, 0xCF}
+
+
+def sniff_image(head):
+    """
+    Inspect the first bytes of an upload.
+    Returns (content_type, width, height); width/height are None while more
+    bytes are needed. Raises ValidationError for anything but JPEG/PNG.
+    """
+    if head.startswith(PNG_MAGIC[:len(head)]) and len(head) < len(PNG_MAGIC):
+        return None, None, None
+    if head.startswith(JPEG_MAGIC[:len(head)]) and len(head) < len(JPEG_MAGIC):
+        return None, None, None
+
+    if head.startswith(PNG_MAGIC):
+        if len(head) < 24:
+            return "image/png", None, None
+        if head[12:16] != b"IHDR":
+            raise ValidationError(_("Uploaded file is invalid."))
+        width, height = struct.unpack(">II", head[16:24])
+        return "image/png", width, height
+
+    if head.startswith(JPEG_MAGIC):
+        pos = 2
+        while pos + 4 <= len(head):
+            if head[pos] != 0xFF:
+                raise ValidationError(_("Uploaded file is invalid."))
+            marker = head[pos + 1]
+            if marker == 0xFF:  # fill byte
+                pos += 1
+                continue
+            length = struct.unpack(">H", head[pos + 2:pos + 4])[0]
+            if marker in _JPEG_SOF:
+                if pos + 9 > len(head):
+                    break
+                height, width = struct.unpack(">HH", head[pos + 5:pos + 9])
+                return "image/jpeg", width, height
+            pos += 2 + length
+        return "image/jpeg", None, None
+
+    raise ValidationError(_("Unsupported image type. Allowed: JPEG, PNG."))
+
+
+class _Hashers:
+    """
+    Running SHA-256 per upload, kept for the process that received the chunks.
+    If a later chunk lands on another worker (or the entry was evicted) the
+    digest is recomputed from the stored file on completion.
+    """
+    max_entries = 256
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()
+
+    def take(self, upload_id, offset):
+        with self._lock:
+            entry = self._entries.pop(upload_id, None)
+        if offset == 0:
+            return hashlib.sha256()
+        if entry is not None and entry[1] == offset:
+            return entry[0]
+        return None
+
+    def put(self, upload_id, hasher, offset):
+        if hasher is None:
+            return
+        with self._lock:
+            self._entries[upload_id] = (hasher, offset)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+
+_hashers = _Hashers()
+
+
+def _partial_path(upload):
+    path = default_storage.path(upload.partial_name)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    return path
+
+
+def append_chunk(upload, stream, length):
+    """
+    Append `length` bytes from `stream` at upload.offset, validating as we go.
+    The caller holds a row lock on `upload` and saves it afterwards.
+    """
+    if upload.offset + length > upload.total_size:
+        raise ValidationError(_("Chunk exceeds the declared upload size."))
+
+    path = _partial_path(upload)
+    hasher = _hashers.take(upload.pk, upload.offset)
+
+    head = b""
+    if upload.width is None and upload.offset:
+        with open(path, "rb") as partial:
+            head = partial.read(HEADER_WINDOW)
+
+    with open(path, "r+b" if upload.offset else "wb") as partial:
+        partial.seek(upload.offset)
+        partial.truncate()  # drop bytes of an earlier, interrupted chunk
+        remaining = length
+        while remaining:
+            block = stream.read(min(UPLOAD_BLOCK_SIZE, remaining))
+            if not block:
+                break
+            remaining -= len(block)
+
+            if upload.width is None:
+                head = (head + block)[:HEADER_WINDOW]
+                _check_header(upload, head)
+            if hasher is not None:
+                hasher.update(block)
+            partial.write(block)
+
+    if remaining:
+        raise ValidationError(_("Upload interrupted."))
+    upload.offset += length
+    if upload.offset == upload.total_size and upload.width is None:
+        raise ValidationError(_("Uploaded file is invalid."))
+    _hashers.put(upload.pk, hasher, upload.offset)
+
+
+def _check_header(upload, head):
+    content_type, width, height = sniff_image(head)
+    if width is None:
+        if len(head) >= HEADER_WINDOW:
+            raise ValidationError(_("Could not read the image dimensions."))
+        return
+    if not (0 < width <= MAX_IMAGE_DIMENSION and 0 < height <= MAX_IMAGE_DIMENSION):
+        raise ValidationError(_("Image dimensions are out of range."))
+    upload.content_type, upload.width, upload.height = content_type, width, height
+
+
+def finish(upload):
+    """
+    Put the completed partial file in place under its final name; returns (name, sha256).
+
+    Call it in the transaction that creates the post: the partial file is only
+    removed once that commits, so after a rollback completing again works.
+    """
+    hasher = _hashers.take(upload.pk, upload.offset)
+    if hasher is None:
+        hasher = hashlib.sha256()
+        with default_storage.open(upload.partial_name, "rb") as partial:
+            for block in iter(lambda: partial.read(UPLOAD_BLOCK_SIZE), b""):
+                hasher.update(block)
+
+    digest = hasher.hexdigest()
+    extension = ".png" if upload.content_type == "image/png" else ".jpg"
+    name = upload_to_post(None, upload.filename.rsplit(".", 1)[0] + extension)
+    if is_content_addressed():
+        # we already have the hash; identical content is stored once
+        # (the caller's transaction also creates the post that references it)
+        name = content_name(name, digest)
+        if hold(name):
+            _delete_on_commit(upload.partial_name)
+            return name, digest
+
+    target = default_storage.path(name)
+    os.makedirs(os.path.dirname(target), exist_ok=True)
+    try:
+        os.link(default_storage.path(upload.partial_name), target)
+    except FileExistsError:
+        pass  # same content, put in place by a concurrent completion
+    _delete_on_commit(upload.partial_name)
+    return name, digest
+
+
+def _delete_on_commit(name):
+    transaction.on_commit(lambda: default_storage.delete(name))
+
+
+def discard(upload):
+    _hashers.take(upload.pk, -1)
+    default_storage.delete(upload.partial_name)
+
+
+def expire_uploads(max_age):
+    """
+    Delete uploads not completed and not written to for `max_age` (a timedelta),
+    with their partial files, then partial files older than that which no
+    upload refers to (left behind by a crash). Returns (uploads, orphan files) deleted.
+    """
+    cutoff = timezone.now() - max_age
+    expired = 0
+    for upload in ChunkedUpload.objects.filter(post__isnull=True, updated_at__lt=cutoff).iterator():
+        discard(upload)
+        upload.delete()
+        expired += 1
+
+    orphans = 0
+    if default_storage.exists(PARTIAL_DIR):
+        known = {
+            upload.partial_name
+            for upload in ChunkedUpload.objects.filter(post__isnull=True).only("pk")
+        }
+        oldest = time.time() - max_age.total_seconds()
+        for filename in default_storage.listdir(PARTIAL_DIR)[1]:
+            name = PARTIAL_DIR + filename
+            if name not in known and os.path.getmtime(default_storage.path(name)) < oldest:
+                default_storage.delete(name)
+                orphans += 1
+    return expired, orphans
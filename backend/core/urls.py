@@ -1,13 +1,37 @@
 from django.urls import path
-from .views import SignupView, LoginView, ProfileView, PostListCreateView, PostDeleteView,  PostReactView
+from .views import SignupView, LoginView, ProfileView, PostListCreateView, PostDeleteView,  PostReactView, BulkReactView
+from .views import UploadCreateView, UploadChunkView, UploadCompleteView
+from .views import HomeFeedView, FollowView, SearchView, ProfileDetailView, AuthorPostsView
+from .async_views import AsyncPostListView, AsyncPostReactView, PostStreamView
 
 urlpatterns = [
     path('signup/', SignupView.as_view(), name='signup'),
     path('login/', LoginView.as_view(), name='login'),
     path('profile/', ProfileView.as_view(), name='profile'),
 
+    # author pages
+    path('profiles/<int:pk>/', ProfileDetailView.as_view(), name='profile-detail'),
+    path('profiles/<int:pk>/posts/', AuthorPostsView.as_view(), name='profile-posts'),
+
+    # follow graph / home timeline
+    path('profiles/<int:pk>/follow/', FollowView.as_view(), name='follow'),
+    path('feed/', HomeFeedView.as_view(), name='home-feed'),
+
+    path('search/', SearchView.as_view(), name='search'),
+
     # posts
     path('posts/', PostListCreateView.as_view(), name='posts'),
     path('posts/<int:pk>/', PostDeleteView.as_view(), name='delete-post'),
     path('posts/<int:pk>/react/', PostReactView.as_view(), name='react-post'),
+    path('posts/react/bulk/', BulkReactView.as_view(), name='react-bulk'),
+
+    # native async feed / reactions (serve with an ASGI server, see core/async_views.py)
+    path('async/posts/', AsyncPostListView.as_view(), name='posts-async'),
+    path('async/posts/<int:pk>/react/', AsyncPostReactView.as_view(), name='react-post-async'),
+    path('stream/', PostStreamView.as_view(), name='post-stream'),
+
+    # resumable post-image uploads
+    path('uploads/', UploadCreateView.as_view(), name='uploads'),
+    path('uploads/<uuid:pk>/', UploadChunkView.as_view(), name='upload-chunk'),
+    path('uploads/<uuid:pk>/complete/', UploadCompleteView.as_view(), name='upload-complete'),
 ]
@@ -0,0 +1,126 @@
+# core/usernames.py
+"""
+Unique Profile.username allocation.
+
+Candidates are `base`, `base_1`, `base_2`, ... (cut to fit Profile.username).
+Every candidate for a base shares one prefix, so the taken ones come back from a
+single query: `username LIKE 'prefix%'` (PostgreSQL serves it from the
+varchar_pattern_ops index Django adds for unique CharFields) narrowed by an
+anchored regex to the exact candidate shapes, so a short base like "sam" does
+not fetch every "samantha..." row. The first free one is picked in memory. Concurrent signups can still pick the same name; the
+unique constraint catches that and the allocation is retried.
+"""
+import re
+
+from django.contrib.auth import get_user_model
+from django.db import IntegrityError, transaction
+from django.db.models import Q
+
+from .models import Profile
+
+User = get_user_model()
+
+MAX_ATTEMPTS = 5
+SUFFIX_ROOM = 7  # "_999999"
+BASE_QUERY_CHUNK = 500
+
+
+def username_base(user):
+    """Preferred profile username: the login name, else the e-mail local part."""
+    base = user.username or (user.email.split("@")[0] if user.email else f"user_{user.pk}")
+    return base[:_max_length()]
+
+
+def _max_length():
+    return Profile._meta.get_field("username").max_length
+
+
+def _prefix(base):
+    return base[:_max_length() - SUFFIX_ROOM]
+
+
+def candidates(base):
+    yield base
+    counter = 1
+    while True:
+        suffix = f"_{counter}"
+        yield base[:_max_length() - len(suffix)] + suffix
+        counter += 1
+
+
+def first_free(base, taken):
+    for candidate in candidates(base):
+        if candidate not in taken:
+            return candidate
+
+
+def _candidates_condition(base):
+    """Matches `base` and its suffixed candidates (whose stem shortens as the suffix grows), nothing else."""
+    stems = sorted({base[:_max_length() - length] for length in range(2, SUFFIX_ROOM + 1)}, key=len, reverse=True)
+    pattern = rf"^({'|'.join(re.escape(stem) for stem in stems)})_[0-9]+$"
+    return Q(username=base) | Q(username__startswith=_prefix(base), username__regex=pattern)
+
+
+def taken_usernames(bases):
+    """Existing usernames that clash with a candidate of any of `bases`."""
+    bases = sorted(set(bases))
+    taken = set()
+    for start in range(0, len(bases), BASE_QUERY_CHUNK):
+        condition = Q()
+        for base in bases[start:start + BASE_QUERY_CHUNK]:
+            condition |= _candidates_condition(base)
+        taken.update(Profile.objects.filter(condition).values_list("username", flat=True))
+    return taken
+
+
+def allocate_username(base):
+    return first_free(base, taken_usernames([base]))
+
+
+def create_profile(user):
+    """Create `user`'s Profile under a free username, retrying on a lost race."""
+    base = username_base(user)
+    for _ in range(MAX_ATTEMPTS):
+        try:
+            with transaction.atomic():
+                return Profile.objects.create(user=user, username=allocate_username(base))
+        except IntegrityError:
+            existing = Profile.objects.filter(user=user).first()
+            if existing is not None:
+                return existing
+    raise IntegrityError(f"Could not allocate a unique username for {base!r}.")
+
+
+def bulk_create_users(users, batch_size=1000):
+    """
+    Insert unsaved `users` (passwords already set) and their profiles with
+    bulk_create; the post_save signal does not run for them. Returns the users
+    with `profile` attached.
+    """
+    users = list(users)
+    if not users:
+        return users
+    with transaction.atomic():
+        User.objects.bulk_create(users, batch_size=batch_size)
+        for attempt in range(MAX_ATTEMPTS):
+            try:
+                with transaction.atomic():
+                    profiles = _bulk_create_profiles(users, batch_size)
+                break
+            except IntegrityError:
+                if attempt == MAX_ATTEMPTS - 1:
+                    raise
+    for user, profile in zip(users, profiles):
+        user.profile = profile
+    return users
+
+
+def _bulk_create_profiles(users, batch_size):
+    bases = [username_base(user) for user in users]
+    taken = taken_usernames(bases)
+    profiles = []
+    for user, base in zip(users, bases):
+        username = first_free(base, taken)
+        taken.add(username)
+        profiles.append(Profile(user=user, username=username))
+    return Profile.objects.bulk_create(profiles, batch_size=batch_size)
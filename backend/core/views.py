@@ -1,16 +1,26 @@
 # core/views.py
-from django.db import transaction
-from django.db.models import F
+import re
+
+from django.conf import settings
+from django.core.exceptions import ValidationError
+from django.db import IntegrityError, transaction
 
 from rest_framework.views import APIView
 from rest_framework.response import Response
 from rest_framework import status, generics
 from rest_framework.permissions import IsAuthenticated, AllowAny
-from rest_framework_simplejwt.tokens import RefreshToken
 
+from .authentication import tokens_for_user
 from .serializers_auth import SignupSerializer, LoginSerializer
-from .serializers import ProfileSerializer, PostSerializer
-from .models import Profile, Post, PostReaction
+from .serializers_fast import POST_FIELDS, PROFILE_FIELDS, profile_data, sparse_fields
+from .serializers import (
+    ProfileSerializer, PostSerializer, ChunkedUploadSerializer, ChunkedUploadCompleteSerializer,
+    BulkReactionSerializer, PublicProfileSerializer,
+)
+from .models import Profile, Post, ChunkedUpload
+from .pagination import FeedCursorPagination, SearchPagination, feed_ranking
+from .routing import PRIMARY, ReplicaReadsMixin
+from . import conditional, feed_cache, reactions, realtime, search, timelines, uploads
 
 
 class SignupView(APIView):
@@ -21,7 +31,7 @@ class SignupView(APIView):
         serializer = SignupSerializer(data=request.data)
         if serializer.is_valid():
             user = serializer.save()
-            refresh = RefreshToken.for_user(user)
+            refresh = tokens_for_user(user)
 
             return Response(
                 {
@@ -43,7 +53,7 @@ class LoginView(APIView):
         serializer = LoginSerializer(data=request.data)
         if serializer.is_valid():
             user = serializer.validated_data["user"]
-            refresh = RefreshToken.for_user(user)
+            refresh = tokens_for_user(user)
 
             return Response(
                 {
@@ -57,30 +67,193 @@ class LoginView(APIView):
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
 
-class ProfileView(generics.RetrieveUpdateAPIView):
+class ProfileView(ReplicaReadsMixin, generics.RetrieveUpdateAPIView):
     """
-    GET   /api/profile/   -> current user's profile
+    GET   /api/profile/   -> current user's profile (ETag / Last-Modified, 304 when unchanged;
+                             ?fields= for a subset)
     PATCH /api/profile/   -> update current user's profile
     """
     serializer_class = ProfileSerializer
     permission_classes = [IsAuthenticated]
 
     def get_object(self):
-        return self.request.user.profile
-
-
-class PostListCreateView(generics.ListCreateAPIView):
+        # request.user.profile may come from the auth cache; read and update the current row
+        return Profile.objects.select_related("user").get(pk=self.request.user.profile.pk)
+
+    def retrieve(self, request, *args, **kwargs):
+        profile = self.get_object()
+        # every editable field bumps updated_at; the e-mail lives on the user row
+        fields = sparse_fields(request.query_params, PROFILE_FIELDS) or PROFILE_FIELDS
+        etag = conditional.etag(conditional.media_type(request), profile.pk, profile.updated_at, profile.user.email)
+        response = conditional.not_modified(request, etag, profile.updated_at)
+        if response is None:
+            response = Response(profile_data(profile, request, fields))
+        return conditional.add_validators(response, etag, profile.updated_at)
+
+    def perform_update(self, serializer):
+        old_username = serializer.instance.username
+        profile = serializer.save()
+        if profile.username != old_username:
+            feed_cache.author_changed(profile)
+
+
+class PostListCreateView(ReplicaReadsMixin, generics.ListCreateAPIView):
     """
-    GET  /api/posts/   -> list all posts (global feed)
+    GET  /api/posts/   -> global feed, newest first, one cursor page at a time
+                          (?cursor=<opaque>&page_size=<n>, follow `next` / `previous`);
+                          ?ranking=hot orders it by hot score instead (core/ranking.py);
+                          ETag per page, If-None-Match -> 304 (core/conditional.py);
+                          ?fields=id,likes_count,... returns only those fields
     POST /api/posts/   -> create post (image + description)
     """
-    queryset = Post.objects.all().order_by("-created_at")
+    # author is joined in so `author` / `author_id` cost no extra queries;
+    # the viewer's reactions are batched by PostListSerializer
+    queryset = Post.objects.select_related("author")
     serializer_class = PostSerializer
     permission_classes = [IsAuthenticated]
+    pagination_class = FeedCursorPagination
 
     def get_serializer_context(self):
         return {"request": self.request}
 
+    def list(self, request, *args, **kwargs):
+        # page listings and post data come from the feed cache (see core/feed_cache.py);
+        # only the viewer's reactions are looked up per request
+        ranking, paginator = feed_ranking(request.query_params)
+        fields = sparse_fields(request.query_params, POST_FIELDS)
+        paginator.prepare(request)
+        cursor_token = request.query_params.get(paginator.cursor_query_param)
+
+        key, listing = feed_cache.get_page(cursor_token, paginator.cursor, paginator.page_size, ranking)
+        if listing is None:
+            # the listing is shared through the cache: never build it from a replica
+            posts = paginator.get_page(self.get_queryset().using(PRIMARY), paginator.cursor, paginator.page_size)
+            listing = feed_cache.store_page(key, posts, paginator.next_cursor, paginator.previous_cursor, ranking)
+
+        paginator.next_cursor = listing["next"]
+        paginator.previous_cursor = listing["previous"]
+        # re-polls of an unchanged page get a 304 before the items are assembled
+        loaded = feed_cache.load(request, listing["ids"])
+        etag = feed_cache.page_etag(listing, loaded, conditional.media_type(request))
+        response = conditional.not_modified(request, etag)
+        if response is None:
+            response = paginator.get_paginated_response(feed_cache.assemble(request, *loaded, fields=fields))
+        return conditional.add_validators(response, etag)
+
+
+class HomeFeedView(ReplicaReadsMixin, generics.ListAPIView):
+    """
+    GET /api/feed/  -> posts of the profiles you follow and your own, newest first
+                       (cursor pages and ?fields= like /api/posts/, see core/timelines.py)
+    """
+    permission_classes = [IsAuthenticated]
+    pagination_class = timelines.TimelinePagination
+
+    def list(self, request, *args, **kwargs):
+        fields = sparse_fields(request.query_params, POST_FIELDS)
+        paginator = self.paginator
+        paginator.prepare(request)
+        entries = timelines.home_page(request.user.profile, paginator)
+        return paginator.get_paginated_response(
+            feed_cache.render(request, [entry.post_id for entry in entries], fields)
+        )
+
+
+class ProfileDetailView(ReplicaReadsMixin, generics.RetrieveAPIView):
+    """
+    GET /api/profiles/<id>/  -> public profile with its stats (posts_count, likes_received,
+                                dislikes_received; kept on the row by core/profile_stats.py)
+    """
+    queryset = Profile.objects.all()
+    serializer_class = PublicProfileSerializer
+    permission_classes = [IsAuthenticated]
+
+
+class AuthorPostsView(ReplicaReadsMixin, generics.ListAPIView):
+    """
+    GET /api/profiles/<id>/posts/  -> that profile's posts, newest first
+                                      (cursor pages and ?fields= like /api/posts/)
+    """
+    permission_classes = [IsAuthenticated]
+    pagination_class = FeedCursorPagination
+
+    def list(self, request, pk):
+        fields = sparse_fields(request.query_params, POST_FIELDS)
+        paginator = self.paginator
+        paginator.prepare(request)
+        # a range scan of the (author, -created_at) index; the items come from the feed cache
+        posts = paginator.get_page(
+            Post.objects.filter(author_id=pk).only("id", "created_at"), paginator.cursor, paginator.page_size
+        )
+        if not posts and not Profile.objects.filter(pk=pk).exists():
+            return Response({"detail": "Profile not found."}, status=status.HTTP_404_NOT_FOUND)
+        return paginator.get_paginated_response(feed_cache.render(request, [post.pk for post in posts], fields))
+
+
+class FollowView(APIView):
+    """
+    POST   /api/profiles/<id>/follow/  -> follow that profile
+    DELETE /api/profiles/<id>/follow/  -> unfollow it
+    -> { "following": true|false, "followers_count": <n> }
+    """
+    permission_classes = [IsAuthenticated]
+
+    def post(self, request, pk):
+        return self.change(request, pk, timelines.follow)
+
+    def delete(self, request, pk):
+        return self.change(request, pk, timelines.unfollow)
+
+    def change(self, request, pk, action):
+        profile = request.user.profile
+        if pk == profile.pk:
+            return Response({"detail": "You cannot follow yourself."}, status=status.HTTP_400_BAD_REQUEST)
+        followee = Profile.objects.filter(pk=pk).first()
+        if followee is None:
+            return Response({"detail": "Profile not found."}, status=status.HTTP_404_NOT_FOUND)
+
+        action(profile, followee)
+        followee.refresh_from_db(fields=["followers_count"])
+        return Response(
+            {"following": action is timelines.follow, "followers_count": followee.followers_count},
+            status=status.HTTP_200_OK,
+        )
+
+
+class SearchView(ReplicaReadsMixin, APIView):
+    """
+    GET /api/search/?q=<text>&type=posts|profiles  -> best matches first
+        (?cursor=<opaque>&page_size=<n>, follow `next`; see core/search.py)
+    Posts come back like feed items (?fields= applies to them), profiles as their public fields.
+    """
+    permission_classes = [IsAuthenticated]
+    max_query_length = 200
+
+    def get(self, request):
+        text = request.query_params.get("q", "").strip()
+        kind = request.query_params.get("type") or "posts"
+        if not text or len(text) > self.max_query_length:
+            return Response(
+                {"detail": f"q must be 1 to {self.max_query_length} characters."},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+        if kind not in ("posts", "profiles"):
+            return Response({"detail": "type must be 'posts' or 'profiles'"}, status=status.HTTP_400_BAD_REQUEST)
+
+        paginator = SearchPagination()
+        paginator.prepare(request)
+        hits = search.search(kind, text, paginator.after(), paginator.page_size + 1)
+        ids = [pk for pk, _ in paginator.finish_hits(hits, paginator.page_size)]
+
+        if kind == "posts":
+            results = feed_cache.render(request, ids, sparse_fields(request.query_params, POST_FIELDS))
+        else:
+            profiles = Profile.objects.in_bulk(ids)
+            results = PublicProfileSerializer(
+                [profiles[pk] for pk in ids if pk in profiles], many=True, context={"request": request},
+            ).data
+        return paginator.get_paginated_response(results)
+
 
 class PostDeleteView(generics.DestroyAPIView):
     """
@@ -97,7 +270,14 @@ class PostDeleteView(generics.DestroyAPIView):
                 {"detail": "You can only delete your own posts."},
                 status=status.HTTP_403_FORBIDDEN,
             )
-        instance.delete()
+        post_id = instance.pk
+        with transaction.atomic():
+            # the counters as of the delete, under the row lock: the author's totals lose exactly these
+            instance.refresh_from_db(
+                from_queryset=Post.objects.select_for_update(), fields=["likes_count", "dislikes_count"]
+            )
+            instance.delete()
+        feed_cache.post_deleted(post_id)
 
 
 class PostReactView(APIView):
@@ -113,75 +293,226 @@ class PostReactView(APIView):
     permission_classes = [IsAuthenticated]
 
     def post(self, request, pk):
+        if settings.REACTION_COUNTER_MODE == "deltas":
+            return self.post_lock_free(request, pk)
+
+        reaction_str = request.data.get("reaction")
+        if reaction_str not in ("like", "dislike"):
+            return Response(
+                {"detail": "reaction must be 'like' or 'dislike'"},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+        new_value = 1 if reaction_str == "like" else -1
+        profile = request.user.profile
+
         try:
-            with transaction.atomic():
-                post = Post.objects.select_for_update().get(pk=pk)
-                profile = request.user.profile
+            post, current = reactions.toggle_reaction_locked(profile.pk, pk, new_value)
+        except Post.DoesNotExist:
+            return Response(
+                {"detail": "Post not found."},
+                status=status.HTTP_404_NOT_FOUND,
+            )
 
-                reaction_str = request.data.get("reaction")
-                if reaction_str not in ("like", "dislike"):
-                    return Response(
-                        {"detail": "reaction must be 'like' or 'dislike'"},
-                        status=status.HTTP_400_BAD_REQUEST,
-                    )
+        feed_cache.post_changed(post.pk)
+        feed_cache.reaction_changed(profile.pk, post.pk, current)
+        realtime.counts_changed(post)
 
-                new_value = 1 if reaction_str == "like" else -1
+        serializer = PostSerializer(post, context={"request": request})
+        return Response(serializer.data, status=status.HTTP_200_OK)
 
-                existing = PostReaction.objects.filter(
-                    user=profile, post=post
-                ).first()
+    def post_lock_free(self, request, pk):
+        """
+        High-contention path: no row lock on the Post. The toggle and its counter
+        delta are one statement (see core/reactions.py); the returned counts
+        include deltas that have not been folded into the Post row yet.
+        """
+        reaction_str = request.data.get("reaction")
+        if reaction_str not in ("like", "dislike"):
+            return Response(
+                {"detail": "reaction must be 'like' or 'dislike'"},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+        new_value = 1 if reaction_str == "like" else -1
+        profile = request.user.profile
 
-                # case 1: no reaction yet -> create one
-                if existing is None:
-                    PostReaction.objects.create(
-                        user=profile, post=post, reaction=new_value
-                    )
-                    if new_value == 1:
-                        Post.objects.filter(pk=post.pk).update(
-                            likes_count=F("likes_count") + 1
-                        )
-                    else:
-                        Post.objects.filter(pk=post.pk).update(
-                            dislikes_count=F("dislikes_count") + 1
-                        )
-
-                # case 2: same reaction -> remove it (toggle off)
-                elif existing.reaction == new_value:
-                    if existing.reaction == 1:
-                        Post.objects.filter(pk=post.pk).update(
-                            likes_count=F("likes_count") - 1
-                        )
-                    else:
-                        Post.objects.filter(pk=post.pk).update(
-                            dislikes_count=F("dislikes_count") - 1
-                        )
-                    existing.delete()
-
-                # case 3: opposite reaction -> switch
-                else:
-                    if existing.reaction == 1:
-                        # previously liked, now dislike
-                        Post.objects.filter(pk=post.pk).update(
-                            likes_count=F("likes_count") - 1,
-                            dislikes_count=F("dislikes_count") + 1,
-                        )
-                    else:
-                        # previously disliked, now like
-                        Post.objects.filter(pk=post.pk).update(
-                            dislikes_count=F("dislikes_count") - 1,
-                            likes_count=F("likes_count") + 1,
-                        )
-                    existing.reaction = new_value
-                    existing.save(update_fields=["reaction", "updated_at"])
-
-                # refresh post with updated counters
-                post.refresh_from_db()
+        try:
+            outcome = reactions.toggle_reaction(profile.pk, pk, new_value)
+        except IntegrityError:
+            # the post does not exist (or was deleted meanwhile)
+            return Response(
+                {"detail": "Post not found."},
+                status=status.HTTP_404_NOT_FOUND,
+            )
 
-        except Post.DoesNotExist:
+        post = reactions.with_pending_counts(Post.objects.select_related("author")).filter(pk=pk).first()
+        if post is None:
             return Response(
                 {"detail": "Post not found."},
                 status=status.HTTP_404_NOT_FOUND,
             )
+        post.likes_count = post.current_likes
+        post.dislikes_count = post.current_dislikes
 
-        serializer = PostSerializer(post, context={"request": request})
+        current = None if outcome == reactions.REMOVED else new_value
+        feed_cache.reaction_changed(profile.pk, post.pk, current)
+        realtime.counts_changed(post)
+
+        serializer = PostSerializer(post, context={"request": request, "user_reactions": {post.pk: current}})
         return Response(serializer.data, status=status.HTTP_200_OK)
+
+
+class BulkReactView(APIView):
+    """
+    POST /api/posts/react/bulk/
+    body: { "operations": [ { "post_id": 1, "reaction": "like" }, ... ] }
+    -> { "results": [ <post with updated counters>, ... ], "missing": [ <post ids not found> ] }
+
+    Same toggle/switch rules as /react/, applied in order (repeating an
+    operation toggles it back), all in one transaction. Operations on posts
+    that no longer exist are skipped and reported in "missing".
+    """
+    permission_classes = [IsAuthenticated]
+
+    def post(self, request):
+        serializer = BulkReactionSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        profile = request.user.profile
+
+        current, missing = reactions.apply_reactions(profile.pk, serializer.validated_operations())
+
+        for post_id, value in current.items():
+            if settings.REACTION_COUNTER_MODE != "deltas":
+                feed_cache.post_changed(post_id)
+            feed_cache.reaction_changed(profile.pk, post_id, value)
+
+        posts = Post.objects.select_related("author").filter(pk__in=list(current)).order_by("pk")
+        if settings.REACTION_COUNTER_MODE == "deltas":
+            posts = list(reactions.with_pending_counts(posts))
+            for post in posts:
+                post.likes_count, post.dislikes_count = post.current_likes, post.current_dislikes
+        for post in posts:
+            realtime.counts_changed(post)
+
+        serializer = PostSerializer(posts, many=True, context={"request": request, "user_reactions": current})
+        return Response({"results": serializer.data, "missing": missing}, status=status.HTTP_200_OK)
+
+
+class UploadCreateView(generics.CreateAPIView):
+    """
+    POST /api/uploads/   body: { "filename": "cat.jpg", "size": <bytes> }
+    -> starts a resumable post-image upload; send the bytes with PUT /api/uploads/<id>/
+    """
+    serializer_class = ChunkedUploadSerializer
+    permission_classes = [IsAuthenticated]
+
+    def perform_create(self, serializer):
+        serializer.save(owner=self.request.user.profile)
+
+
+class UploadChunkView(APIView):
+    """
+    GET /api/uploads/<id>/  -> upload state; `offset` is where to resume
+    PUT /api/uploads/<id>/  -> raw chunk bytes, header `Content-Range: bytes <start>-<end>/<size>`
+
+    The body is streamed to storage block by block (never parsed by DRF);
+    a chunk must start at the current offset, otherwise 409 with the offset.
+    """
+    permission_classes = [IsAuthenticated]
+    content_range_re = re.compile(r"^bytes (\d+)-(\d+)/(\d+)$")
+
+    def get_upload(self, request, pk, lock=False):
+        queryset = ChunkedUpload.objects.select_for_update() if lock else ChunkedUpload.objects
+        return queryset.filter(pk=pk, owner=request.user.profile).first()
+
+    def get(self, request, pk):
+        upload = self.get_upload(request, pk)
+        if upload is None:
+            return Response({"detail": "Upload not found."}, status=status.HTTP_404_NOT_FOUND)
+        return Response(ChunkedUploadSerializer(upload).data)
+
+    def put(self, request, pk):
+        match = self.content_range_re.match(request.META.get("HTTP_CONTENT_RANGE", ""))
+        if match is None:
+            return Response(
+                {"detail": "Content-Range header is required: bytes <start>-<end>/<size>."},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+        start, end, size = (int(value) for value in match.groups())
+        length = end - start + 1
+        if length <= 0 or length != int(request.META.get("CONTENT_LENGTH") or 0):
+            return Response(
+                {"detail": "Content-Range does not match the request body."},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+
+        with transaction.atomic():
+            upload = self.get_upload(request, pk, lock=True)
+            if upload is None:
+                return Response({"detail": "Upload not found."}, status=status.HTTP_404_NOT_FOUND)
+            if upload.post_id is not None or size != upload.total_size:
+                return Response(
+                    {"detail": "Upload is already complete or the size does not match."},
+                    status=status.HTTP_400_BAD_REQUEST,
+                )
+            if start != upload.offset:
+                return Response({"offset": upload.offset}, status=status.HTTP_409_CONFLICT)
+
+            try:
+                # the underlying WSGI stream, read block by block
+                uploads.append_chunk(upload, request._request, length)
+            except ValidationError as exc:
+                return Response({"detail": exc.messages[0]}, status=status.HTTP_400_BAD_REQUEST)
+            upload.save()
+
+        return Response(ChunkedUploadSerializer(upload).data)
+
+    def delete(self, request, pk):
+        upload = self.get_upload(request, pk)
+        if upload is None:
+            return Response({"detail": "Upload not found."}, status=status.HTTP_404_NOT_FOUND)
+        if upload.post_id is None:
+            uploads.discard(upload)
+        upload.delete()
+        return Response(status=status.HTTP_204_NO_CONTENT)
+
+
+class UploadCompleteView(APIView):
+    """
+    POST /api/uploads/<id>/complete/   body: { "description": "..." }
+    -> turns a fully received upload into a post; calling it again returns the same post
+    """
+    permission_classes = [IsAuthenticated]
+
+    def post(self, request, pk):
+        serializer = ChunkedUploadCompleteSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+
+        with transaction.atomic():
+            upload = ChunkedUpload.objects.select_for_update().filter(
+                pk=pk, owner=request.user.profile
+            ).first()
+            if upload is None:
+                return Response({"detail": "Upload not found."}, status=status.HTTP_404_NOT_FOUND)
+
+            if upload.post_id is None:
+                if upload.offset != upload.total_size:
+                    return Response(
+                        {"detail": "Upload is incomplete.", "offset": upload.offset},
+                        status=status.HTTP_400_BAD_REQUEST,
+                    )
+                name, upload.sha256 = uploads.finish(upload)
+                upload.post = Post.objects.create(
+                    author=upload.owner,
+                    image=name,
+                    description=serializer.validated_data.get("description", ""),
+                )
+                upload.save(update_fields=["sha256", "post", "updated_at"])
+                post = upload.post
+                transaction.on_commit(lambda: feed_cache.post_created(post))
+                transaction.on_commit(lambda: realtime.post_created(post))
+                response_status = status.HTTP_201_CREATED
+            else:
+                response_status = status.HTTP_200_OK
+
+        post = Post.objects.select_related("author").get(pk=upload.post_id)
+        return Response(PostSerializer(post, context={"request": request}).data, status=response_status)
@@ -1,8 +1,11 @@
 from pathlib import Path
 from dotenv import load_dotenv
+import importlib.util
 import os
 from datetime import timedelta
 
+from django.conf import global_settings
+
 
 # Base directory
 BASE_DIR = Path(__file__).resolve().parent.parent
@@ -41,6 +44,7 @@ INSTALLED_APPS = [
 
 # Middleware
 MIDDLEWARE = [
+    'core.middleware.MetricsMiddleware',
     'corsheaders.middleware.CorsMiddleware',     
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
@@ -49,8 +53,23 @@ MIDDLEWARE = [
     'django.contrib.auth.middleware.AuthenticationMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
+    'core.middleware.QueryCountHeaderMiddleware',
+    'core.routing.ReplicaStickinessMiddleware',
 ]
 
+# X-Query-Count / X-Query-Time response headers for manage.py benchmark_api
+QUERY_COUNT_HEADER = os.getenv('QUERY_COUNT_HEADER', 'False') == 'True'
+
+# Per-view request metrics at /metrics (core/metrics.py). Requests running more than
+# METRICS_QUERY_THRESHOLD SQL queries are logged. /metrics requires
+# `Authorization: Bearer <METRICS_TOKEN>`; without a token it answers only with
+# DEBUG on or to a client address in METRICS_ALLOWED_IPS (e.g. a scraper on the
+# host itself; not behind a proxy that connects from that address).
+METRICS_ENABLED = os.getenv('METRICS_ENABLED', 'True') == 'True'
+METRICS_QUERY_THRESHOLD = int(os.getenv('METRICS_QUERY_THRESHOLD', '20'))
+METRICS_TOKEN = os.getenv('METRICS_TOKEN', '')
+METRICS_ALLOWED_IPS = [ip for ip in os.getenv('METRICS_ALLOWED_IPS', '').split(',') if ip]
+
 ROOT_URLCONF = 'socialnet.urls'
 
 # Templates (required for admin)
@@ -84,8 +103,78 @@ DATABASES = {
     }
 }
 
+# Connection pool (psycopg 3 with psycopg[pool]); used by the sync views and by the
+# async views' ORM calls alike. Leave DB_POOL_MAX_SIZE at 0 to open one connection
+# per request as before.
+DB_POOL_MAX_SIZE = int(os.getenv('DB_POOL_MAX_SIZE', '0'))
+if DB_POOL_MAX_SIZE:
+    from psycopg_pool import ConnectionPool
+
+    DATABASES['default']['OPTIONS'] = {
+        'pool': {
+            'min_size': int(os.getenv('DB_POOL_MIN_SIZE', '2')),
+            'max_size': DB_POOL_MAX_SIZE,
+            'timeout': float(os.getenv('DB_POOL_TIMEOUT', '10')),
+            # pooled connections are checked before they are handed out
+            'check': ConnectionPool.check_connection,
+        },
+    }
+else:
+    # without the pool, keep connections for DB_CONN_MAX_AGE seconds (0 = close after each request)
+    DATABASES['default']['CONN_MAX_AGE'] = int(os.getenv('DB_CONN_MAX_AGE', '0'))
+DATABASES['default']['CONN_HEALTH_CHECKS'] = True
+
+# Read replicas (core/routing.py): DB_REPLICA_HOSTS=host[:port],... adds one alias per
+# replica with the primary's credentials and pool settings. The feed, profile and
+# search GETs read from them, except for users who wrote in the last
+# REPLICA_STICKY_SECONDS, who keep reading from the primary.
+DATABASE_REPLICAS = []
+for _index, _host in enumerate(filter(None, os.getenv('DB_REPLICA_HOSTS', '').split(',')), start=1):
+    _host, _, _port = _host.strip().partition(':')
+    DATABASES[f'replica_{_index}'] = dict(
+        DATABASES['default'],
+        HOST=_host,
+        PORT=_port or DATABASES['default']['PORT'],
+        TEST={'MIRROR': 'default'},
+    )
+    DATABASE_REPLICAS.append(f'replica_{_index}')
+DATABASE_ROUTERS = ['core.routing.ReplicaRouter']
+REPLICA_STICKY_SECONDS = int(os.getenv('REPLICA_STICKY_SECONDS', '5'))
+
+
+# Caches — locmem by default; point the feed cache at Redis (or any Django cache
+# backend) in production, e.g.
+#   FEED_CACHE_BACKEND=django.core.cache.backends.redis.RedisCache
+#   FEED_CACHE_LOCATION=redis://127.0.0.1:6379/1
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+    },
+    'feed': {
+        'BACKEND': os.getenv('FEED_CACHE_BACKEND', 'django.core.cache.backends.locmem.LocMemCache'),
+        'LOCATION': os.getenv('FEED_CACHE_LOCATION', 'feed'),
+        'TIMEOUT': int(os.getenv('FEED_CACHE_TIMEOUT', '300')),
+    },
+}
+
+FEED_CACHE_ALIAS = 'feed'
+# hot-ranked feed pages (?ranking=hot) reorder with every reaction; cache them briefly
+HOT_FEED_CACHE_TTL = int(os.getenv('HOT_FEED_CACHE_TTL', '30'))
+
 
 # Password validation
+# Password hashing for login / signup runs in a pool of PASSWORD_HASH_WORKERS
+# processes (0 = inline); beyond PASSWORD_HASH_QUEUE waiting hashes they answer 503.
+# Passwords stored with another hasher are rehashed with PASSWORD_HASHER on login.
+# Failed logins are remembered for LOGIN_FAILURE_CACHE_TTL seconds (core/passwords.py).
+PASSWORD_HASHER = os.getenv('PASSWORD_HASHER', 'django.contrib.auth.hashers.PBKDF2PasswordHasher')
+PASSWORD_HASHERS = [PASSWORD_HASHER] + [
+    hasher for hasher in global_settings.PASSWORD_HASHERS if hasher != PASSWORD_HASHER
+]
+PASSWORD_HASH_WORKERS = int(os.getenv('PASSWORD_HASH_WORKERS', str(os.cpu_count() or 1)))
+PASSWORD_HASH_QUEUE = int(os.getenv('PASSWORD_HASH_QUEUE', '64'))
+LOGIN_FAILURE_CACHE_TTL = int(os.getenv('LOGIN_FAILURE_CACHE_TTL', '30'))
+
 AUTH_PASSWORD_VALIDATORS = [
     {"NAME": 'django.contrib.auth.password_validation.UserAttributeSimilarityValidator'},
     {"NAME": 'django.contrib.auth.password_validation.MinimumLengthValidator'},
@@ -107,11 +196,46 @@ STATIC_ROOT = BASE_DIR / 'staticfiles'
 MEDIA_URL = '/media/'
 MEDIA_ROOT = BASE_DIR / 'media'
 
+# Media serving (core/media.py). Set one of these to hand file bodies to the web
+# server instead of copying them through Python:
+#   MEDIA_ACCEL_REDIRECT_PREFIX=/protected-media/  (nginx `internal` location aliasing MEDIA_ROOT)
+#   MEDIA_SENDFILE_HEADER=X-Sendfile               (Apache mod_xsendfile, lighttpd)
+MEDIA_ACCEL_REDIRECT_PREFIX = os.getenv('MEDIA_ACCEL_REDIRECT_PREFIX', '')
+MEDIA_SENDFILE_HEADER = os.getenv('MEDIA_SENDFILE_HEADER', '')
+MEDIA_CACHE_MAX_AGE = 365 * 24 * 60 * 60
+
+# Resumable uploads (core/uploads.py) not completed within this many hours are
+# deleted by `manage.py expire_uploads`
+UPLOAD_EXPIRY_HOURS = float(os.getenv('UPLOAD_EXPIRY_HOURS', '24'))
+
+# Uploads are stored once per distinct content, named by hash (core/storage.py)
+STORAGES = {
+    'default': {
+        'BACKEND': 'core.storage.ContentAddressedStorage',
+    },
+    'staticfiles': {
+        'BACKEND': 'django.contrib.staticfiles.storage.StaticFilesStorage',
+    },
+}
+
+# Resized variants of uploaded images, served as a srcset (see core/images.py)
+IMAGE_VARIANT_WIDTHS = (320, 640, 1080)
+IMAGE_VARIANT_FORMAT = os.getenv('IMAGE_VARIANT_FORMAT', 'WEBP')
+IMAGE_VARIANT_QUALITY = int(os.getenv('IMAGE_VARIANT_QUALITY', '80'))
+
+# In-process worker pool for post-commit background jobs (0 = run them inline)
+BACKGROUND_WORKERS = int(os.getenv('BACKGROUND_WORKERS', '2'))
+
 # DRF settings
 REST_FRAMEWORK = {
     'DEFAULT_AUTHENTICATION_CLASSES': (
-        'rest_framework_simplejwt.authentication.JWTAuthentication',
+        'core.authentication.ClaimsJWTAuthentication',
     ),
+    # orjson-backed JSON (stdlib fallback) and, if installed, MessagePack (core/renderers.py)
+    'DEFAULT_RENDERER_CLASSES': [
+        'core.renderers.FastJSONRenderer',
+        'rest_framework.renderers.BrowsableAPIRenderer',
+    ] + (['core.renderers.MessagePackRenderer'] if importlib.util.find_spec('msgpack') else []),
 }
 
 
@@ -120,8 +244,43 @@ SIMPLE_JWT = {
     "REFRESH_TOKEN_LIFETIME": timedelta(days=7),  
     "ROTATE_REFRESH_TOKENS": False,
     "BLACKLIST_AFTER_ROTATION": False,
+    # tokens carry a fingerprint of Profile.password_version and stop working when
+    # the password changes (core/authentication.py)
+    "CHECK_REVOKE_TOKEN": True,
 }
 
+# ClaimsJWTAuthentication caches users in-process; saves and deletes evict them
+# locally, other workers see deactivations and password changes within this many seconds.
+AUTH_USER_CACHE_TTL = int(os.getenv('AUTH_USER_CACHE_TTL', '60'))
+
+# Reaction counters: "locked" updates Post.likes_count/dislikes_count under a row
+# lock on every reaction; "deltas" skips the lock and appends counter deltas that
+# `manage.py fold_reaction_deltas` folds into the Post rows.
+REACTION_COUNTER_MODE = os.getenv('REACTION_COUNTER_MODE', 'locked')
+
+# Home timelines (core/timelines.py): posts are copied into followers' timelines
+# unless the author has more than TIMELINE_FANOUT_LIMIT followers, then they are
+# merged in when the timeline is read.
+TIMELINE_FANOUT_LIMIT = int(os.getenv('TIMELINE_FANOUT_LIMIT', '10000'))
+TIMELINE_FANOUT_BATCH = 1000
+TIMELINE_BACKFILL = int(os.getenv('TIMELINE_BACKFILL', '100'))
+TIMELINE_CELEBRITY_TTL = 60
+
+# Live updates over SSE (GET /api/stream/, core/realtime.py): changes are batched
+# per REALTIME_WINDOW seconds; streams end after REALTIME_STREAM_SECONDS and the
+# browser reconnects. Long streams need the ASGI server; under WSGI a stream holds
+# a worker thread, so it ends after REALTIME_WSGI_STREAM_SECONDS and the browser
+# comes back REALTIME_WSGI_RETRY_SECONDS later.
+REALTIME_WINDOW = float(os.getenv('REALTIME_WINDOW', '1.0'))
+REALTIME_HEARTBEAT = 15
+REALTIME_STREAM_SECONDS = int(os.getenv('REALTIME_STREAM_SECONDS', '300'))
+REALTIME_WSGI_STREAM_SECONDS = int(os.getenv('REALTIME_WSGI_STREAM_SECONDS', '5'))
+REALTIME_WSGI_RETRY_SECONDS = int(os.getenv('REALTIME_WSGI_RETRY_SECONDS', '10'))
+REALTIME_MAX_POSTS = 200
+
+# Largest batch accepted by POST /api/posts/react/bulk/
+REACTION_BULK_MAX_OPERATIONS = int(os.getenv('REACTION_BULK_MAX_OPERATIONS', '500'))
+
 # CORS (allow React dev server)
 CORS_ALLOWED_ORIGINS = [
     "http://localhost:3000",
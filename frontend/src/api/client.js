@@ -15,3 +15,16 @@ api.interceptors.request.use((config) => {
 });
 
 export default api;
+
+// server side limit on the posts of one stream (REALTIME_MAX_POSTS)
+export const STREAM_MAX_POSTS = 200;
+
+// Server-Sent Events URL for live counters of `postIds` and new-post notices.
+// EventSource cannot send headers, so the access token goes in the query string.
+export function streamUrl(postIds) {
+  const params = new URLSearchParams({
+    posts: postIds.join(","),
+    access_token: localStorage.getItem("accessToken") || "",
+  });
+  return `${api.defaults.baseURL}stream/?${params}`;
+}
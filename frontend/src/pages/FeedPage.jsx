@@ -1,15 +1,20 @@
 // src/pages/FeedPage.jsx
 import { useEffect, useState } from "react";
-import api from "../api/client";
+import api, { STREAM_MAX_POSTS, streamUrl } from "../api/client";
 
 export default function FeedPage() {
   const [posts, setPosts] = useState([]);
+  const [nextPage, setNextPage] = useState(null);
   const [loading, setLoading] = useState(true);
+  const [newPosts, setNewPosts] = useState(0);
 
-  const fetchPosts = async () => {
+  // the feed is cursor-paginated: `next` is the full URL of the following page
+  const fetchPosts = async (url = "posts/") => {
     try {
-      const res = await api.get("posts/");
-      setPosts(res.data);
+      const res = await api.get(url);
+      setPosts((prev) => (url === "posts/" ? res.data.results : [...prev, ...res.data.results]));
+      setNextPage(res.data.next);
+      if (url === "posts/") setNewPosts(0);
     } catch (err) {
       console.error(err);
       alert("Failed to load posts");
@@ -22,6 +27,25 @@ export default function FeedPage() {
     fetchPosts();
   }, []);
 
+  // live counters for the posts on screen + new-post notices, instead of polling;
+  // reconnects whenever the set of loaded posts changes; only the most recently
+  // loaded STREAM_MAX_POSTS are watched, older ones keep their last counters
+  const visibleIds = posts.slice(-STREAM_MAX_POSTS).map((p) => p.id).join(",");
+  useEffect(() => {
+    if (!visibleIds) return undefined;
+    const source = new EventSource(streamUrl(visibleIds.split(",")));
+
+    source.addEventListener("counts", (event) => {
+      const counts = JSON.parse(event.data);
+      setPosts((prev) => prev.map((p) => (counts[p.id] ? { ...p, ...counts[p.id] } : p)));
+    });
+    source.addEventListener("posts", (event) => {
+      setNewPosts((n) => n + JSON.parse(event.data).length);
+    });
+
+    return () => source.close();
+  }, [visibleIds]);
+
   const handleReact = async (postId, reactionType) => {
     // reactionType = "like" or "dislike"
     try {
@@ -61,6 +85,25 @@ export default function FeedPage() {
   ➕ Create Post
 </button>
 
+      {newPosts > 0 && (
+        <button
+          onClick={() => fetchPosts()}
+          style={{
+            display: "block",
+            width: "100%",
+            padding: "0.5rem 1rem",
+            border: "1px solid #93c5fd",
+            borderRadius: "6px",
+            backgroundColor: "#eff6ff",
+            color: "#1e40af",
+            cursor: "pointer",
+            marginBottom: "1rem",
+          }}
+        >
+          {newPosts} new post{newPosts === 1 ? "" : "s"} — show
+        </button>
+      )}
+
       {posts.length === 0 && <p>No posts found.</p>}
 
       <div style={{ display: "flex", flexDirection: "column", gap: "2rem" }}>
@@ -80,6 +123,10 @@ export default function FeedPage() {
               {/* Post Image */}
               <img
                 src={post.image}
+                srcSet={Object.entries(post.image_srcset || {})
+                  .map(([width, url]) => `${url} ${width}w`)
+                  .join(", ")}
+                sizes="(max-width: 600px) 100vw, 600px"
                 alt="post"
                 style={{
                   width: "100%",
@@ -170,6 +217,23 @@ export default function FeedPage() {
           );
         })}
       </div>
+
+      {nextPage && (
+        <button
+          onClick={() => fetchPosts(nextPage)}
+          style={{
+            display: "block",
+            margin: "1.5rem auto 0",
+            padding: "0.5rem 1rem",
+            border: "1px solid #ccc",
+            borderRadius: "6px",
+            backgroundColor: "#f9fafb",
+            cursor: "pointer",
+          }}
+        >
+          Load more
+        </button>
+      )}
     </div>
   );
 }
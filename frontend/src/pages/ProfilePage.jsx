@@ -17,6 +17,9 @@ export default function ProfilePage() {
   const [profileImageFile, setProfileImageFile] = useState(null);
 
   const [myPosts, setMyPosts] = useState([]);
+  const [nextPostsPage, setNextPostsPage] = useState(null);
+  // posts_count / likes_received / dislikes_received, kept on the profile row by the backend
+  const [stats, setStats] = useState(null);
   const [loading, setLoading] = useState(true);
   const [saving, setSaving] = useState(false);
   const [error, setError] = useState("");
@@ -48,11 +51,14 @@ export default function ProfilePage() {
         date_of_birth: p.date_of_birth || "",
       });
 
-      // 2) Fetch posts and filter only this user's posts
-      const postsRes = await api.get("posts/");
-      const allPosts = postsRes.data || [];
-      const mine = allPosts.filter((post) => post.author === p.username);
-      setMyPosts(mine);
+      // 2) Stats and the first page of this user's posts (author timeline)
+      const [statsRes, postsRes] = await Promise.all([
+        api.get(`profiles/${p.id}/`),
+        api.get(`profiles/${p.id}/posts/`),
+      ]);
+      setStats(statsRes.data);
+      setMyPosts(postsRes.data.results || []);
+      setNextPostsPage(postsRes.data.next);
     } catch (err) {
       console.error(err);
       setError("Failed to load profile.");
@@ -65,6 +71,18 @@ export default function ProfilePage() {
     fetchProfileAndPosts();
   }, []);
 
+  // cursor-paginated like the feed: `next` is the full URL of the following page
+  const fetchMorePosts = async () => {
+    try {
+      const res = await api.get(nextPostsPage);
+      setMyPosts((prev) => [...prev, ...res.data.results]);
+      setNextPostsPage(res.data.next);
+    } catch (err) {
+      console.error(err);
+      alert("Failed to load posts.");
+    }
+  };
+
   const handleChange = (e) => {
     setProfileForm({
       ...profileForm,
@@ -117,6 +135,8 @@ export default function ProfilePage() {
     try {
       await api.delete(`posts/${postId}/`);
       setMyPosts((prev) => prev.filter((p) => p.id !== postId));
+      const statsRes = await api.get(`profiles/${profile.id}/`);
+      setStats(statsRes.data);
     } catch (err) {
       console.error(err);
       alert("Failed to delete post.");
@@ -146,6 +166,13 @@ export default function ProfilePage() {
         <div className="profile-left">
           <h2>My Profile</h2>
 
+          {stats && (
+            <p style={{ color: "#555" }}>
+              {stats.posts_count} posts · 👍 {stats.likes_received} · 👎{" "}
+              {stats.dislikes_received} received
+            </p>
+          )}
+
           {error && (
             <div className="banner-error">
               {error}
@@ -291,6 +318,23 @@ export default function ProfilePage() {
               </div>
             ))}
           </div>
+
+          {nextPostsPage && (
+            <button
+              onClick={fetchMorePosts}
+              style={{
+                display: "block",
+                margin: "1.5rem auto 0",
+                padding: "0.5rem 1rem",
+                border: "1px solid #ccc",
+                borderRadius: "6px",
+                backgroundColor: "#f9fafb",
+                cursor: "pointer",
+              }}
+            >
+              Load more
+            </button>
+          )}
         </div>
       </div>
     </div>